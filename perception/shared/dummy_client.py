@@ -0,0 +1,226 @@
+"""
+Offline stand-in for the OpenAI client used by the perception runners.
+
+Answers chat.completions.create() with a "Game State: <matrix>" built from
+the ground truth of the test case whose image was sent, with a controllable
+per-cell error rate. Latency and 429/500/timeout errors can be simulated to
+exercise pacing and error handling without API access. With a seed, each
+request draws from its own RNG (seed + image + attempt), so results do not
+depend on thread scheduling.
+
+Usage:
+    from shared.providers import create_client
+    from shared.model_configs import MODEL_CONFIGS
+
+    client = create_client(MODEL_CONFIGS["dummy"])  # a DummyOpenAIClient
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+import openai
+
+from shared.image_cache import source_digest
+
+# Test directories of the runners (relative to the project root)
+DEFAULT_CASES_DIRS = [
+    "gomoku_patch_tests",
+    "tictactoe_resolution_tests",
+    "gomoku_visual_richness_tests",
+    "gomoku_density_test",
+    "chess_density_test",
+]
+
+# Cell values used when there is no ground truth, by board size
+BOARD_VALUES = {
+    8: list(range(-6, 7)),
+    15: [0, 1, 2],
+    3: [0, 1, 2],
+}
+
+
+def sample_latency(rng: random.Random, distribution: str, mean: float, sigma: float = 0.5) -> float:
+    """Draw a latency in seconds ("fixed", "uniform", "exponential" or "lognormal")."""
+    if mean <= 0:
+        return 0.0
+    if distribution == "fixed":
+        return mean
+    if distribution == "uniform":
+        return rng.uniform(0, 2 * mean)
+    if distribution == "exponential":
+        return rng.expovariate(1 / mean)
+    if distribution == "lognormal":
+        return rng.lognormvariate(math.log(mean), sigma)
+    raise ValueError(f"Unknown latency distribution: {distribution}")
+
+
+def synthesize_matrix(size: int, rng: random.Random,
+                      ground_truth: Optional[List[List[int]]] = None,
+                      error_rate: float = 0.0) -> List[List[int]]:
+    """Board matrix with each cell misreported with probability error_rate."""
+    if ground_truth:
+        values = sorted({v for row in ground_truth for v in row} | {0})
+    else:
+        values = BOARD_VALUES.get(size, [0, 1, 2])
+        ground_truth = [[rng.choice(values) if rng.random() < 0.3 else 0
+                         for _ in range(size)] for _ in range(size)]
+    if error_rate <= 0 or len(values) < 2:
+        return [list(row) for row in ground_truth]
+    return [[rng.choice([v for v in values if v != value])
+             if rng.random() < error_rate else value
+             for value in row] for row in ground_truth]
+
+
+def _api_error(status: int, message: str, retry_after: float = 1.0) -> openai.APIStatusError:
+    """Build the openai SDK exception a real endpoint would cause."""
+    headers = {"retry-after": f"{retry_after:g}"} if status == 429 else {}
+    response = httpx.Response(
+        status, headers=headers,
+        request=httpx.Request("POST", "http://dummy/v1/chat/completions"))
+    error_class = openai.RateLimitError if status == 429 else openai.InternalServerError
+    return error_class(message, response=response, body=None)
+
+
+class _Completions:
+    def __init__(self, owner: "DummyOpenAIClient"):
+        self._owner = owner
+
+    def create(self, model: str, messages: List[Dict], **params):
+        return self._owner.complete(model, messages, **params)
+
+
+class DummyOpenAIClient:
+    """Duck-typed OpenAI client answering from perception ground truth."""
+
+    def __init__(
+        self,
+        cases_dirs: Optional[Iterable[str]] = None,
+        error_rate: float = 0.05,
+        latency: float = 0.0,
+        latency_distribution: str = "lognormal",
+        rate_429: float = 0.0,
+        rate_500: float = 0.0,
+        timeout_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.cases_dirs = list(cases_dirs or DEFAULT_CASES_DIRS)
+        self.error_rate = error_rate
+        self.latency = latency
+        self.latency_distribution = latency_distribution
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.timeout_rate = timeout_rate
+        self.seed = seed
+        self.chat = SimpleNamespace(completions=_Completions(self))
+        self._truth: Optional[Dict[str, List[List[int]]]] = None
+        self._attempts: Dict[str, int] = {}
+        self._system_prefixes = set()
+        self._lock = threading.Lock()
+
+    def _index(self) -> Dict[str, List[List[int]]]:
+        """Map image sha256 to ground truth for every case JSON (built once)."""
+        with self._lock:
+            if self._truth is not None:
+                return self._truth
+            truth = {}
+            for directory in self.cases_dirs:
+                for path in Path(directory).glob("**/*.json"):
+                    try:
+                        case = json.loads(path.read_text())
+                    except (OSError, ValueError):
+                        continue
+                    if not isinstance(case, dict) or "ground_truth" not in case or "image_file" not in case:
+                        continue
+                    image = Path(case["image_file"])
+                    if not image.exists():
+                        image = path.parent / image.name
+                    try:
+                        truth[hashlib.sha256(image.read_bytes()).hexdigest()] = case["ground_truth"]
+                    except OSError:
+                        continue
+            self._truth = truth
+            print(f"Dummy client indexed {len(truth)} test cases")
+            return truth
+
+    def _rng(self, key: str) -> random.Random:
+        with self._lock:
+            attempt = self._attempts.get(key, 0) + 1
+            self._attempts[key] = attempt
+        if self.seed is None:
+            return random.Random()
+        return random.Random(f"{self.seed}|{key}|{attempt}")
+
+    def complete(self, model: str, messages: List[Dict], **params):
+        """Simulate one chat completion."""
+        text, image = "", b""
+        system = "".join(m["content"] for m in messages
+                         if m.get("role") == "system" and isinstance(m.get("content"), str))
+        with self._lock:
+            # A system prefix seen before is a prompt-cache hit
+            cached_tokens = len(system) // 4 if system in self._system_prefixes else 0
+            self._system_prefixes.add(system)
+        for message in messages:
+            content = message.get("content")
+            if isinstance(content, str):
+                text += content
+                continue
+            for part in content or []:
+                if part.get("type") == "text":
+                    text += part["text"]
+                elif part.get("type") == "image_url" and not image:
+                    url = part["image_url"]["url"]
+                    try:
+                        image = base64.b64decode(url.split(",", 1)[1])
+                    except (IndexError, binascii.Error, ValueError):
+                        pass
+
+        key = source_digest(hashlib.sha256(image).hexdigest())
+        rng = self._rng(key)
+
+        time.sleep(sample_latency(rng, self.latency_distribution, self.latency))
+        roll = rng.random()
+        if roll < self.rate_429:
+            raise _api_error(429, "Rate limit reached (simulated)")
+        roll -= self.rate_429
+        if roll < self.rate_500:
+            raise _api_error(500, "Internal server error (simulated)")
+        roll -= self.rate_500
+        if roll < self.timeout_rate:
+            raise openai.APITimeoutError(
+                request=httpx.Request("POST", "http://dummy/v1/chat/completions"))
+
+        match = re.search(r"(\d+)\s*×\s*\1", text)
+        size = int(match.group(1)) if match else 15
+        matrix = synthesize_matrix(size, rng, self._index().get(key), self.error_rate)
+        content = f"Game State: {matrix}"
+
+        finish_reason = "stop"
+        max_tokens = params.get("max_tokens")
+        if max_tokens and len(content) // 4 > max_tokens:
+            content, finish_reason = content[: max_tokens * 4], "length"
+
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(
+                index=0,
+                finish_reason=finish_reason,
+                message=SimpleNamespace(role="assistant", content=content),
+            )],
+            usage=SimpleNamespace(
+                prompt_tokens=len(text) // 4,
+                completion_tokens=len(content) // 4,
+                total_tokens=(len(text) + len(content)) // 4,
+                prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+            ),
+        )
@@ -0,0 +1,91 @@
+"""
+Per-runner generation budgets (max_tokens, stop strings, temperature).
+
+Every perception prompt asks for a single "Game State: [[...]]" matrix, so
+the output budget can be derived from the board size instead of a blanket
+max_tokens=4096. Models whose MODEL_CONFIGS entry sets "reasoning": True get
+extra headroom for the reasoning they produce before answering.
+Responses cut off by the budget (finish_reason == "length") are flagged so
+runners can count truncations.
+
+Usage:
+    from shared.generation import GENERATION_BUDGETS, is_truncated
+    from shared.model_configs import MODEL_CONFIGS
+
+    budget = GENERATION_BUDGETS["chess_density"].for_model(MODEL_CONFIGS[model_key])
+    response = client.chat.completions.create(..., **budget.to_params())
+    truncated = is_truncated(response)
+"""
+
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional
+
+# Tokens for "Game State: " plus surrounding whitespace
+HEADER_TOKENS = 16
+# A cell such as "-4, " is at most about 3 tokens; row brackets add 2
+TOKENS_PER_CELL = 3
+TOKENS_PER_ROW = 2
+# Budget multiplier and fixed slack for preambles like "Here is the board:"
+HEADROOM_FACTOR = 2.0
+HEADROOM_TOKENS = 64
+# Smallest budget for any board: small boards leave little room for a short
+# preamble or a description of the board before the matrix
+MIN_BUDGET_TOKENS = 512
+# Extra budget for models that reason before answering
+THINKING_HEADROOM_TOKENS = 8192
+
+
+@dataclass(frozen=True)
+class GenerationBudget:
+    """Decoding limits for one runner."""
+
+    max_tokens: int
+    # None leaves the provider's default sampling temperature
+    temperature: Optional[float] = None
+    stop: Optional[List[str]] = None
+
+    def for_model(self, config: Dict) -> "GenerationBudget":
+        """Return this budget, widened if the MODEL_CONFIGS entry is a reasoning model."""
+        if config.get("reasoning"):
+            return replace(self, max_tokens=self.max_tokens + THINKING_HEADROOM_TOKENS)
+        return self
+
+    def to_params(self) -> Dict:
+        """Keyword arguments for chat.completions.create."""
+        params = {"max_tokens": self.max_tokens}
+        if self.temperature is not None:
+            params["temperature"] = self.temperature
+        if self.stop:
+            params["stop"] = list(self.stop)
+        return params
+
+
+def matrix_budget(rows: int, cols: int) -> GenerationBudget:
+    """
+    Budget for a "Game State: [[...]]" answer of the given board size.
+
+    No stop strings are set: the closing "]]" is needed by the parsers and
+    stop sequences are stripped from the returned text.
+    """
+    answer_tokens = HEADER_TOKENS + rows * (cols * TOKENS_PER_CELL + TOKENS_PER_ROW)
+    return GenerationBudget(
+        max_tokens=max(MIN_BUDGET_TOKENS, int(answer_tokens * HEADROOM_FACTOR) + HEADROOM_TOKENS)
+    )
+
+
+# Budgets keyed by runner
+GENERATION_BUDGETS = {
+    "chess_density": matrix_budget(8, 8),
+    "gomoku_density": matrix_budget(15, 15),
+    "gomoku_patch": matrix_budget(15, 15),
+    "gomoku_richness": matrix_budget(15, 15),
+    "tictactoe_resolution": matrix_budget(3, 3),
+}
+
+
+def is_truncated(response) -> bool:
+    """True if the completion stopped because it hit max_tokens."""
+    try:
+        return response.choices[0].finish_reason == "length"
+    except (AttributeError, IndexError):
+        return False
@@ -0,0 +1,129 @@
+"""
+Bounded in-process cache of base64-encoded test images.
+
+The perception runners send the same PNG for retries and for every model
+under test. Encoding once per process (per file version) keeps CPU and file
+reads out of the request path. With a ResizePolicy the image is first
+resized to the model's pixel budget (see shared/resize.py) and with a
+TranscodeConfig re-encoded (see shared/transcode.py); both happen once and
+the resulting payload is cached.
+
+Usage:
+    from shared.image_cache import encode_image_base64, encode_image_data_url
+
+    b64 = encode_image_base64("chess_density_test/low/test_000.png")
+    url = encode_image_data_url("chess_density_test/low/test_000.png", transcode, resize)
+"""
+
+import base64
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from shared.resize import ResizePolicy, resize_image
+from shared.transcode import TranscodeConfig, transcode_image
+
+
+class Base64ImageCache:
+    """LRU cache of (media type, base64) payloads keyed by (path, mtime, size, transcode, resize)."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+        # sha256 of every resized or transcoded payload -> sha256 of its source file
+        self.source_digests: Dict[str, str] = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, image_path: str) -> str:
+        """Return the base64 encoding of an image file."""
+        return self.get_payload(image_path)[1]
+
+    def get_payload(self, image_path: str, transcode: Optional[TranscodeConfig] = None,
+                    resize: Optional[ResizePolicy] = None) -> Tuple[str, str]:
+        """Return (media type, base64) of an image file, resized and transcoded when configured."""
+        st = os.stat(image_path)
+        key = (os.path.abspath(image_path), st.st_mtime_ns, st.st_size, transcode, resize)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        with open(image_path, "rb") as f:
+            raw = f.read()
+        payload, media_type = raw, "image/png"
+        if resize is not None:
+            payload = resize_image(payload, resize)
+        if transcode is not None:
+            payload, media_type = transcode_image(payload, transcode)
+        entry = (media_type, base64.b64encode(payload).decode("utf-8"))
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = entry
+                self.current_bytes += len(entry[1])
+                if transcode is not None or resize is not None:
+                    self.bytes_before += len(raw)
+                    self.bytes_after += len(payload)
+                    if payload is not raw:
+                        self.source_digests[hashlib.sha256(payload).hexdigest()] = \
+                            hashlib.sha256(raw).hexdigest()
+                while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.current_bytes -= len(evicted[1])
+                    self.evictions += 1
+        return entry
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and memory usage."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes_before_transcode": self.bytes_before,
+                "bytes_after_transcode": self.bytes_after,
+            }
+
+
+# Shared by all runners in the process
+IMAGE_CACHE = Base64ImageCache()
+
+
+def encode_image_base64(image_path: str) -> str:
+    """Encode image to base64, reusing the cached encoding when unchanged."""
+    return IMAGE_CACHE.get(str(image_path))
+
+
+def encode_image_data_url(image_path: str, transcode: Optional[TranscodeConfig] = None,
+                          resize: Optional[ResizePolicy] = None) -> str:
+    """Data URL of an image for an image_url content part, resized and transcoded when configured."""
+    media_type, encoded = IMAGE_CACHE.get_payload(str(image_path), transcode, resize)
+    return f"data:{media_type};base64,{encoded}"
+
+
+def source_digest(payload_digest: str) -> str:
+    """sha256 of the file a sent payload was made from (itself when sent unchanged)."""
+    return IMAGE_CACHE.source_digests.get(payload_digest, payload_digest)
+
+
+def format_payload_savings() -> Optional[str]:
+    """One-line resize/transcode saving such as '263 KB -> 132 KB (50% smaller)', None if unused."""
+    before, after = IMAGE_CACHE.bytes_before, IMAGE_CACHE.bytes_after
+    if not before:
+        return None
+    return f"{before / 1024:,.0f} KB -> {after / 1024:,.0f} KB ({(1 - after / before) * 100:.0f}% smaller)"
@@ -3,72 +3,158 @@ Unified model configurations for all perception tests.
 
 All test runners can import and use MODEL_CONFIGS from this module.
 
-IMPORTANT: Before using, replace "YOUR_API_KEY_HERE" with your actual API keys
-for the respective services (Alibaba DashScope, Google, Zhipu AI).
+IMPORTANT: Before using, set DASHSCOPE_API_KEY, GOOGLE_API_KEY or
+ZHIPUAI_API_KEY (environment or .env), or replace "YOUR_API_KEY_HERE" with
+your actual API keys for the respective services (Alibaba DashScope,
+Google, Zhipu AI).
+
+"pricing" is USD per million tokens (input, output, optional cached_input)
+and is used for the cost figures in the reports (see shared/usage.py).
+Check the providers' pricing pages; entries without it are reported
+without cost.
+
+"resize" names the provider's server-side resize rule (see
+shared/resize.py: RESIZE_POLICIES, or a dict of ResizePolicy fields); the
+runners apply it locally before upload so unused pixels are not sent.
+Leave it out (or None) to send images at their stored size.
+
+"reasoning": True marks models that think before answering; their output
+budget gets extra room for it (see shared/generation.py).
+
+"api_key_env" names the environment variable that, when set, overrides
+"api_key". Entries for new endpoints can also be added
+without editing this file: point VLM_MODEL_CONFIGS at a JSON file of
+{model_key: entry} (see shared/providers.py).
+
+The runners send their instruction inline, ahead of the image, as the
+tests define it. "system_role": True opts a model in to receiving it as a
+system message instead, a prefix providers can cache (see
+shared/prompting.py); Gemma entries pin False as their API rejects it.
 """
 
+from shared.providers import extra_model_configs
+
 MODEL_CONFIGS = {
     # Qwen3-VL models (Alibaba DashScope)
     "qwen3-vl-8b": {
         "api_key": "YOUR_API_KEY_HERE",
         "base_url": "https://dashscope-intl.aliyuncs.com/compatible-mode/v1",
+        "api_key_env": "DASHSCOPE_API_KEY",
         "model_name": "qwen3-vl-8b-instruct",
+        "resize": "qwen3-vl",
+        "pricing": {"input": 0.08, "output": 0.50},
     },
     "qwen3-vl-8b-thinking": {
         "api_key": "YOUR_API_KEY_HERE",
         "base_url": "https://dashscope-intl.aliyuncs.com/compatible-mode/v1",
+        "api_key_env": "DASHSCOPE_API_KEY",
         "model_name": "qwen3-vl-8b-thinking",
+        "reasoning": True,
+        "resize": "qwen3-vl",
+        "pricing": {"input": 0.08, "output": 2.00},
     },
     "qwen3-vl-30b": {
         "api_key": "YOUR_API_KEY_HERE",
         "base_url": "https://dashscope-intl.aliyuncs.com/compatible-mode/v1",
+        "api_key_env": "DASHSCOPE_API_KEY",
         "model_name": "qwen3-vl-30b-a3b-instruct",
+        "resize": "qwen3-vl",
+        "pricing": {"input": 0.20, "output": 0.70},
     },
     "qwen3-vl-30b-a3b-instruct": {
         "api_key": "YOUR_API_KEY_HERE",
         "base_url": "https://dashscope-intl.aliyuncs.com/compatible-mode/v1",
+        "api_key_env": "DASHSCOPE_API_KEY",
         "model_name": "qwen3-vl-30b-a3b-instruct",
+        "resize": "qwen3-vl",
+        "pricing": {"input": 0.20, "output": 0.70},
     },
     "qwen3-vl-235b": {
         "api_key": "YOUR_API_KEY_HERE",
         "base_url": "https://dashscope-intl.aliyuncs.com/compatible-mode/v1",
+        "api_key_env": "DASHSCOPE_API_KEY",
         "model_name": "qwen3-vl-235b-a22b-instruct",
+        "resize": "qwen3-vl",
+        "pricing": {"input": 0.30, "output": 1.50},
     },
     "qwen3-vl-plus": {
         "api_key": "YOUR_API_KEY_HERE",
         "base_url": "https://dashscope-intl.aliyuncs.com/compatible-mode/v1",
+        "api_key_env": "DASHSCOPE_API_KEY",
         "model_name": "qwen3-vl-plus",
+        "resize": "qwen3-vl",
+        "pricing": {"input": 0.20, "output": 1.60, "cached_input": 0.04},
     },
     # Google models (Gemini/Gemma)
     "gemma3": {
         "api_key": "YOUR_API_KEY_HERE",
         "base_url": "https://generativelanguage.googleapis.com/v1beta/openai/",
+        "api_key_env": "GOOGLE_API_KEY",
         "model_name": "gemma-3-27b-it",
+        "resize": "gemma3",
+        "system_role": False,
+        "pricing": {"input": 0.0, "output": 0.0},
     },
     "gemma-3-27b": {
         "api_key": "YOUR_API_KEY_HERE",
         "base_url": "https://generativelanguage.googleapis.com/v1beta/openai/",
+        "api_key_env": "GOOGLE_API_KEY",
         "model_name": "gemma-3-27b-it",
+        "resize": "gemma3",
+        "system_role": False,
+        "pricing": {"input": 0.0, "output": 0.0},
     },
     "gemini-2.5-flash-lite": {
         "api_key": "YOUR_API_KEY_HERE",
         "base_url": "https://generativelanguage.googleapis.com/v1beta/openai/",
+        "api_key_env": "GOOGLE_API_KEY",
         "model_name": "gemini-2.5-flash-lite",
+        "resize": "gemini",
+        "pricing": {"input": 0.10, "output": 0.40, "cached_input": 0.025},
     },
     "gemini-3-pro-preview": {
         "api_key": "YOUR_API_KEY_HERE",
         "base_url": "https://generativelanguage.googleapis.com/v1beta/openai/",
+        "api_key_env": "GOOGLE_API_KEY",
         "model_name": "gemini-3-pro-preview",
+        "reasoning": True,
+        "resize": "gemini",
+        "pricing": {"input": 2.00, "output": 12.00, "cached_input": 0.20},
     },
     # GLM models (Zhipu AI)
     "glm4v-thinking": {
         "api_key": "YOUR_API_KEY_HERE",
         "base_url": "https://open.bigmodel.cn/api/paas/v4/",
+        "api_key_env": "ZHIPUAI_API_KEY",
         "model_name": "glm-4.1v-thinking-flash",
+        "reasoning": True,
+        "resize": "glm-4v",
+        "pricing": {"input": 0.0, "output": 0.0},
     },
     "glm-4.5v": {
         "api_key": "YOUR_API_KEY_HERE",
         "base_url": "https://open.bigmodel.cn/api/paas/v4/",
+        "api_key_env": "ZHIPUAI_API_KEY",
         "model_name": "glm-4.5v",
+        "reasoning": True,
+        "resize": "glm-4v",
+        "pricing": {"input": 0.60, "output": 1.80, "cached_input": 0.11},
+    },
+    # Offline simulator (no API calls), see shared/dummy_client.py
+    "dummy": {
+        "provider": "dummy",
+        "api_key": "",
+        "base_url": "",
+        "model_name": "dummy",
+        "options": {
+            "error_rate": 0.05,     # probability that a matrix cell is wrong
+            "latency": 0.0,         # median seconds per request (lognormal)
+            "rate_429": 0.0,
+            "rate_500": 0.0,
+            "timeout_rate": 0.0,
+            "seed": 42,
+        },
     },
 }
+
+MODEL_CONFIGS.update(extra_model_configs())
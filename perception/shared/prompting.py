@@ -0,0 +1,33 @@
+"""
+Prefix-cache-friendly message layout for the perception runners.
+
+Every runner sends the same long instruction with each board image. By
+default it goes inline, ahead of the image, in one user message, as the
+tests define it. A MODEL_CONFIGS entry with "system_role": True opts in to
+sending it as a leading system message instead: the same text, now an
+identical request prefix that providers with prompt caching (DashScope,
+Gemini, OpenAI-compatible servers with prefix caching) can serve from
+cache. The message layout differs, so compare accuracy against an inline
+run first. Cache hits show up as cached_tokens in the usage reports.
+
+Models whose API rejects the system role (Gemma on the Google endpoint)
+keep "system_role": False.
+
+Usage:
+    from shared.prompting import build_messages
+
+    messages = build_messages(self.system_instruction, image_url, self.system_role)
+"""
+
+from typing import Dict, List
+
+
+def build_messages(instruction: str, image_url: str, system_role: bool = False) -> List[Dict]:
+    """Chat messages for one instruction + image request."""
+    image_part = {"type": "image_url", "image_url": {"url": image_url}}
+    if system_role:
+        return [
+            {"role": "system", "content": instruction},
+            {"role": "user", "content": [image_part]},
+        ]
+    return [{"role": "user", "content": [{"type": "text", "text": instruction}, image_part]}]
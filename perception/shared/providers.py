@@ -0,0 +1,110 @@
+"""
+Lazy client registry for the perception runners.
+
+The "provider" of a MODEL_CONFIGS entry (default "openai") names the
+factory that builds its client. Factories are callables or "module:name"
+strings imported on first use, so importing a runner loads neither the
+openai SDK nor the simulator until a client is created. The environment is
+read once per process (.env too, when python-dotenv is installed): entries
+with "api_key_env" take their key from it, and VLM_MODEL_CONFIGS may name a
+JSON file of extra {model_key: entry} configs, so new endpoints plug in
+without editing shared/model_configs.py.
+
+Usage:
+    from shared.providers import create_client, register_provider
+
+    client = create_client(MODEL_CONFIGS["qwen3-vl-8b"])
+    register_provider("my-endpoint", "my_package.clients:make_client")
+"""
+
+import importlib
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Union
+
+_factories: Dict[str, Union[str, Callable]] = {}
+_lock = threading.RLock()
+_env_loaded = False
+
+
+def _openai_client(config: Dict):
+    """OpenAI client on the shared connection pool of the entry's base_url."""
+    from openai import OpenAI
+    from shared.rate_limit import set_budget
+    from shared.transport import TransportConfig, configure_transport, get_http_client
+
+    set_budget(config["api_key"], config.get("rpm"))
+    if config.get("transport"):
+        configure_transport(config["base_url"], TransportConfig(**config["transport"]))
+    return OpenAI(
+        api_key=config["api_key"],
+        base_url=config["base_url"],
+        http_client=get_http_client(config["base_url"]),
+    )
+
+
+def _dummy_client(config: Dict):
+    """Offline simulator answering from the test cases' ground truth."""
+    from shared.dummy_client import DummyOpenAIClient
+
+    return DummyOpenAIClient(**config.get("options", {}))
+
+
+def register_provider(name: str, factory: Union[str, Callable]):
+    """Register a client factory (callable taking the config, or "module:name")."""
+    with _lock:
+        _factories[name] = factory
+
+
+def provider_names() -> List[str]:
+    """Registered provider names."""
+    return list(_factories)
+
+
+def load_env():
+    """Load .env into os.environ once per process (no-op without python-dotenv)."""
+    global _env_loaded
+    with _lock:
+        if _env_loaded:
+            return
+        _env_loaded = True
+        try:
+            from dotenv import load_dotenv
+        except ImportError:
+            return
+        load_dotenv()
+
+
+def extra_model_configs() -> Dict[str, Dict]:
+    """Entries of the VLM_MODEL_CONFIGS JSON file, or {} when it is not set."""
+    load_env()
+    path = os.getenv("VLM_MODEL_CONFIGS")
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def resolve_config(config: Dict) -> Dict:
+    """Config with api_key read from the variable named by "api_key_env", when set."""
+    load_env()
+    api_key = os.getenv(config["api_key_env"]) if config.get("api_key_env") else None
+    return {**config, "api_key": api_key} if api_key else config
+
+
+def create_client(config: Dict):
+    """Client for a MODEL_CONFIGS entry, built by its provider's factory."""
+    name = config.get("provider", "openai")
+    with _lock:
+        if name not in _factories:
+            raise ValueError(f"Unknown provider {name!r}, expected one of {provider_names()}")
+        factory = _factories[name]
+        if isinstance(factory, str):
+            module, _, attribute = factory.partition(":")
+            factory = _factories[name] = getattr(importlib.import_module(module), attribute)
+    return factory(resolve_config(config))
+
+
+register_provider("openai", _openai_client)
+register_provider("dummy", _dummy_client)
@@ -0,0 +1,125 @@
+"""
+Cross-process request budgets for the perception runners.
+
+rule_following's rate limiter can keep its token buckets in a SQLite file
+named by VLM_RATE_LIMIT_DB, so that every process using the same API key
+draws from one budget. When the variable is set, the perception runners
+take part: each runner reserves one request from the bucket of its API key
+before sending a query (throttle), and waits as long as the reservation
+requires. The table layout and key fingerprint match
+rule_following/src/rate_limiter.py.
+
+A MODEL_CONFIGS entry may set "rpm" to define its key's budget. Without it
+the runner follows the budget stored by the other processes, and does not
+wait while no process has set one. Only the request budget is drawn from;
+token budgets are left to the processes that estimate tokens.
+
+Usage:
+    export VLM_RATE_LIMIT_DB=~/.cache/vlm/rate_limits.sqlite
+    python run_tictactoe_reso_tests.py &
+    python run/run_temporal_levels.py --all --model dashscope --rpm 60 &
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, rate REAL, "
+    "capacity REAL, level REAL, updated REAL)"
+)
+
+_budgets: Dict[str, float] = {}
+_local = threading.local()
+_lock = threading.Lock()
+_waits = {"requests": 0, "wait_seconds": 0.0}
+
+
+def api_key_fingerprint(api_key: str) -> str:
+    """Shared budget key of an API key (a hash, so the key is never stored)."""
+    return "key-" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def set_budget(api_key: str, requests_per_minute: Optional[float]):
+    """Requests per minute this process assigns to api_key (None = follow others)."""
+    if api_key and requests_per_minute:
+        with _lock:
+            _budgets[api_key_fingerprint(api_key)] = requests_per_minute
+
+
+def _connection(path: str) -> sqlite3.Connection:
+    """Connection of the calling thread to the store at path."""
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    if path not in connections:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30.0, isolation_level=None)
+        conn.execute(SCHEMA)
+        connections[path] = conn
+    return connections[path]
+
+
+def reserve(api_key: str) -> float:
+    """Take one request from the shared bucket of api_key; returns seconds to wait."""
+    path = os.getenv("VLM_RATE_LIMIT_DB")
+    if not path or not api_key:
+        return 0.0
+    conn = _connection(os.path.abspath(os.path.expanduser(path)))
+    fingerprint = api_key_fingerprint(api_key)
+    key = f"{fingerprint}:requests"
+    rpm = _budgets.get(fingerprint)
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        now = time.time()
+        row = conn.execute(
+            "SELECT rate, capacity, level, updated FROM buckets WHERE key = ?", (key,)
+        ).fetchone()
+        if rpm:
+            # Same default burst as rule_following: 10 seconds' worth
+            rate, capacity = rpm / 60.0, float(max(1, int(rpm / 6)))
+        elif row:
+            rate, capacity = row[0], row[1]
+        else:
+            conn.execute("COMMIT")
+            return 0.0
+        level, updated = (row[2], row[3]) if row else (capacity, now)
+        level = min(capacity, level + max(0.0, now - updated) * rate) - 1
+        conn.execute(
+            "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?, ?)",
+            (key, rate, capacity, level, now),
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return max(0.0, -level / rate)
+
+
+def throttle(api_key: str) -> float:
+    """Block until api_key's shared budget admits one request; returns the wait."""
+    wait = reserve(api_key)
+    with _lock:
+        _waits["requests"] += 1
+        _waits["wait_seconds"] += wait
+    if wait > 0:
+        time.sleep(wait)
+    return wait
+
+
+def rate_limit_stats() -> Dict[str, float]:
+    """Requests throttled in this process and the total seconds waited."""
+    with _lock:
+        return dict(_waits)
+
+
+def format_rate_limit_stats() -> Optional[str]:
+    """One-line summary such as '40 requests, 12.5s waited', None without a shared store."""
+    stats = rate_limit_stats()
+    if not os.getenv("VLM_RATE_LIMIT_DB") or not stats["requests"]:
+        return None
+    return f"{stats['requests']} requests, {stats['wait_seconds']:.1f}s waited"
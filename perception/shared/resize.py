@@ -0,0 +1,134 @@
+"""
+Provider-aware client-side resize to a model's pixel budget.
+
+Qwen-VL, GLM-4V and Gemini/Gemma resize every image server-side to their
+own patch grid before encoding it. Doing the same resize locally (same
+size rule, same resampling filter) before upload gives the model the same
+pixels while sending fewer bytes. Images are only ever shrunk here: when
+the provider would upscale (or keep) an image, it is sent unchanged and
+the server resizes it as before.
+
+The policy is chosen by the "resize" entry of a model's MODEL_CONFIGS
+entry: a name from RESIZE_POLICIES, a dict of ResizePolicy fields
+(optionally with "policy" naming the base policy), or None for no resize.
+Runners where exact pixels are the variable under test (EXACT_PIXEL_SUITES)
+never resize unless asked to explicitly.
+
+Usage:
+    from shared.resize import resolve_resize
+
+    resize = resolve_resize("default", config, "chess_density")
+    url = encode_image_data_url(image_path, transcode, resize)
+"""
+
+import io
+import math
+from dataclasses import dataclass, replace
+from typing import Dict, Optional, Tuple, Union
+
+from PIL import Image
+
+RESAMPLING = {
+    "nearest": Image.NEAREST,
+    "bilinear": Image.BILINEAR,
+    "bicubic": Image.BICUBIC,
+    "lanczos": Image.LANCZOS,
+}
+
+
+@dataclass(frozen=True)
+class ResizePolicy:
+    """Server-side resize rule of a provider."""
+
+    factor: int = 1                   # sides are rounded to a multiple of this (patch x merge size)
+    min_pixels: int = 0
+    max_pixels: Optional[int] = None
+    max_side: Optional[int] = None    # longest side limit, applied before rounding
+    resample: str = "bicubic"
+
+    def __post_init__(self):
+        if self.resample not in RESAMPLING:
+            raise ValueError(f"Unknown resample filter {self.resample!r}, expected one of {tuple(RESAMPLING)}")
+
+    def target_size(self, width: int, height: int) -> Tuple[int, int]:
+        """Size the provider would resize a width x height image to."""
+        if self.max_side and max(width, height) > self.max_side:
+            scale = self.max_side / max(width, height)
+            width, height = max(1, round(width * scale)), max(1, round(height * scale))
+
+        # Qwen-VL smart_resize (also used by the GLM-4V image processor)
+        f = self.factor
+        h_bar = max(f, round(height / f) * f)
+        w_bar = max(f, round(width / f) * f)
+        if self.max_pixels and h_bar * w_bar > self.max_pixels:
+            beta = math.sqrt(height * width / self.max_pixels)
+            h_bar = max(f, math.floor(height / beta / f) * f)
+            w_bar = max(f, math.floor(width / beta / f) * f)
+        elif h_bar * w_bar < self.min_pixels:
+            beta = math.sqrt(self.min_pixels / (height * width))
+            h_bar = math.ceil(height * beta / f) * f
+            w_bar = math.ceil(width * beta / f) * f
+        return w_bar, h_bar
+
+
+# Resize rules by model family. Qwen3-VL: 16 px patches merged 2x2, DashScope
+# default budget of 2560 visual tokens. GLM-4V: 14 px patches merged 2x2,
+# limits of the open-weights image processor. Gemini scales images down to
+# fit 3072 x 3072; Gemma 3 encodes 896 x 896 (bilinear).
+RESIZE_POLICIES = {
+    "qwen3-vl": ResizePolicy(factor=32, min_pixels=4 * 32 * 32, max_pixels=2560 * 32 * 32),
+    "qwen2.5-vl": ResizePolicy(factor=28, min_pixels=4 * 28 * 28, max_pixels=1280 * 28 * 28),
+    "glm-4v": ResizePolicy(factor=28, min_pixels=112 * 112, max_pixels=28 * 28 * 15000),
+    "gemini": ResizePolicy(max_side=3072),
+    "gemma3": ResizePolicy(max_side=896, resample="bilinear"),
+}
+
+# Runners measuring the effect of exact pixels (resolution, patch alignment)
+EXACT_PIXEL_SUITES = {"tictactoe_resolution", "gomoku_patch"}
+
+
+def policy_from_config(value: Union[None, str, Dict, ResizePolicy]) -> Optional[ResizePolicy]:
+    """ResizePolicy for a MODEL_CONFIGS "resize" entry (name, dict of fields or None)."""
+    if value is None or isinstance(value, ResizePolicy):
+        return value
+    if isinstance(value, str):
+        if value not in RESIZE_POLICIES:
+            raise ValueError(f"Unknown resize policy {value!r}, expected one of {tuple(RESIZE_POLICIES)}")
+        return RESIZE_POLICIES[value]
+    fields = dict(value)
+    base = fields.pop("policy", None)
+    return replace(policy_from_config(base), **fields) if base else ResizePolicy(**fields)
+
+
+def resolve_resize(choice, config: Dict, suite: str) -> Optional[ResizePolicy]:
+    """
+    Resize policy for a runner.
+
+    choice is "default" (the model's policy, none for EXACT_PIXEL_SUITES),
+    "model" (the model's policy in every suite), None/"off", a policy name,
+    a dict of fields or a ResizePolicy.
+    """
+    if choice in (None, "off"):
+        return None
+    if choice == "default":
+        return None if suite in EXACT_PIXEL_SUITES else policy_from_config(config.get("resize"))
+    if choice == "model":
+        return policy_from_config(config.get("resize"))
+    return policy_from_config(choice)
+
+
+def resize_image(raw: bytes, policy: ResizePolicy) -> bytes:
+    """PNG bytes resized to the policy's target size, or raw when that would not shrink it."""
+    with Image.open(io.BytesIO(raw)) as image:
+        width, height = image.size
+        target = policy.target_size(width, height)
+        if target[0] * target[1] >= width * height:
+            return raw
+        if image.mode not in ("RGB", "RGBA", "L"):
+            # Palette images would otherwise be resized with nearest neighbour
+            has_alpha = "A" in image.getbands() or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        resized = image.resize(target, RESAMPLING[policy.resample])
+    buffer = io.BytesIO()
+    resized.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
@@ -0,0 +1,124 @@
+"""
+Client-side image transcoding for the perception runners.
+
+Board images can be re-encoded before upload as a lossless WebP, a palette
+PNG or a quality-bounded JPEG; the smaller of the original and the
+transcoded image is sent. By default only the lossless WebP is used, and
+not for the suites where exact pixels are under test (EXACT_PIXEL_SUITES).
+The lossy formats (LOSSY_FORMATS) are used only when a runner is given one
+by name, e.g. transcode="png8"; results whose PSNR against the original
+falls below min_psnr are discarded.
+
+Usage:
+    from shared.transcode import resolve_transcode
+    from shared.image_cache import encode_image_data_url
+
+    transcode = resolve_transcode("default", "chess_density")
+    url = encode_image_data_url("chess_density_test/low/test_000.png", transcode)
+"""
+
+import io
+import math
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from PIL import Image, ImageChops, ImageStat, features
+
+from shared.resize import EXACT_PIXEL_SUITES
+
+FORMATS = ("png8", "webp", "jpeg")
+# Formats that change pixels (palette quantization, JPEG compression)
+LOSSY_FORMATS = ("png8", "jpeg")
+MEDIA_TYPES = {"png8": "image/png", "webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+@dataclass(frozen=True)
+class TranscodeConfig:
+    """Target format and quality bounds."""
+
+    format: str = "png8"
+    colors: int = 256
+    min_psnr: float = 40.0
+    jpeg_qualities: Tuple[int, ...] = (60, 70, 80, 90, 95)
+
+    def __post_init__(self):
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown transcode format {self.format!r}, expected one of {FORMATS}")
+
+
+# Per-runner defaults (None = send the stored PNG). Only lossless WebP is
+# used by default, so the model sees the rendered pixels; the resolution and
+# patch tests leave their images untouched since the exact pixels are part
+# of what they measure.
+TRANSCODE_DEFAULTS = {
+    "chess_density": TranscodeConfig("webp"),
+    "gomoku_density": TranscodeConfig("webp"),
+    "gomoku_patch": None,
+    "gomoku_richness": TranscodeConfig("webp"),
+    "tictactoe_resolution": None,
+}
+
+
+def resolve_transcode(choice, suite: str) -> Optional[TranscodeConfig]:
+    """
+    Config for a runner: "default" (TRANSCODE_DEFAULTS), None/"off", a format name or a TranscodeConfig.
+
+    Naming a lossy format (or passing a TranscodeConfig) is the explicit
+    opt-in to lossy transcoding; "default" never picks one.
+    """
+    if isinstance(choice, TranscodeConfig):
+        return choice
+    if choice in (None, "off"):
+        return None
+    if choice == "default":
+        return None if suite in EXACT_PIXEL_SUITES else TRANSCODE_DEFAULTS.get(suite)
+    return TranscodeConfig(choice)
+
+
+def psnr(original: Image.Image, candidate: Image.Image) -> float:
+    """Peak signal-to-noise ratio in dB (inf for identical images)."""
+    diff = ImageChops.difference(original.convert("RGB"), candidate.convert("RGB"))
+    mse = sum(rms ** 2 for rms in ImageStat.Stat(diff).rms) / 3
+    return math.inf if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def _encode(image: Image.Image, fmt: str, quality: int = 95, colors: int = 256) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "png8":
+        method = Image.Quantize.FASTOCTREE if image.mode == "RGBA" else Image.Quantize.MEDIANCUT
+        image.quantize(colors=colors, method=method).save(buffer, "PNG", optimize=True)
+    elif fmt == "webp":
+        image.save(buffer, "WEBP", lossless=True, quality=100, method=6)
+    else:
+        image.convert("RGB").save(buffer, "JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def transcode_image(raw: bytes, config: TranscodeConfig,
+                    original_media_type: str = "image/png") -> Tuple[bytes, str]:
+    """Re-encode image bytes; returns (payload, media type), the original if it is smaller or better."""
+    if config.format == "webp" and not features.check("webp"):
+        return raw, original_media_type
+
+    with Image.open(io.BytesIO(raw)) as opened:
+        image = opened.convert("RGBA" if "A" in opened.getbands() else "RGB")
+
+    if config.format == "webp":
+        candidates = [_encode(image, "webp")]
+    elif config.format == "png8":
+        candidates = [_encode(image, "png8", colors=config.colors)]
+    elif image.mode == "RGBA":
+        return raw, original_media_type  # JPEG has no alpha channel
+    else:
+        # Lowest quality first: the first one meeting min_psnr is the smallest
+        candidates = (_encode(image, "jpeg", quality) for quality in sorted(config.jpeg_qualities))
+
+    for payload in candidates:
+        if len(payload) >= len(raw):
+            continue
+        if config.format in LOSSY_FORMATS:
+            with Image.open(io.BytesIO(payload)) as decoded:
+                if psnr(image, decoded) < config.min_psnr:
+                    continue
+        return payload, MEDIA_TYPES[config.format]
+    return raw, original_media_type
@@ -0,0 +1,134 @@
+"""
+Shared pooled HTTP transport for the perception runners.
+
+Runners that target the same base_url share one keep-alive httpx client,
+so running several suites (or models on one provider) in a process reuses
+warm TLS connections. Pool size, timeouts and HTTP/2 are configurable.
+
+A MODEL_CONFIGS entry may set "transport" to a dict of TransportConfig
+fields (e.g. {"max_connections": 8, "http2": true}) to size its endpoint's
+pool.
+
+Usage:
+    from shared.providers import create_client
+    from shared.transport import format_transport_stats, transport_stats
+
+    client = create_client(MODEL_CONFIGS["qwen3-vl-8b"])
+    ...
+    report["transport"] = transport_stats()
+    print(f"Connections: {format_transport_stats()}")
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+
+@dataclass(frozen=True)
+class TransportConfig:
+    """Connection pool and timeout settings."""
+
+    max_connections: int = 20
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    connect_timeout: float = 10.0
+    read_timeout: float = 300.0
+    http2: bool = False
+
+
+# Used for endpoints without an explicit config
+DEFAULT_TRANSPORT = TransportConfig()
+
+_configs: Dict[str, TransportConfig] = {}
+_clients: Dict[str, httpx.Client] = {}
+_stats: Dict[str, Dict[str, int]] = {}
+_lock = threading.Lock()
+
+
+def _pool_key(base_url: str) -> str:
+    """scheme://host:port of a base URL (the unit of connection reuse)."""
+    parts = urlsplit(base_url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return f"{parts.scheme}://{parts.hostname}:{port}"
+
+
+def configure_transport(base_url: str, config: TransportConfig):
+    """Set pool settings for an endpoint (before its first client is created)."""
+    with _lock:
+        _configs[_pool_key(base_url)] = config
+
+
+def _count(key: str, counter: str):
+    with _lock:
+        _stats[key][counter] = _stats[key].get(counter, 0) + 1
+
+
+def get_http_client(base_url: str) -> httpx.Client:
+    """Return the shared httpx client for base_url, creating it on first use."""
+    key = _pool_key(base_url)
+    with _lock:
+        if key in _clients:
+            return _clients[key]
+
+        config = _configs.get(key, DEFAULT_TRANSPORT)
+        http2 = config.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("Warning: 'h2' not installed (pip install 'httpx[http2]'), using HTTP/1.1")
+                http2 = False
+
+        def on_request(request: httpx.Request):
+            _count(key, "requests")
+
+            def trace(event_name: str, info: Dict):
+                if event_name == "connection.connect_tcp.complete":
+                    _count(key, "tcp_connects")
+                elif event_name == "connection.start_tls.complete":
+                    _count(key, "tls_handshakes")
+
+            request.extensions["trace"] = trace
+
+        def on_response(response: httpx.Response):
+            _count(key, f"status_{response.status_code}")
+
+        _stats[key] = {"requests": 0, "tcp_connects": 0, "tls_handshakes": 0}
+        _clients[key] = httpx.Client(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                config.read_timeout, connect=config.connect_timeout
+            ),
+            event_hooks={"request": [on_request], "response": [on_response]},
+        )
+        return _clients[key]
+
+
+def transport_stats() -> Dict[str, Dict[str, int]]:
+    """Per-endpoint request, status and connection counters."""
+    with _lock:
+        return {key: dict(counters) for key, counters in _stats.items()}
+
+
+def format_transport_stats() -> Optional[str]:
+    """One line per endpoint such as 'https://api:443 40 requests, 2 TCP / 2 TLS connects', None if unused."""
+    lines = []
+    for key, counters in transport_stats().items():
+        statuses = ", ".join(
+            f"{name.removeprefix('status_')} x{count}"
+            for name, count in sorted(counters.items()) if name.startswith("status_")
+        )
+        line = (
+            f"{key} {counters['requests']} requests, "
+            f"{counters['tcp_connects']} TCP / {counters['tls_handshakes']} TLS connects"
+        )
+        lines.append(f"{line} ({statuses})" if statuses else line)
+    return "; ".join(lines) or None
@@ -0,0 +1,105 @@
+"""
+Token usage and cost accounting for the perception runners.
+
+Each response's usage block is normalized to prompt, completion, reasoning
+and cached token counts and priced with the "pricing" entry (USD per
+million tokens) of the model's MODEL_CONFIGS entry. Reasoning tokens are
+part of completion_tokens and cached tokens part of prompt_tokens, as
+OpenAI-compatible APIs report them. Results with cached tokens count as
+prompt-cache hits; their mean api_time is reported next to the misses'.
+
+Usage:
+    from shared.usage import response_usage, summarize_usage
+
+    usage = response_usage(response, config.get("pricing"))
+    result = {..., "usage": usage}
+    report["token_usage"] = summarize_usage(results)
+"""
+
+from typing import Dict, Iterable, Optional
+
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "reasoning_tokens", "cached_tokens")
+
+
+def _get(obj, key: str):
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(key)
+    return getattr(obj, key, None)
+
+
+def response_usage(response, pricing: Optional[Dict[str, float]] = None) -> Optional[Dict]:
+    """Token counts (and cost_usd when priced) of a chat completion, or None if unreported."""
+    usage = _get(response, "usage")
+    if usage is None:
+        return None
+    counts = {
+        "prompt_tokens": _get(usage, "prompt_tokens"),
+        "completion_tokens": _get(usage, "completion_tokens"),
+        "reasoning_tokens": _get(_get(usage, "completion_tokens_details"), "reasoning_tokens")
+        or _get(usage, "reasoning_tokens"),
+        "cached_tokens": _get(_get(usage, "prompt_tokens_details"), "cached_tokens")
+        or _get(usage, "cached_tokens"),
+    }
+    if counts["prompt_tokens"] is None and counts["completion_tokens"] is None:
+        return None
+    counts = {key: int(value or 0) for key, value in counts.items()}
+    if pricing:
+        counts["cost_usd"] = estimate_cost(counts, pricing)
+    return counts
+
+
+def estimate_cost(usage: Dict[str, int], pricing: Dict[str, float]) -> float:
+    """USD cost of usage given {"input", "output", "cached_input"} prices per million tokens."""
+    cached = usage.get("cached_tokens", 0)
+    uncached = max(0, usage.get("prompt_tokens", 0) - cached)
+    return (uncached * pricing.get("input", 0)
+            + cached * pricing.get("cached_input", pricing.get("input", 0))
+            + usage.get("completion_tokens", 0) * pricing.get("output", 0)) / 1e6
+
+
+def summarize_usage(results: Iterable[Dict]) -> Dict:
+    """Sum the "usage" of runner results; includes per-test means and total cost when priced."""
+    total = {field: 0 for field in USAGE_FIELDS}
+    n_with_usage = 0
+    api_times = {True: [], False: []}  # by prompt-cache hit
+    for result in results:
+        usage = result.get("usage")
+        if not usage:
+            continue
+        n_with_usage += 1
+        for key, value in usage.items():
+            total[key] = total.get(key, 0) + value
+        if result.get("api_time") is not None:
+            api_times[usage.get("cached_tokens", 0) > 0].append(result["api_time"])
+
+    summary = {"n_with_usage": n_with_usage, **total}
+    if "cost_usd" in summary:
+        summary["cost_usd"] = round(summary["cost_usd"], 6)
+    if n_with_usage:
+        summary["mean_prompt_tokens"] = round(total["prompt_tokens"] / n_with_usage, 1)
+        summary["mean_completion_tokens"] = round(total["completion_tokens"] / n_with_usage, 1)
+        summary["cached_token_share"] = round(total["cached_tokens"] / max(1, total["prompt_tokens"]), 4)
+    # Prompt-cache hits and mean API time with / without one, to check prefill savings
+    summary["cache_hits"] = len(api_times[True])
+    for hit, label in ((True, "hit"), (False, "miss")):
+        if api_times[hit]:
+            summary[f"mean_api_time_cache_{label}"] = round(sum(api_times[hit]) / len(api_times[hit]), 3)
+    return summary
+
+
+def format_usage(summary: Dict) -> str:
+    """One-line description such as '12,345 prompt / 678 completion tokens, $0.0123'."""
+    text = (f"{summary.get('prompt_tokens', 0):,} prompt "
+            f"({summary.get('cached_tokens', 0):,} cached) / "
+            f"{summary.get('completion_tokens', 0):,} completion "
+            f"({summary.get('reasoning_tokens', 0):,} reasoning) tokens")
+    if "cost_usd" in summary:
+        text += f", ${summary['cost_usd']:.4f}"
+    if summary.get("cache_hits"):
+        text += f", {summary['cache_hits']}/{summary.get('n_with_usage', 0)} prompt-cache hits"
+        if "mean_api_time_cache_miss" in summary:
+            text += (f" ({summary['mean_api_time_cache_hit']:.2f}s vs "
+                     f"{summary['mean_api_time_cache_miss']:.2f}s uncached)")
+    return text
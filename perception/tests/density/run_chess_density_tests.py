@@ -3,15 +3,22 @@ import re
 import numpy as np
 from pathlib import Path
 from typing import Dict, List
-from openai import OpenAI
 import sys
 import time
 from datetime import datetime
-import base64
 
 # Import shared model configurations
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from shared.model_configs import MODEL_CONFIGS
+from shared.image_cache import encode_image_base64, encode_image_data_url, format_payload_savings
+from shared.generation import GENERATION_BUDGETS, is_truncated
+from shared.prompting import build_messages
+from shared.resize import resolve_resize
+from shared.transcode import resolve_transcode
+from shared.providers import create_client
+from shared.rate_limit import format_rate_limit_stats, rate_limit_stats, throttle
+from shared.transport import format_transport_stats, transport_stats
+from shared.usage import format_usage, response_usage, summarize_usage
 
 
 class ChessDensityTestRunner:
@@ -25,6 +32,8 @@ class ChessDensityTestRunner:
         test_dir="chess_density_test",
         output_dir="chess_density_test/results",
         model_key="qwen3-vl-8b",
+        transcode="default",
+        resize="default",
     ):
         self.test_dir = Path(test_dir)
         self.output_dir = Path(output_dir)
@@ -36,11 +45,15 @@ class ChessDensityTestRunner:
         config = MODEL_CONFIGS[model_key]
         self.model_key = model_key
         self.model_name = config["model_name"]
+        self.pricing = config.get("pricing")
+        self.system_role = config.get("system_role", False)
+        self.generation = GENERATION_BUDGETS["chess_density"].for_model(config)
+        self.transcode = resolve_transcode(transcode, "chess_density")
+        self.resize = resolve_resize(resize, config, "chess_density")
 
-        self.client = OpenAI(
-            api_key=config["api_key"],
-            base_url=config["base_url"],
-        )
+        self.client = create_client(config)
+        # Key of the shared cross-process request budget (shared/rate_limit.py)
+        self.api_key = getattr(self.client, "api_key", None)
 
         self.log_dir = self.output_dir / "logs"
         self.log_dir.mkdir(exist_ok=True)
@@ -73,8 +86,7 @@ class ChessDensityTestRunner:
 
     def encode_image(self, image_path: str) -> str:
         """Encode image to base64."""
-        with open(image_path, "rb") as f:
-            return base64.b64encode(f.read()).decode("utf-8")
+        return encode_image_base64(image_path)
 
     def run_single_test(self, test_file: Path) -> Dict:
         """Run a single test and return results."""
@@ -83,34 +95,23 @@ class ChessDensityTestRunner:
 
         image_path = test_case["image_file"]
 
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": self.system_instruction},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{self.encode_image(image_path)}"
-                        },
-                    },
-                ],
-            }
-        ]
+        image_url = encode_image_data_url(image_path, self.transcode, self.resize)
+        messages = build_messages(self.system_instruction, image_url, self.system_role)
 
+        throttle(self.api_key)
         start_time = time.time()
 
         try:
             response = self.client.chat.completions.create(
                 model=self.model_name,
                 messages=messages,
-                max_tokens=4096,
-                temperature=0.0,
+                **self.generation.to_params(),
             )
 
             model_output = response.choices[0].message.content
+            truncated = is_truncated(response)
+            usage = response_usage(response, self.pricing)
             api_time = time.time() - start_time
-            time.sleep(1.5)
 
         except Exception as e:
             return {
@@ -151,6 +152,8 @@ class ChessDensityTestRunner:
             "ground_truth": ground_truth,
             "raw_output": model_output,
             "api_time": api_time,
+            "truncated": truncated,
+            "usage": usage,
         }
 
     def _parse_output(self, output: str) -> List[List[int]]:
@@ -417,6 +420,9 @@ class ChessDensityTestRunner:
             "model_key": self.model_key,
             "model_name": self.model_name,
             "timestamp": datetime.now().isoformat(),
+            "token_usage": summarize_usage(r for results in all_results.values() for r in results),
+            "transport": transport_stats(),
+            "rate_limit": rate_limit_stats(),
             "density_levels": {},
         }
 
@@ -449,6 +455,8 @@ class ChessDensityTestRunner:
 
             report["density_levels"][density] = {
                 "n_tests": len(valid_results),
+                "n_truncated": sum(1 for r in results if r.get("truncated")),
+                "token_usage": summarize_usage(results),
                 "avg_density": float(avg_density),
                 "avg_pieces": float(avg_pieces),
                 # Standard metrics
@@ -506,6 +514,17 @@ class ChessDensityTestRunner:
         print(f"CHESS DENSITY DIAGNOSTIC TEST SUMMARY")
         print(f"Model: {report['model_name']} ({report['model_key']})")
         print(f"{'='*80}\n")
+        print(f"Tokens: {format_usage(report['token_usage'])}")
+        savings = format_payload_savings()
+        if savings:
+            print(f"Image payloads: {savings}")
+        connections = format_transport_stats()
+        if connections:
+            print(f"Connections: {connections}")
+        waits = format_rate_limit_stats()
+        if waits:
+            print(f"Shared rate limit: {waits}")
+        print()
 
         # Table 1: Standard Metrics
         print("TABLE 1: STANDARD METRICS (Per-Square Accuracy)")
@@ -3,7 +3,6 @@ import re
 import numpy as np
 from pathlib import Path
 from typing import Dict, List
-from openai import OpenAI
 import sys
 import time
 from datetime import datetime
@@ -12,6 +11,15 @@ import base64
 # Import shared model configurations
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from shared.model_configs import MODEL_CONFIGS
+from shared.image_cache import encode_image_base64, encode_image_data_url, format_payload_savings
+from shared.generation import GENERATION_BUDGETS, is_truncated
+from shared.prompting import build_messages
+from shared.resize import resolve_resize
+from shared.transcode import resolve_transcode
+from shared.providers import create_client
+from shared.rate_limit import format_rate_limit_stats, rate_limit_stats, throttle
+from shared.transport import format_transport_stats, transport_stats
+from shared.usage import format_usage, response_usage, summarize_usage
 
 
 class GomokuDensityTestRunner:
@@ -25,6 +33,8 @@ class GomokuDensityTestRunner:
         test_dir="gomoku_density_test",
         output_dir="gomoku_density_test/results",
         model_key="qwen3-vl-8b",
+        transcode="default",
+        resize="default",
     ):
         self.test_dir = Path(test_dir)
         self.output_dir = Path(output_dir)
@@ -36,11 +46,15 @@ class GomokuDensityTestRunner:
         config = MODEL_CONFIGS[model_key]
         self.model_key = model_key
         self.model_name = config["model_name"]
+        self.pricing = config.get("pricing")
+        self.system_role = config.get("system_role", False)
+        self.generation = GENERATION_BUDGETS["gomoku_density"].for_model(config)
+        self.transcode = resolve_transcode(transcode, "gomoku_density")
+        self.resize = resolve_resize(resize, config, "gomoku_density")
 
-        self.client = OpenAI(
-            api_key=config["api_key"],
-            base_url=config["base_url"],
-        )
+        self.client = create_client(config)
+        # Key of the shared cross-process request budget (shared/rate_limit.py)
+        self.api_key = getattr(self.client, "api_key", None)
 
         self.log_dir = self.output_dir / "logs"
         self.log_dir.mkdir(exist_ok=True)
@@ -75,8 +89,7 @@ class GomokuDensityTestRunner:
 
     def encode_image(self, image_path: str) -> str:
         """Encode image to base64."""
-        with open(image_path, "rb") as f:
-            return base64.b64encode(f.read()).decode("utf-8")
+        return encode_image_base64(image_path)
 
     def run_single_test(self, test_file: Path) -> Dict:
         """Run a single test and return results."""
@@ -85,32 +98,22 @@ class GomokuDensityTestRunner:
 
         image_path = test_case["image_file"]
 
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": self.system_instruction},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{self.encode_image(image_path)}"
-                        },
-                    },
-                ],
-            }
-        ]
+        image_url = encode_image_data_url(image_path, self.transcode, self.resize)
+        messages = build_messages(self.system_instruction, image_url, self.system_role)
 
+        throttle(self.api_key)
         start_time = time.time()
 
         try:
             response = self.client.chat.completions.create(
                 model=self.model_name,
                 messages=messages,
-                max_tokens=4096,
-                temperature=0.0,
+                **self.generation.to_params(),
             )
 
             model_output = response.choices[0].message.content
+            truncated = is_truncated(response)
+            usage = response_usage(response, self.pricing)
             api_time = time.time() - start_time
             time.sleep(1.5)
 
@@ -149,6 +152,8 @@ class GomokuDensityTestRunner:
             "ground_truth": ground_truth,
             "raw_output": model_output,
             "api_time": api_time,
+            "truncated": truncated,
+            "usage": usage,
         }
 
     def _parse_output(self, output: str) -> List[List[int]]:
@@ -327,6 +332,9 @@ class GomokuDensityTestRunner:
             "model_key": self.model_key,
             "model_name": self.model_name,
             "timestamp": datetime.now().isoformat(),
+            "token_usage": summarize_usage(r for results in all_results.values() for r in results),
+            "transport": transport_stats(),
+            "rate_limit": rate_limit_stats(),
             "density_levels": {},
         }
 
@@ -354,6 +362,8 @@ class GomokuDensityTestRunner:
 
             report["density_levels"][density] = {
                 "n_tests": len(valid_results),
+                "n_truncated": sum(1 for r in results if r.get("truncated")),
+                "token_usage": summarize_usage(results),
                 "avg_density": float(avg_density),
                 "avg_pieces": float(avg_pieces),
                 # Standard metrics
@@ -396,6 +406,17 @@ class GomokuDensityTestRunner:
         print(f"DENSITY DIAGNOSTIC TEST SUMMARY")
         print(f"Model: {report['model_name']} ({report['model_key']})")
         print(f"{'='*80}\n")
+        print(f"Tokens: {format_usage(report['token_usage'])}")
+        savings = format_payload_savings()
+        if savings:
+            print(f"Image payloads: {savings}")
+        connections = format_transport_stats()
+        if connections:
+            print(f"Connections: {connections}")
+        waits = format_rate_limit_stats()
+        if waits:
+            print(f"Shared rate limit: {waits}")
+        print()
 
         # Table 1: Standard Metrics (Per-Class Breakdown)
         print("TABLE 1: STANDARD METRICS (Per-Class Accuracy)")
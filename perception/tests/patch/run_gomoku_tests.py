@@ -2,18 +2,25 @@ import json
 import re
 import numpy as np
 from pathlib import Path
-from typing import Dict, List, Tuple
-from openai import OpenAI
+from typing import Dict, List, Tuple, Optional
 from collections import Counter, defaultdict
 import os
 import sys
 import time
 from datetime import datetime
-import base64
 
 # Import shared model configurations
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from shared.model_configs import MODEL_CONFIGS
+from shared.image_cache import encode_image_base64, encode_image_data_url, format_payload_savings
+from shared.generation import GENERATION_BUDGETS, is_truncated
+from shared.prompting import build_messages
+from shared.resize import resolve_resize
+from shared.transcode import resolve_transcode
+from shared.providers import create_client
+from shared.rate_limit import format_rate_limit_stats, rate_limit_stats, throttle
+from shared.transport import format_transport_stats, transport_stats
+from shared.usage import format_usage, response_usage, summarize_usage
 
 
 class GomokuPatchTestRunner:
@@ -25,6 +32,8 @@ class GomokuPatchTestRunner:
         test_dir="gomoku_patch_tests",
         output_dir="gomoku_patch_tests/results",
         model_key="qwen3-vl-8b",
+        transcode="default",
+        resize="default",
     ):
         self.test_dir = Path(test_dir)
         self.output_dir = Path(output_dir)
@@ -40,12 +49,16 @@ class GomokuPatchTestRunner:
         config = MODEL_CONFIGS[model_key]
         self.model_key = model_key
         self.model_name = config["model_name"]
+        self.pricing = config.get("pricing")
+        self.system_role = config.get("system_role", False)
+        self.generation = GENERATION_BUDGETS["gomoku_patch"].for_model(config)
+        self.transcode = resolve_transcode(transcode, "gomoku_patch")
+        self.resize = resolve_resize(resize, config, "gomoku_patch")
 
         # Initialize API client
-        self.client = OpenAI(
-            api_key=config["api_key"],
-            base_url=config["base_url"],
-        )
+        self.client = create_client(config)
+        # Key of the shared cross-process request budget (shared/rate_limit.py)
+        self.api_key = getattr(self.client, "api_key", None)
 
         # Create log directory
         self.log_dir = self.output_dir / "logs"
@@ -53,14 +66,13 @@ class GomokuPatchTestRunner:
 
     def encode_image(self, image_path: str) -> str:
         """Encode image to base64 for API."""
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode("utf-8")
+        return encode_image_base64(image_path)
 
     def run_single_test(
         self,
         test_file: Path,
-        max_tokens: int = 2048,
-        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
     ) -> Dict:
         """Run a single test and return detailed results."""
         with open(test_file) as f:
@@ -70,21 +82,17 @@ class GomokuPatchTestRunner:
         image_path = test_case["image_file"]
 
         # Prepare messages with image
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": test_case["prompt"]},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{self.encode_image(image_path)}"
-                        },
-                    },
-                ],
-            }
-        ]
+        image_url = encode_image_data_url(image_path, self.transcode, self.resize)
+        messages = build_messages(test_case["prompt"], image_url, self.system_role)
+
+        # Runner budget, with optional per-call overrides
+        params = self.generation.to_params()
+        if max_tokens is not None:
+            params["max_tokens"] = max_tokens
+        if temperature is not None:
+            params["temperature"] = temperature
 
+        throttle(self.api_key)
         # Record start time
         start_time = time.time()
 
@@ -93,11 +101,12 @@ class GomokuPatchTestRunner:
             response = self.client.chat.completions.create(
                 model=self.model_name,
                 messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
+                **params,
             )
 
             model_output = response.choices[0].message.content
+            truncated = is_truncated(response)
+            usage = response_usage(response, self.pricing)
             api_time = time.time() - start_time
 
         except Exception as e:
@@ -125,6 +134,8 @@ class GomokuPatchTestRunner:
             "ground_truth": ground_truth,
             "raw_output": model_output,
             "api_time": api_time,
+            "truncated": truncated,
+            "usage": usage,
             "statistics": test_case["statistics"],
         }
 
@@ -319,6 +330,9 @@ class GomokuPatchTestRunner:
             "model_key": self.model_key,
             "model_name": self.model_name,
             "timestamp": datetime.now().isoformat(),
+            "token_usage": summarize_usage(r for results in all_results.values() for r in results),
+            "transport": transport_stats(),
+            "rate_limit": rate_limit_stats(),
             "conditions": {},
         }
 
@@ -334,6 +348,8 @@ class GomokuPatchTestRunner:
 
             condition_stats = {
                 "n_tests": len(results),
+                "n_truncated": sum(1 for r in results if r.get("truncated")),
+                "token_usage": summarize_usage(results),
                 "n_valid": len(valid_results),
                 "n_errors": len(results) - len(valid_results),
                 "mean_accuracy": np.mean(accuracies),
@@ -434,6 +450,17 @@ class GomokuPatchTestRunner:
         print(f"Model: {report['model_name']} ({report['model_key']})")
         print(f"Timestamp: {report['timestamp']}")
         print(f"{'='*80}\n")
+        print(f"Tokens: {format_usage(report['token_usage'])}")
+        savings = format_payload_savings()
+        if savings:
+            print(f"Image payloads: {savings}")
+        connections = format_transport_stats()
+        if connections:
+            print(f"Connections: {connections}")
+        waits = format_rate_limit_stats()
+        if waits:
+            print(f"Shared rate limit: {waits}")
+        print()
 
         # Condition results table
         print(
@@ -2,18 +2,25 @@ import json
 import re
 import numpy as np
 from pathlib import Path
-from typing import Dict, List
-from openai import OpenAI
+from typing import Dict, List, Optional
 from collections import defaultdict
 import os
 import sys
 import time
 from datetime import datetime
-import base64
 
 # Import shared model configurations
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from shared.model_configs import MODEL_CONFIGS
+from shared.image_cache import encode_image_base64, encode_image_data_url, format_payload_savings
+from shared.generation import GENERATION_BUDGETS, is_truncated
+from shared.prompting import build_messages
+from shared.resize import resolve_resize
+from shared.transcode import resolve_transcode
+from shared.providers import create_client
+from shared.rate_limit import format_rate_limit_stats, rate_limit_stats, throttle
+from shared.transport import format_transport_stats, transport_stats
+from shared.usage import format_usage, response_usage, summarize_usage
 
 
 class GomokuVisualRichnessTestRunner:
@@ -27,6 +34,8 @@ class GomokuVisualRichnessTestRunner:
         test_dir="gomoku_visual_richness_tests",
         output_dir="gomoku_visual_richness_tests/results",
         model_key="glm4v-thinking",  # Default model
+        transcode="default",
+        resize="default",
     ):
         self.test_dir = Path(test_dir)
         self.output_dir = Path(output_dir)
@@ -42,12 +51,16 @@ class GomokuVisualRichnessTestRunner:
         config = MODEL_CONFIGS[model_key]
         self.model_key = model_key
         self.model_name = config["model_name"]
+        self.pricing = config.get("pricing")
+        self.system_role = config.get("system_role", False)
+        self.generation = GENERATION_BUDGETS["gomoku_richness"].for_model(config)
+        self.transcode = resolve_transcode(transcode, "gomoku_richness")
+        self.resize = resolve_resize(resize, config, "gomoku_richness")
 
         # Initialize API client
-        self.client = OpenAI(
-            api_key=config["api_key"],
-            base_url=config["base_url"],
-        )
+        self.client = create_client(config)
+        # Key of the shared cross-process request budget (shared/rate_limit.py)
+        self.api_key = getattr(self.client, "api_key", None)
 
         # Create log directory
         self.log_dir = self.output_dir / "logs"
@@ -83,14 +96,13 @@ class GomokuVisualRichnessTestRunner:
 
     def encode_image(self, image_path: str) -> str:
         """Encode image to base64 for API."""
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode("utf-8")
+        return encode_image_base64(image_path)
 
     def run_single_test(
         self,
         test_file: Path,
-        max_tokens: int = 4096,
-        temperature: float = 0.0,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
     ) -> Dict:
         """Run a single test and return detailed results."""
         with open(test_file) as f:
@@ -100,21 +112,17 @@ class GomokuVisualRichnessTestRunner:
         image_path = test_case["image_file"]
 
         # Prepare messages with image
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": self.system_instruction},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{self.encode_image(image_path)}"
-                        },
-                    },
-                ],
-            }
-        ]
+        image_url = encode_image_data_url(image_path, self.transcode, self.resize)
+        messages = build_messages(self.system_instruction, image_url, self.system_role)
+
+        # Runner budget, with optional per-call overrides
+        params = self.generation.to_params()
+        if max_tokens is not None:
+            params["max_tokens"] = max_tokens
+        if temperature is not None:
+            params["temperature"] = temperature
 
+        throttle(self.api_key)
         # Record start time
         start_time = time.time()
 
@@ -123,11 +131,12 @@ class GomokuVisualRichnessTestRunner:
             response = self.client.chat.completions.create(
                 model=self.model_name,
                 messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
+                **params,
             )
 
             model_output = response.choices[0].message.content
+            truncated = is_truncated(response)
+            usage = response_usage(response, self.pricing)
             api_time = time.time() - start_time
             time.sleep(1.5)  # Rate limiting
 
@@ -157,6 +166,8 @@ class GomokuVisualRichnessTestRunner:
             "ground_truth": ground_truth,
             "raw_output": model_output,
             "api_time": api_time,
+            "truncated": truncated,
+            "usage": usage,
             "statistics": test_case["statistics"],
         }
 
@@ -345,6 +356,9 @@ class GomokuVisualRichnessTestRunner:
             "model_key": self.model_key,
             "model_name": self.model_name,
             "timestamp": datetime.now().isoformat(),
+            "token_usage": summarize_usage(r for results in all_results.values() for r in results),
+            "transport": transport_stats(),
+            "rate_limit": rate_limit_stats(),
             "board_size": metadata["board_size"],
             "resolution": metadata["resolution"],
             "board_to_image_ratio": metadata["board_to_image_ratio"],
@@ -365,6 +379,8 @@ class GomokuVisualRichnessTestRunner:
             style_stats = {
                 "style": style_name,
                 "n_tests": len(results),
+                "n_truncated": sum(1 for r in results if r.get("truncated")),
+                "token_usage": summarize_usage(results),
                 "n_valid": len(valid_results),
                 "n_errors": len(results) - len(valid_results),
                 "mean_accuracy": np.mean(accuracies),
@@ -453,6 +469,17 @@ class GomokuVisualRichnessTestRunner:
         print(f"Average density: {report['density_statistics']['average_density']:.1%}")
         print(f"Timestamp: {report['timestamp']}")
         print(f"{'='*80}\n")
+        print(f"Tokens: {format_usage(report['token_usage'])}")
+        savings = format_payload_savings()
+        if savings:
+            print(f"Image payloads: {savings}")
+        connections = format_transport_stats()
+        if connections:
+            print(f"Connections: {connections}")
+        waits = format_rate_limit_stats()
+        if waits:
+            print(f"Shared rate limit: {waits}")
+        print()
 
         # Results table
         print(
@@ -3,7 +3,7 @@ Run Condition Test 1
 Tests threat counting - count how many pieces can attack a target
 """
 
-from src.model_client import DummyModelClient, DashScopeModelClient, NovitaModelClient, XAIModelClient
+from src.providers import get_provider
 from src.condition.condition_test_1 import ConditionTest1
 import sys
 import os
@@ -31,9 +31,10 @@ def main():
 
     N_CASES_PER_LEVEL = 3      # Number of cases per level (1-6)
     SEED = 57                    # Random seed for reproducibility
-    MODEL_TYPE = "dashscope"        # Options: "dummy", "dashscope", "novita", "xai"
-    RATE_LIMIT_REQUESTS = 0      # Number of requests before pausing
-    RATE_LIMIT_PAUSE = 0         # Pause duration in seconds
+    MODEL_TYPE = "dashscope"        # "dummy", "dashscope", "novita", "xai", "sf", "google" (src/providers.py)
+    RATE_LIMIT_REQUESTS = 0      # Requests allowed per pause window
+    RATE_LIMIT_PAUSE = 0         # Window length in seconds
+    MAX_CONCURRENCY = 1          # Model queries in flight (1 = sequential)
 
     # ===== Setup Test =====
 
@@ -43,7 +44,8 @@ def main():
         seed=SEED,
         auto_timestamp=True,
         rate_limit_requests=RATE_LIMIT_REQUESTS,
-        rate_limit_pause=RATE_LIMIT_PAUSE
+        rate_limit_pause=RATE_LIMIT_PAUSE,
+        max_concurrency=MAX_CONCURRENCY
     )
 
     print(f"\nOutput directory: {test1.output_dir}")
@@ -95,33 +97,13 @@ def main():
     print("MODEL SETUP")
     print("="*60)
 
-    if MODEL_TYPE == "dummy":
-        model_client = DummyModelClient()
+    provider = get_provider(MODEL_TYPE)
+    if not provider.api:
+        model_client = provider.create()
         print("✓ Using Dummy Model (random answers)\n")
-
-    elif MODEL_TYPE == "dashscope":
-        api_key = os.getenv("DASHSCOPE_API_KEY")
-        if not api_key:
-            raise ValueError("DASHSCOPE_API_KEY not found")
-        model_client = DashScopeModelClient(api_key=api_key)
-        print(f"✓ Using DashScope: {model_client.model_name}\n")
-
-    elif MODEL_TYPE == "novita":
-        api_key = os.getenv("NOVITA_API_KEY")
-        if not api_key:
-            raise ValueError("NOVITA_API_KEY not found")
-        model_client = NovitaModelClient(api_key=api_key, stream=False)
-        print(f"✓ Using Novita: {model_client.model_name}\n")
-
-    elif MODEL_TYPE == "xai":
-        api_key = os.getenv("XAI_API_KEY")
-        if not api_key:
-            raise ValueError("XAI_API_KEY not found")
-        model_client = XAIModelClient(api_key=api_key, stream=False)
-        print(f"✓ Using XAI: {model_client.model_name}\n")
-
     else:
-        raise ValueError(f"Unknown model type: {MODEL_TYPE}")
+        model_client = provider.create(stream=False)
+        print(f"✓ Using {provider.label}: {model_client.model_name}\n")
 
     # ===== Provide test cases to Dummy Model (if using dummy) =====
 
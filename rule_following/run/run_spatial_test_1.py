@@ -4,7 +4,7 @@ Each case is verified for board recognition before testing
 """
 
 from src.spatial.test_1_rule_following import SpatialTest1
-from src.model_client import DummyModelClient, DashScopeModelClient, NovitaModelClient, XAIModelClient
+from src.providers import get_provider
 import os
 import sys
 
@@ -31,10 +31,12 @@ def main():
     # Number of cases per piece type (total = 6 * N_CASES_PER_TYPE)
     N_CASES_PER_TYPE = 13
     SEED = 57                  # Random seed for reproducibility
-    MODEL_TYPE = "xai"      # Options: "dummy", "dashscope", "novita", "xai"
+    MODEL_TYPE = "xai"      # "dummy", "dashscope", "novita", "xai", "sf", "google" (src/providers.py)
     DUMMY_VERIFICATION_PASS_RATE = 0.8  # For dummy model
-    RATE_LIMIT_REQUESTS = 0   # Number of requests before pausing
-    RATE_LIMIT_PAUSE = 0      # Pause duration in seconds
+    RATE_LIMIT_REQUESTS = 0   # Requests allowed per pause window
+    RATE_LIMIT_PAUSE = 0      # Window length in seconds
+    MAX_CONCURRENCY = 1       # Model queries in flight (1 = sequential)
+    PACK_SIZE = 1             # Cases per request (1 = unpacked; e.g. 4 packs 4 boards)
 
     # ===== Setup Test =====
 
@@ -44,7 +46,9 @@ def main():
         seed=SEED,
         auto_timestamp=True,
         rate_limit_requests=RATE_LIMIT_REQUESTS,
-        rate_limit_pause=RATE_LIMIT_PAUSE
+        rate_limit_pause=RATE_LIMIT_PAUSE,
+        max_concurrency=MAX_CONCURRENCY,
+        pack_size=PACK_SIZE
     )
 
     print(f"\nOutput directory: {test1.output_dir}")
@@ -82,34 +86,13 @@ def main():
     print("MODEL SETUP")
     print("="*60)
 
-    if MODEL_TYPE == "dummy":
-        model_client = DummyModelClient(
-            verification_pass_rate=DUMMY_VERIFICATION_PASS_RATE
-        )
+    provider = get_provider(MODEL_TYPE)
+    if not provider.api:
+        model_client = provider.create(verification_pass_rate=DUMMY_VERIFICATION_PASS_RATE)
         print("✓ Using Dummy Model (random answers)\n")
-
-    elif MODEL_TYPE == "dashscope":
-        api_key = os.getenv("DASHSCOPE_API_KEY")
-        if not api_key:
-            raise ValueError("DASHSCOPE_API_KEY not found")
-        model_client = DashScopeModelClient(api_key=api_key)
-        print(f"✓ Using DashScope: {model_client.model_name}\n")
-
-    elif MODEL_TYPE == "novita":
-        api_key = os.getenv("NOVITA_API_KEY")
-        if not api_key:
-            raise ValueError("NOVITA_API_KEY not found")
-        model_client = NovitaModelClient(api_key=api_key, stream=False)
-        print(f"✓ Using Novita: {model_client.model_name}\n")
-
-    elif MODEL_TYPE == "xai":
-        api_key = os.getenv("XAI_API_KEY")
-        if not api_key:
-            raise ValueError("XAI_API_KEY not found")
-        model_client = XAIModelClient(api_key=api_key, stream=False)
-        print(f"✓ Using XAI: {model_client.model_name}\n")
     else:
-        raise ValueError(f"Unknown model type: {MODEL_TYPE}")
+        model_client = provider.create(stream=False)
+        print(f"✓ Using {provider.label}: {model_client.model_name}\n")
 
     # ===== Provide test cases to Dummy Model (if using dummy) =====
 
@@ -3,15 +3,14 @@ Run Temporal Levels Tests
 Unified script to run any combination of Level 1-6 tests
 """
 
-from src.temporal_levels import (
-    TemporalLevel1, TemporalLevel2, TemporalLevel3,
-    TemporalLevel4, TemporalLevel5, TemporalLevel6
-)
-from src.model_client import DummyModelClient, NovitaModelClient, DashScopeModelClient, XAIModelClient, SiliconFlowModelClient, GoogleModelClient
+# Framework modules (PIL, chess, httpx, the clients) are imported in the
+# functions that use them, so --help and argument errors return immediately
+from src.providers import get_provider, provider_names
 import sys
 import argparse
 import os
 import json
+from dataclasses import replace
 from datetime import datetime
 from typing import List, Dict, Any
 
@@ -22,68 +21,101 @@ sys.path.append('.')
 LEVEL_CONFIG = {
     1: {
         "name": "Basic Movement Rules",
-        "class": TemporalLevel1,
+        "class": "TemporalLevel1",
         "default_cases": 100,
         "description": "Tests basic movement patterns for all 6 piece types"
     },
     2: {
         "name": "Path Blocked Capture",
-        "class": TemporalLevel2,
+        "class": "TemporalLevel2",
         "default_cases": 100,
         "description": "Tests capture with path blocking (Rook/Bishop/Queen)"
     },
     3: {
         "name": "En Passant Basic",
-        "class": TemporalLevel3,
+        "class": "TemporalLevel3",
         "default_cases": 100,
         "description": "Tests 3 basic conditions for en passant"
     },
     4: {
         "name": "En Passant Constraints",
-        "class": TemporalLevel4,
+        "class": "TemporalLevel4",
         "default_cases": 100,
         "description": "Tests en passant timing and check constraints"
     },
     5: {
         "name": "Castling with 2 Check Rules",
-        "class": TemporalLevel5,
+        "class": "TemporalLevel5",
         "default_cases": 100,
         "description": "Tests castling legality regarding 2 check constraints (3 choose 2)"
     },
     6: {
         "name": "Castling with 3 Check Rules",
-        "class": TemporalLevel6,
+        "class": "TemporalLevel6",
         "default_cases": 100,
         "description": "Tests castling with all 3 check rules, 7 violation combinations (100% invalid)"
     },
 }
 
 
-def get_model_client(model_type: str, use_dummy: bool = False, dummy_pass_rate: float = 0.8):
+def get_model_client(model_type: str, use_dummy: bool = False, dummy_pass_rate: float = 0.8,
+                     cache: "ResponseCache" = None, dummy_options: Dict[str, Any] = None,
+                     **client_kwargs):
     """
-    Get model client based on type
+    Get model client of a registered provider (see src/providers.py)
+
+    dummy_options configures the dummy simulator (latency, error rates, seed);
+    extra keyword arguments (e.g. stream=True) are passed to API clients.
     """
-    if use_dummy or model_type == 'dummy':
+    provider = get_provider('dummy' if use_dummy else model_type)
+    if not provider.api:
         print(f"\n🤖 Using Dummy Model Client (pass_rate={dummy_pass_rate})")
-        return DummyModelClient(verification_pass_rate=dummy_pass_rate)
-
-    if model_type == 'novita':
-        print("\n🤖 Using Novita Model Client")
-        return NovitaModelClient()
-    elif model_type == 'dashscope':
-        print("\n🤖 Using DashScope Model Client")
-        return DashScopeModelClient()
-    elif model_type == 'xai':
-        print("\n🤖 Using XAI Model Client")
-        return XAIModelClient()
-    elif model_type == 'sf':
-        print("\n🤖 Using SiliconFlow Model Client")
-        return SiliconFlowModelClient()
-    elif model_type == 'google':
-        print("\n🤖 Using Google Model Client")
-        return GoogleModelClient()
-    else:
-        raise ValueError(f"Unknown model type: {model_type}")
+        return provider.create(verification_pass_rate=dummy_pass_rate, **(dummy_options or {}))
+
+    print(f"\n🤖 Using {provider.label} Model Client")
+    return provider.create(cache=cache, **client_kwargs)
+
+
+def get_balanced_client(model_type: str, endpoints_path: str, mock: bool = False,
+                        cache: "ResponseCache" = None, rate_limits: Dict[str, Any] = None,
+                        **client_kwargs):
+    """
+    Load-balanced client over the endpoints of --model listed in a JSON file
+
+    Each entry may set name, api_key (or api_key_env), base_url, model_name,
+    rpm and tpm; missing fields fall back to the provider's defaults and the
+    run's --rpm/--tpm. Every endpoint gets its own rate limiter, since quotas
+    are per key. With the mock server, base_url stays the mock's.
+    """
+    from src.balancer import LoadBalancedModelClient
+    from src.rate_limiter import get_rate_limiter, api_key_fingerprint
+
+    with open(endpoints_path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    provider = get_provider(model_type)
+    rate_limits = rate_limits or {}
+    clients, names = [], []
+    for i, entry in enumerate(entries):
+        name = entry.get("name", f"{provider.label}#{i + 1}")
+        kwargs = dict(client_kwargs)
+        if entry.get("api_key_env"):
+            if not os.getenv(entry["api_key_env"]):
+                raise ValueError(f"{entry['api_key_env']} not set for endpoint {name}")
+            kwargs["api_key"] = os.environ[entry["api_key_env"]]
+        for key in ("api_key", "model_name") + (() if mock else ("base_url",)):
+            if entry.get(key):
+                kwargs[key] = entry[key]
+        print(f"\n🤖 Using {provider.label} Model Client ({name})")
+        client = provider.create(cache=cache, **kwargs)
+        rpm = entry.get("rpm", rate_limits.get("requests_per_minute"))
+        tpm = entry.get("tpm", rate_limits.get("tokens_per_minute"))
+        if rpm or tpm:
+            client.set_rate_limiter(get_rate_limiter(
+                name, requests_per_minute=rpm, tokens_per_minute=tpm,
+                burst=rate_limits.get("burst"), shared_key=api_key_fingerprint(client.api_key)))
+        clients.append(client)
+        names.append(name)
+    return LoadBalancedModelClient(clients, names=names)
 
 
 def run_single_level(level: int,
@@ -93,10 +125,20 @@ def run_single_level(level: int,
                      output_base: str = "./output",
                      rate_limit_requests: int = 0,
                      rate_limit_pause: int = 0,
-                     mode: str = "predictive") -> Dict[str, Any]:
+                     mode: str = "predictive",
+                     max_concurrency: int = 1,
+                     generation_overrides: Dict[str, Any] = None,
+                     mock_server: "MockOpenAIServer" = None) -> Dict[str, Any]:
     """
     Run a single level test
+
+    generation_overrides replaces fields of the level's GenerationConfig
+    (e.g. {"max_tokens": 512}). A mock_server answers from this level's cases.
     """
+    from src import temporal_levels
+    from src.model_client import DummyModelClient
+    from src.usage import summarize_prompt_cache
+
     if level not in LEVEL_CONFIG:
         raise ValueError(f"Level {level} not implemented yet")
 
@@ -108,10 +150,11 @@ def run_single_level(level: int,
     print(f"Description: {config['description']}")
     print(f"Mode: {mode}")
     print(f"Test cases: {n_cases}")
+    print(f"Concurrency: {max_concurrency}")
     print("=" * 70)
 
     # Initialize test
-    test_class = config["class"]
+    test_class = getattr(temporal_levels, config["class"])
     test = test_class(
         base_output_dir=f"{output_base}/temporal_level_{level}",
         n_cases=n_cases,
@@ -119,11 +162,15 @@ def run_single_level(level: int,
         auto_timestamp=True,
         rate_limit_requests=rate_limit_requests,
         rate_limit_pause=rate_limit_pause,
-        mode=mode
+        mode=mode,
+        max_concurrency=max_concurrency
     )
+    if generation_overrides:
+        test.generation_config = replace(test.generation_config, **generation_overrides)
 
     # Generate test cases
     test.generate_test_cases()
+    print(f"Generation: {test.fit_generation_config().to_params()}")
 
     # Create images
     test.create_test_images()
@@ -131,9 +178,12 @@ def run_single_level(level: int,
     # Set test cases for dummy model
     if isinstance(model_client, DummyModelClient):
         model_client.set_test_cases(test.test_cases)
+    if mock_server is not None:
+        mock_server.answers.add_test_cases(test.test_cases)
 
     # Run test
     results, stats = test.run_test(model_client, save_results_flag=True)
+    stats["prompt_cache"] = summarize_prompt_cache(results)
 
     return {
         "level": level,
@@ -144,10 +194,45 @@ def run_single_level(level: int,
     }
 
 
+def merge_client_stats(all_results: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """
+    Sum the per-level client counters into run totals
+    """
+    totals = {}
+    for res in all_results:
+        for section, counters in res["stats"].get("client_stats", {}).items():
+            group = totals.setdefault(section, {})
+            for key, value in counters.items():
+                group[key] = group.get(key, 0) + value
+    return totals
+
+
+def format_counts(counts: Dict[str, float]) -> str:
+    """Format a {error_class: count} tally as 'rate_limit=3, timeout=1'"""
+    return ", ".join(f"{key}={int(value)}" for key, value in sorted(counts.items()))
+
+
+def format_provider_share(failover_stats: Dict[str, float], event: str = "switches") -> str:
+    """Format failover/balancer counters as 'DashScope 80% (1.2s), Novita 20% (2.0s); 3 switches'"""
+    names = [key[:-len("_requests")] for key in failover_stats if key.endswith("_requests")]
+    total = sum(failover_stats[f"{name}_requests"] for name in names)
+    parts = []
+    for name in names:
+        n = failover_stats[f"{name}_requests"]
+        mean_latency = failover_stats.get(f"{name}_latency_seconds", 0) / n
+        parts.append(f"{name} {n / total:.0%} ({mean_latency:.2f}s)")
+    return f"{', '.join(parts) or 'none'}; {int(failover_stats.get(event, 0))} {event}"
+
+
 def save_suite_summary(all_results: List[Dict[str, Any]], output_base: str, mode: str):
     """
     Save a summary of all levels to a JSON file
     """
+    from src.image_cache import get_image_cache
+    from src.telemetry import get_telemetry
+    from src.transport import get_transport_pool
+    from src.usage import format_prompt_cache, format_usage
+
     os.makedirs(output_base, exist_ok=True)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -168,19 +253,21 @@ def save_suite_summary(all_results: List[Dict[str, Any]], output_base: str, mode
         name = res["name"]
         stats = res["stats"]
 
-        # Calculate accuracy metrics
+        # Calculate accuracy metrics (cases whose request failed are excluded)
+        answered = stats['total'] - stats.get('errors', 0)
         verification_rate = stats['verification_passed'] / \
-            stats['total'] if stats['total'] > 0 else 0
+            answered if answered > 0 else 0
         accuracy_verified = stats['test_correct_given_verified'] / \
             stats['verification_passed'] if stats['verification_passed'] > 0 else 0
         overall_accuracy = stats['test_correct'] / \
-            stats['total'] if stats['total'] > 0 else 0
+            answered if answered > 0 else 0
 
         # Add to summary data
         level_summary = {
             "level": level,
             "name": name,
             "total_cases": stats['total'],
+            "errors": stats.get('errors', 0),
             "verification_rate": round(verification_rate, 3),
             "accuracy_given_verified": round(accuracy_verified, 3),
             "overall_accuracy": round(overall_accuracy, 3),
@@ -192,11 +279,72 @@ def save_suite_summary(all_results: List[Dict[str, Any]], output_base: str, mode
         # Print to console
         print(f"\nLevel {level}: {name}")
         print(f"  Total cases: {stats['total']}")
+        if stats.get('errors'):
+            print(f"  Request errors (excluded): {stats['errors']}")
         print(f"  Verification rate: {verification_rate:.1%}")
         print(f"  Accuracy (verified cases): {accuracy_verified:.1%}")
         print(f"  Overall accuracy: {overall_accuracy:.1%}")
+        rate_stats = stats.get("client_stats", {}).get("rate_limit")
+        if rate_stats:
+            print(
+                f"  Rate limit wait: {rate_stats.get('wait_seconds', 0):.1f}s over {rate_stats.get('requests', 0)} requests")
+        cache_stats = stats.get("client_stats", {}).get("cache")
+        if cache_stats:
+            print(
+                f"  Response cache: {cache_stats.get('hits', 0)} hits, {cache_stats.get('misses', 0)} misses")
+        failover_stats = stats.get("client_stats", {}).get("failover")
+        if failover_stats:
+            print(f"  Providers: {format_provider_share(failover_stats)}")
+        balancer_stats = stats.get("client_stats", {}).get("balancer")
+        if balancer_stats:
+            print(f"  Endpoints: {format_provider_share(balancer_stats, 'reroutes')}")
+        replay_stats = stats.get("client_stats", {}).get("replay")
+        if replay_stats:
+            if replay_stats.get("recorded"):
+                print(f"  Recorded responses: {int(replay_stats['recorded'])}")
+            else:
+                print(
+                    f"  Replayed responses: {int(replay_stats.get('hits', 0))} ({int(replay_stats.get('misses', 0))} misses)")
+        hedge_stats = stats.get("client_stats", {}).get("hedge")
+        if hedge_stats:
+            print(
+                f"  Hedged requests: {int(hedge_stats.get('fired', 0))} ({int(hedge_stats.get('won', 0))} won), "
+                f"~{int(hedge_stats.get('extra_tokens_estimated', 0))} extra tokens")
+        coalesce_stats = stats.get("client_stats", {}).get("coalesce")
+        if coalesce_stats:
+            print(f"  Coalesced duplicates: {int(coalesce_stats.get('duplicates', 0))} queries shared an in-flight call")
+        stream_stats = stats.get("client_stats", {}).get("streaming")
+        if stream_stats and stream_stats.get("requests"):
+            n_streamed = stream_stats["requests"]
+            print(
+                f"  Streaming: mean TTFT {stream_stats.get('ttft_seconds', 0) / n_streamed:.2f}s, "
+                f"{int(stream_stats.get('early_stops', 0))}/{int(n_streamed)} stopped after the answer")
+        usage_stats = stats.get("client_stats", {}).get("usage")
+        if usage_stats and usage_stats.get("requests"):
+            level_summary["token_usage"] = usage_stats
+            print(f"  Tokens: {format_usage(usage_stats)}")
+        if stats.get("prompt_cache"):
+            print(f"  Prompt cache: {format_prompt_cache(stats['prompt_cache'])}")
+        generation_stats = stats.get("client_stats", {}).get("generation")
+        if generation_stats:
+            print(f"  Truncated responses (hit max_tokens): {int(generation_stats.get('truncated', 0))}")
+        retry_stats = stats.get("client_stats", {}).get("retries")
+        if retry_stats:
+            print(f"  Retries: {format_counts(retry_stats)}")
+        error_stats = stats.get("client_stats", {}).get("errors")
+        if error_stats:
+            print(f"  Failed queries: {format_counts(error_stats)}")
         print(f"  Output: {res['output_dir']}")
 
+    summary_data["client_stats"] = merge_client_stats(all_results)
+    run_usage = summary_data["client_stats"].get("usage")
+    if run_usage and run_usage.get("requests"):
+        summary_data["token_usage"] = run_usage
+        print(f"\nTotal tokens: {format_usage(run_usage)}")
+    summary_data["image_cache"] = get_image_cache().stats()
+    summary_data["transport"] = get_transport_pool().stats()
+    summary_data["telemetry"] = get_telemetry().snapshot()
+
     # Save to file
     filename = f"temporal_levels_summary_{mode}_{timestamp}.json"
     filepath = os.path.join(output_base, filename)
@@ -221,10 +369,64 @@ def run_multiple_levels(levels: List[int],
                         output_base: str = "./output",
                         rate_limit_requests: int = 0,
                         rate_limit_pause: int = 0,
-                        mode: str = "predictive") -> List[Dict[str, Any]]:
+                        mode: str = "predictive",
+                        max_concurrency: int = 1,
+                        cache_path: str = None,
+                        cache_max_mb: int = 1024,
+                        refresh_cache: bool = False,
+                        requests_per_minute: float = None,
+                        tokens_per_minute: float = None,
+                        burst: int = None,
+                        max_retries: int = 4,
+                        retry_max_time: float = 300.0,
+                        adaptive: bool = False,
+                        hedge_rate: float = 0.0,
+                        coalesce: bool = False,
+                        stream: bool = False,
+                        early_stop: bool = False,
+                        max_tokens: int = None,
+                        temperature: float = None,
+                        transport_config: "TransportConfig" = None,
+                        batch: bool = False,
+                        batch_poll_interval: float = 30.0,
+                        mock_latency: float = None,
+                        mock_rate_429: float = 0.0,
+                        mock_rate_500: float = 0.0,
+                        record_path: str = None,
+                        replay_path: str = None,
+                        replay_speed: float = 0.0,
+                        dummy_latency: float = 0.0,
+                        dummy_rate_429: float = 0.0,
+                        dummy_rate_500: float = 0.0,
+                        dummy_timeout_rate: float = 0.0,
+                        failover: List[str] = None,
+                        breaker_error_rate: float = 0.5,
+                        breaker_latency: float = None,
+                        breaker_cooldown: float = 30.0,
+                        transcode: str = "off",
+                        transcode_min_psnr: float = 40.0,
+                        prompt_layout: str = None,
+                        endpoints_path: str = None,
+                        mock_key_rpm: float = None,
+                        rate_limit_db: str = None) -> List[Dict[str, Any]]:
     """
     Run multiple level tests
     """
+    from src.model_client import OpenAICompatibleModelClient, DummyModelClient, RetryPolicy
+    from src.response_cache import ResponseCache
+    from src.image_cache import get_image_cache
+    from src.rate_limiter import get_rate_limiter, get_shared_store, api_key_fingerprint, use_shared_store
+    from src.executor import AdaptiveConcurrencyController
+    from src.hedging import RequestHedger
+    from src.coalescing import SingleFlight
+    from src.transport import get_transport_pool
+    from src.batch import BatchModelClient
+    from src.mock_server import MockOpenAIServer, AnswerBook, LatencyModel
+    from src.replay import RecordReplayModelClient
+    from src.failover import FailoverModelClient
+    from src.telemetry import get_telemetry
+    from src.transcode import resolve_transcode
+
     # Validate levels
     levels_to_run = levels.copy()
     for level in levels:
@@ -244,13 +446,201 @@ def run_multiple_levels(levels: List[int],
     print(f"Mode: {mode}")
     print(f"Random seed: {seed}")
     print(f"Output directory: {output_base}")
-    if rate_limit_requests > 0:
+    print(f"Concurrency: {max_concurrency}{' (adaptive ceiling)' if adaptive else ''}")
+    print(f"Retries: up to {max_retries} per query, {retry_max_time:.0f}s max")
+    if requests_per_minute or tokens_per_minute:
+        print(
+            f"Rate limiting: {requests_per_minute or '-'} RPM, {tokens_per_minute or '-'} TPM, burst {burst or 'auto'}")
+    elif rate_limit_requests > 0:
         print(
-            f"Rate limiting: {rate_limit_requests} requests, {rate_limit_pause}s pause")
+            f"Rate limiting: {rate_limit_requests} requests per {rate_limit_pause}s")
+    if rate_limit_db:
+        print(f"Rate limits shared across processes via {rate_limit_db}")
     print("=" * 70)
 
+    # Budgets of the same API key are shared with other runs on this host
+    if rate_limit_db:
+        use_shared_store(rate_limit_db)
+
+    # Open response cache (shared across all levels)
+    cache = None
+    if cache_path:
+        cache = ResponseCache(
+            path=cache_path,
+            max_bytes=cache_max_mb * 1024 * 1024,
+            refresh=refresh_cache
+        )
+        print(
+            f"Response cache: {cache_path} ({'refresh' if refresh_cache else 'read/write'})")
+
+    # Connection pool settings for every endpoint used in this run
+    if transport_config is not None:
+        get_transport_pool().default_config = transport_config
+
+    # Local mock endpoint: real client and HTTP stack, synthesized answers
+    mock_server = None
+    client_kwargs = {"stream": True, "early_stop": early_stop} if stream else {}
+    if prompt_layout:
+        client_kwargs["prompt_layout"] = prompt_layout
+    if mock_latency is not None:
+        if use_dummy or not get_provider(model_type).api:
+            print("⚠️  The mock server needs an API model client, ignoring --mock-server")
+        else:
+            mock_server = MockOpenAIServer(
+                answers=AnswerBook(accuracy=dummy_pass_rate, seed=seed),
+                latency=LatencyModel("lognormal", mock_latency),
+                rate_429=mock_rate_429,
+                rate_500=mock_rate_500,
+                key_rpm=mock_key_rpm,
+                seed=seed
+            ).start()
+            client_kwargs.update(api_key="mock", base_url=mock_server.base_url,
+                                 model_name=os.getenv("MOCK_MODEL", "mock-model"))
+            print(f"Mock server: {mock_server.base_url} (median latency {mock_latency:g}s, "
+                  f"{mock_rate_429:.0%} 429s, {mock_rate_500:.0%} 500s"
+                  f"{f', {mock_key_rpm:g} RPM per key' if mock_key_rpm else ''})")
+
+    retry_policy = RetryPolicy(
+        max_attempts=max_retries + 1,
+        max_total_time=retry_max_time
+    )
+
+    # Several endpoints (API keys or base URLs) serving --model, weighted by
+    # throughput and remaining quota
+    balancer = None
+    if endpoints_path:
+        if use_dummy or not get_provider(model_type).api:
+            print("⚠️  Load balancing needs an API model client, ignoring --endpoints")
+        else:
+            balancer = get_balanced_client(
+                model_type, endpoints_path, mock=mock_server is not None, cache=cache,
+                rate_limits={"requests_per_minute": requests_per_minute,
+                             "tokens_per_minute": tokens_per_minute, "burst": burst},
+                **client_kwargs)
+            # Long rate-limit waits reroute to another endpoint instead
+            for endpoint in balancer.endpoints:
+                endpoint.client.retry_policy = replace(
+                    retry_policy, max_rate_limit_wait=balancer.cooldown)
+            print(f"Load balancing: {', '.join(balancer.names)} "
+                  f"(weighted by throughput and quota headroom)")
+
     # Initialize model client (shared across all levels)
-    model_client = get_model_client(model_type, use_dummy, dummy_pass_rate)
+    model_client = balancer or get_model_client(
+        model_type, use_dummy, dummy_pass_rate, cache=cache,
+        dummy_options={
+            "latency": LatencyModel("lognormal", dummy_latency),
+            "rate_429": dummy_rate_429,
+            "rate_500": dummy_rate_500,
+            "timeout_rate": dummy_timeout_rate,
+            "seed": seed
+        },
+        **client_kwargs)
+    model_client.retry_policy = retry_policy
+
+    # Backup providers for the same logical model, behind circuit breakers
+    failover_client = None
+    if failover:
+        providers = [model_client] + [
+            get_model_client(backup, cache=cache, **client_kwargs) for backup in failover]
+        for provider in providers[1:]:
+            provider.retry_policy = model_client.retry_policy
+        failover_client = FailoverModelClient(
+            providers,
+            error_threshold=breaker_error_rate,
+            latency_threshold=breaker_latency,
+            cooldown=breaker_cooldown
+        )
+        model_client = failover_client
+        print(f"Failover: {' -> '.join(failover_client.names)} "
+              f"(breaker at {breaker_error_rate:.0%} errors"
+              f"{f' or {breaker_latency:g}s mean latency' if breaker_latency else ''}, "
+              f"{breaker_cooldown:g}s cooldown)")
+
+    # Submit each level's queries as one provider batch job
+    if batch:
+        if not isinstance(model_client, OpenAICompatibleModelClient):
+            print("⚠️  Batch mode needs a single API model, ignoring --batch")
+        else:
+            model_client = BatchModelClient(
+                model_client,
+                work_dir=os.path.join(output_base, "batches"),
+                poll_interval=batch_poll_interval
+            )
+            print(f"Batch mode: polling every {batch_poll_interval:g}s")
+
+    # Record live responses, or replay a recorded log without the network
+    if replay_path:
+        model_client = RecordReplayModelClient(
+            replay_path,
+            client=None if isinstance(model_client, DummyModelClient) else model_client,
+            mode="replay",
+            latency_scale=replay_speed
+        )
+    elif record_path:
+        model_client = RecordReplayModelClient(record_path, client=model_client, mode="record")
+
+    # Token-bucket limiter shared by every client of the same provider
+    if requests_per_minute or tokens_per_minute:
+        # Failover providers each get their own bucket
+        for backend in failover_client.providers if failover_client else []:
+            backend.set_rate_limiter(get_rate_limiter(
+                getattr(backend, "SERVICE_NAME", backend.model_name),
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+                burst=burst,
+                shared_key=api_key_fingerprint(getattr(backend, "api_key", None))
+            ))
+        provider = getattr(model_client, "SERVICE_NAME", model_client.model_name)
+        model_client.set_rate_limiter(get_rate_limiter(
+            provider,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            burst=burst,
+            shared_key=api_key_fingerprint(getattr(model_client, "api_key", None))
+        ))
+    elif failover_client and get_shared_store() is not None:
+        # No local budget: each provider follows the one stored for its key
+        for backend in failover_client.providers:
+            backend.set_rate_limiter(get_rate_limiter(
+                getattr(backend, "SERVICE_NAME", backend.model_name),
+                shared_key=api_key_fingerprint(getattr(backend, "api_key", None))
+            ))
+
+    # AIMD controller probes the provider's throughput ceiling up to -j
+    controller = None
+    if adaptive and max_concurrency > 1:
+        controller = AdaptiveConcurrencyController(
+            max_limit=max_concurrency,
+            name=getattr(model_client, "SERVICE_NAME", model_client.model_name)
+        )
+        model_client.set_concurrency_controller(controller)
+
+    # Duplicate requests that run past p95 latency (bounded by hedge_rate)
+    hedger = None
+    if hedge_rate > 0:
+        hedger = RequestHedger(max_hedge_rate=hedge_rate, max_concurrency=max_concurrency)
+        model_client.set_hedger(hedger)
+        print(f"Hedging: up to {hedge_rate:.0%} of requests after p95 latency")
+
+    # Opt-in: identical queries in flight at the same time share one upstream
+    # call (one instance for every client, so failover/endpoint backends coalesce too)
+    single_flight = SingleFlight() if coalesce else None
+    model_client.set_single_flight(single_flight)
+    if coalesce:
+        print("Coalescing: identical in-flight queries share one call")
+
+    # Smaller image payloads (palette PNG / lossless WebP / bounded JPEG)
+    transcode_config = resolve_transcode(transcode, "temporal_levels", transcode_min_psnr)
+    get_image_cache().set_transcode(transcode_config)
+    if transcode_config is not None:
+        print(f"Image transcoding: {transcode_config.format}"
+              f"{'' if transcode_config.format == 'webp' else f' (min PSNR {transcode_min_psnr:g} dB)'}")
+
+    # Per-request telemetry is streamed during the run, histograms exported at the end
+    telemetry = get_telemetry()
+    telemetry_prefix = os.path.join(
+        output_base, f"telemetry_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    telemetry.open_request_log(f"{telemetry_prefix}_requests.jsonl")
 
     # Run each level
     all_results = []
@@ -264,7 +654,14 @@ def run_multiple_levels(levels: List[int],
                 output_base=output_base,
                 rate_limit_requests=rate_limit_requests,
                 rate_limit_pause=rate_limit_pause,
-                mode=mode
+                mode=mode,
+                max_concurrency=max_concurrency,
+                generation_overrides={
+                    key: value for key, value in
+                    (("max_tokens", max_tokens), ("temperature", temperature))
+                    if value is not None
+                },
+                mock_server=mock_server
             )
             all_results.append(result)
         except Exception as e:
@@ -276,6 +673,79 @@ def run_multiple_levels(levels: List[int],
     # Save summary to file and print
     save_suite_summary(all_results, output_base, mode)
 
+    if hedger is not None:
+        hedge_stats = hedger.stats()
+        delay = hedge_stats['hedge_delay']
+        print(
+            f"Hedging: {hedge_stats['hedges']} hedges for {hedge_stats['primaries']} requests "
+            f"({hedge_stats['hedge_wins']} won, p95 delay {f'{delay:.2f}s' if delay is not None else 'n/a'})")
+
+    if single_flight is not None and single_flight.leaders:
+        flight_stats = single_flight.stats()
+        print(f"Coalescing: {flight_stats['coalesced']} duplicates shared "
+              f"{flight_stats['upstream_calls']} upstream calls ({flight_stats['coalesced_rate']:.1%})")
+
+    if controller is not None:
+        os.makedirs(output_base, exist_ok=True)
+        trace_path = os.path.join(
+            output_base, f"concurrency_trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+        controller.save_trace(trace_path)
+        controller_stats = controller.stats()
+        print(
+            f"Adaptive concurrency: final limit {controller_stats['limit']}, peak {controller_stats['peak_limit']} "
+            f"({controller_stats['increases']} increases, {controller_stats['decreases']} decreases)")
+        print(f"📄 Concurrency trace saved to: {trace_path}")
+
+    image_stats = get_image_cache().stats()
+    if image_stats["transcode"] and image_stats["bytes_before"]:
+        print(
+            f"Image payloads ({image_stats['transcode']}): {image_stats['bytes_before'] / 1024:.0f} KB -> "
+            f"{image_stats['bytes_after'] / 1024:.0f} KB "
+            f"({1 - image_stats['bytes_after'] / image_stats['bytes_before']:.0%} smaller)")
+
+    for endpoint, pool_stats in get_transport_pool().stats().items():
+        print(
+            f"HTTP pool {endpoint}: {pool_stats['requests']} requests over "
+            f"{pool_stats['tcp_connects']} connections ({pool_stats['tls_handshakes']} TLS handshakes)")
+
+    if cache is not None:
+        cache_stats = cache.stats()
+        print(
+            f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+            f"{cache_stats['entries']} entries ({cache_stats['size_bytes'] / 1024 / 1024:.1f} MB)")
+        cache.close()
+
+    telemetry.close()
+    for label, entry in telemetry.snapshot().items():
+        latency, ttfb = entry["latency_seconds"], entry["ttfb_seconds"]
+        print(
+            f"Telemetry {label}: {latency['count']} attempts, latency p50 {latency['p50']:.2f}s "
+            f"p99 {latency['p99']:.2f}s, TTFB p50 {ttfb['p50'] or 0:.2f}s, "
+            f"queue wait p99 {entry['queue_wait_seconds']['p99']:.2f}s, status {entry['statuses']}")
+    telemetry_paths = telemetry.export(telemetry_prefix)
+    print(f"📄 Telemetry saved to: {telemetry_paths['prometheus']}, {telemetry_paths['jsonl']}")
+
+    if balancer is not None:
+        for name, endpoint_stats in balancer.endpoint_stats().items():
+            print(f"Endpoint {name}: latency {endpoint_stats['latency'] or 0:.2f}s, "
+                  f"headroom {endpoint_stats['headroom']:.0%}"
+                  f"{', cooling down' if endpoint_stats['cooling_down'] else ''}")
+
+    if failover_client is not None:
+        for name, breaker_stats in failover_client.provider_stats().items():
+            print(f"Provider {name}: circuit {breaker_stats['state']}, tripped {breaker_stats['trips']} time(s)")
+
+    if isinstance(model_client, RecordReplayModelClient):
+        model_client.close()
+
+    if mock_server is not None:
+        server_stats = mock_server.stats()
+        key_quota = f", {server_stats['key_rate_limited']} over key quota" if mock_key_rpm else ""
+        print(
+            f"Mock server: {server_stats['requests']} requests, status {server_stats['status_codes']}, "
+            f"peak {server_stats['peak_in_flight']} in flight{key_quota}")
+        mock_server.stop()
+
     return all_results
 
 
@@ -300,11 +770,36 @@ Examples:
   # Run with real model
   python run/run_temporal_levels.py -l 1 --model novita
 
-  # Run with rate limiting
+  # Run with rate limiting (20 requests per 5 seconds)
   python run/run_temporal_levels.py --all --rate-limit 20 --rate-pause 5
 
+  # Run with a token-bucket limiter (60 requests/min, 200k tokens/min)
+  python run/run_temporal_levels.py --all --model dashscope -j 10 --rpm 60 --tpm 200000
+
   # Run with explicit mode
   python run/run_temporal_levels.py --all --mode explicit
+
+  # Run with 20 requests in flight
+  python run/run_temporal_levels.py --all --model dashscope -j 20
+
+  # Reuse responses from previous runs (re-scoring costs no API time)
+  python run/run_temporal_levels.py --all --model dashscope --cache
+
+  # Run offline through the provider batch API (cheaper, not interactive)
+  python run/run_temporal_levels.py --all --model dashscope --batch
+
+  # Load-test the client stack against a local mock server (no API spend)
+  python run/run_temporal_levels.py --all --model novita --mock-server 0.3 --mock-429 0.05 -j 64
+
+  # Fail over from DashScope to SiliconFlow/Novita when DashScope degrades
+  python run/run_temporal_levels.py --all --model dashscope --failover sf novita -j 10
+
+  # Spread one model over several API keys (see README, Load-Balanced Endpoints)
+  python run/run_temporal_levels.py --all --model dashscope --endpoints keys.json -j 20
+
+  # Record real responses once, then benchmark pipeline changes offline
+  python run/run_temporal_levels.py --all --model dashscope --record ./output/dashscope.jsonl.gz
+  python run/run_temporal_levels.py --all --replay ./output/dashscope.jsonl.gz --replay-speed 1 -j 10
         """
     )
 
@@ -355,9 +850,9 @@ Examples:
     parser.add_argument(
         "-m", "--model",
         type=str,
-        choices=["dummy", "novita", "dashscope", "xai", "sf", "google"],
+        choices=provider_names(),
         default="dummy",
-        help="Model type to use (default: dummy)"
+        help="Model type to use (default: dummy); add providers with a VLM_PROVIDERS JSON file"
     )
     parser.add_argument(
         "--dummy-pass-rate",
@@ -366,22 +861,322 @@ Examples:
         help="Pass rate for dummy model (default: 0.8)"
     )
 
+    parser.add_argument(
+        "--dummy-latency",
+        type=float,
+        default=0.0,
+        help="Median simulated latency of the dummy model in seconds (lognormal, default: 0)"
+    )
+    parser.add_argument(
+        "--dummy-429",
+        type=float,
+        default=0.0,
+        help="Fraction of dummy requests failing with a simulated 429 (default: 0)"
+    )
+    parser.add_argument(
+        "--dummy-500",
+        type=float,
+        default=0.0,
+        help="Fraction of dummy requests failing with a simulated 500 (default: 0)"
+    )
+    parser.add_argument(
+        "--dummy-timeout",
+        type=float,
+        default=0.0,
+        help="Fraction of dummy requests failing with a simulated timeout (default: 0)"
+    )
+
     # Rate limiting
     parser.add_argument(
         "--rate-limit",
         type=int,
         default=0,
-        help="Number of requests before pausing (0 = no limit)"
+        help="Requests allowed per --rate-pause window (0 = no limit)"
     )
     parser.add_argument(
         "--rate-pause",
         type=int,
         default=0,
-        help="Seconds to pause when rate limit reached"
+        help="Window length in seconds for --rate-limit"
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=None,
+        help="Requests per minute allowed for the provider (token bucket)"
+    )
+    parser.add_argument(
+        "--tpm",
+        type=float,
+        default=None,
+        help="Tokens per minute allowed for the provider (token bucket)"
+    )
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=None,
+        help="Requests that may be sent back-to-back (default: 10 seconds of --rpm)"
+    )
+    parser.add_argument(
+        "--rate-limit-db",
+        type=str,
+        default=os.getenv("VLM_RATE_LIMIT_DB"),
+        metavar="FILE",
+        help="SQLite file holding --rpm/--tpm budgets, shared by every process using the same API key "
+             "(default: $VLM_RATE_LIMIT_DB)"
+    )
+
+    # Concurrency
+    parser.add_argument(
+        "-j", "--concurrency",
+        type=int,
+        default=1,
+        help="Number of model queries in flight (default: 1 = sequential)"
+    )
+    parser.add_argument(
+        "--max-tokens",
+        type=int,
+        default=None,
+        help="Override the output token budget of every level (default: derived from the longest expected answers)"
+    )
+    parser.add_argument(
+        "--temperature",
+        type=float,
+        default=None,
+        help="Override the sampling temperature (default: provider default)"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream responses (records time to first token per case)"
+    )
+    parser.add_argument(
+        "--early-stop",
+        action="store_true",
+        help="With --stream, stop reading once the Verification and Main answer lines are parsed"
+    )
+    parser.add_argument(
+        "--prompt-layout",
+        choices=["inline", "system"],
+        default=None,
+        help="Whole prompt after the images (default), or its static lead-in in a leading "
+             "system message (cacheable prefix; changes the message layout the model sees)"
+    )
+    parser.add_argument(
+        "--hedge",
+        type=float,
+        default=0.0,
+        metavar="RATE",
+        help="Send a duplicate when a query exceeds p95 latency, for at most RATE of queries (e.g. 0.05)"
+    )
+    parser.add_argument(
+        "--coalesce",
+        action="store_true",
+        help="Let identical concurrent queries share one call instead of sampling each "
+             "(use with --temperature 0)"
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Adapt concurrency (AIMD) between 1 and -j based on latency, 429s and timeouts"
+    )
+
+    # Retries
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=4,
+        help="Retries per query on 429/5xx/timeout/connection errors (default: 4)"
+    )
+    parser.add_argument(
+        "--retry-max-time",
+        type=float,
+        default=300.0,
+        help="Maximum seconds spent retrying a single query (default: 300)"
+    )
+
+    # HTTP transport
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=100,
+        help="Connection pool size per API endpoint (default: 100)"
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        help="Use HTTP/2 if the 'h2' package is installed"
+    )
+    parser.add_argument(
+        "--connect-timeout",
+        type=float,
+        default=10.0,
+        help="Seconds to wait for a connection to the API (default: 10)"
+    )
+    parser.add_argument(
+        "--read-timeout",
+        type=float,
+        default=300.0,
+        help="Seconds to wait for response data from the API (default: 300)"
+    )
+
+    # Multi-provider failover
+    parser.add_argument(
+        "--failover",
+        type=str,
+        nargs="+",
+        default=None,
+        choices=provider_names(api_only=True),
+        help="Backup providers serving the same model, tried in order when --model's provider degrades"
+    )
+    parser.add_argument(
+        "--breaker-error-rate",
+        type=float,
+        default=0.5,
+        help="Error rate over the last 20 queries that takes a provider out of rotation (default: 0.5)"
+    )
+    parser.add_argument(
+        "--breaker-latency",
+        type=float,
+        default=None,
+        help="Mean latency in seconds that takes a provider out of rotation (default: off)"
+    )
+    parser.add_argument(
+        "--breaker-cooldown",
+        type=float,
+        default=30.0,
+        help="Seconds before a tripped provider is probed again (default: 30)"
+    )
+
+    # Load balancing over several keys / base URLs of --model
+    parser.add_argument(
+        "--endpoints",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="JSON list of endpoints (api_key/api_key_env, base_url, rpm, tpm) serving --model; "
+             "queries are spread over them by throughput and quota headroom"
+    )
+
+    # Batch API
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Submit each level's queries as one batch job instead of online requests"
+    )
+    parser.add_argument(
+        "--batch-poll",
+        type=float,
+        default=30.0,
+        help="Seconds between batch status checks (default: 30)"
+    )
+
+    # Local mock server
+    parser.add_argument(
+        "--mock-server",
+        type=float,
+        nargs="?",
+        const=0.5,
+        default=None,
+        metavar="LATENCY",
+        help="Send API requests to a local mock server with this median latency (default: 0.5s); "
+             "answers come from the test cases, correct with --dummy-pass-rate probability"
+    )
+    parser.add_argument(
+        "--mock-429",
+        type=float,
+        default=0.0,
+        help="Fraction of mock requests rejected with 429 (default: 0)"
+    )
+    parser.add_argument(
+        "--mock-500",
+        type=float,
+        default=0.0,
+        help="Fraction of mock requests failing with 500 (default: 0)"
+    )
+    parser.add_argument(
+        "--mock-key-rpm",
+        type=float,
+        default=None,
+        help="Requests per minute the mock server allows each API key (default: unlimited)"
+    )
+
+    # Record / replay
+    record_group = parser.add_mutually_exclusive_group()
+    record_group.add_argument(
+        "--record",
+        type=str,
+        default=None,
+        metavar="LOG",
+        help="Record every response and its latency to a JSONL log (.gz to compress)"
+    )
+    record_group.add_argument(
+        "--replay",
+        type=str,
+        default=None,
+        metavar="LOG",
+        help="Answer from a recorded log instead of the model (misses go to --model unless dummy)"
+    )
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=0.0,
+        help="Replay delay as a multiple of the recorded latency (default: 0 = instant, 1 = as recorded)"
+    )
+
+    # Response cache
+    parser.add_argument(
+        "--cache",
+        type=str,
+        nargs="?",
+        const="./.cache/vlm_responses.sqlite",
+        default=None,
+        help="Enable the persistent response cache (optional path, default: ./.cache/vlm_responses.sqlite)"
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=1024,
+        help="Size cap of the response cache in MB before LRU eviction (default: 1024)"
+    )
+    parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Ignore cached responses, query the API and overwrite the cache"
+    )
+
+    # Image payload transcoding
+    parser.add_argument(
+        "--transcode",
+        type=str,
+        default="off",
+        choices=["off", "auto", "png8", "webp", "jpeg"],
+        help="Re-encode board images before upload: palette PNG, lossless WebP or quality-bounded JPEG "
+             "('auto' = suite default, png8; default: off)"
+    )
+    parser.add_argument(
+        "--transcode-min-psnr",
+        type=float,
+        default=40.0,
+        help="Lowest PSNR (dB) accepted for lossy transcodes; worse results send the original (default: 40)"
+    )
+
+    # Cost accounting
+    parser.add_argument(
+        "--prices",
+        type=str,
+        default=None,
+        help="JSON file of USD per million tokens by model name, merged into src/usage.py MODEL_PRICES"
     )
 
     args = parser.parse_args()
 
+    from src.transport import TransportConfig
+    from src.usage import load_prices
+
+    if args.prices:
+        load_prices(args.prices)
+
     # Determine which levels to run
     if args.all:
         levels = sorted(LEVEL_CONFIG.keys())
@@ -399,7 +1194,52 @@ Examples:
         output_base=args.output,
         rate_limit_requests=args.rate_limit,
         rate_limit_pause=args.rate_pause,
-        mode=args.mode
+        mode=args.mode,
+        max_concurrency=args.concurrency,
+        cache_path=args.cache,
+        cache_max_mb=args.cache_max_mb,
+        refresh_cache=args.refresh_cache,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        burst=args.burst,
+        max_retries=args.max_retries,
+        retry_max_time=args.retry_max_time,
+        adaptive=args.adaptive,
+        hedge_rate=args.hedge,
+        coalesce=args.coalesce,
+        stream=args.stream,
+        early_stop=args.early_stop,
+        max_tokens=args.max_tokens,
+        temperature=args.temperature,
+        transport_config=TransportConfig(
+            max_connections=args.max_connections,
+            max_keepalive_connections=args.max_connections,
+            connect_timeout=args.connect_timeout,
+            read_timeout=args.read_timeout,
+            http2=args.http2
+        ),
+        batch=args.batch,
+        batch_poll_interval=args.batch_poll,
+        mock_latency=args.mock_server,
+        mock_rate_429=args.mock_429,
+        mock_rate_500=args.mock_500,
+        record_path=args.record,
+        replay_path=args.replay,
+        replay_speed=args.replay_speed,
+        dummy_latency=args.dummy_latency,
+        dummy_rate_429=args.dummy_429,
+        dummy_rate_500=args.dummy_500,
+        dummy_timeout_rate=args.dummy_timeout,
+        failover=args.failover,
+        breaker_error_rate=args.breaker_error_rate,
+        breaker_latency=args.breaker_latency,
+        breaker_cooldown=args.breaker_cooldown,
+        transcode=args.transcode,
+        transcode_min_psnr=args.transcode_min_psnr,
+        prompt_layout=args.prompt_layout,
+        endpoints_path=args.endpoints,
+        mock_key_rpm=args.mock_key_rpm,
+        rate_limit_db=args.rate_limit_db
     )
 
 
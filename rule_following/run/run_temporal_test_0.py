@@ -4,7 +4,7 @@ Each case tests pure temporal reasoning without chess rules
 """
 
 from src.temporal.test_0_pure_ability import TemporalTest0
-from src.model_client import DummyModelClient, DashScopeModelClient, NovitaModelClient, XAIModelClient
+from src.providers import get_provider
 import sys
 import os
 
@@ -29,9 +29,10 @@ def main():
 
     N_CASES_PER_TYPE = 26      # Number of cases per test type
     SEED = 57                  # Random seed for reproducibility
-    MODEL_TYPE = "xai"       # Options: "dummy", "dashscope", "novita", "xai"
-    RATE_LIMIT_REQUESTS = 0   # Number of requests before pausing
-    RATE_LIMIT_PAUSE = 0      # Pause duration in seconds
+    MODEL_TYPE = "xai"       # "dummy", "dashscope", "novita", "xai", "sf", "google" (src/providers.py)
+    RATE_LIMIT_REQUESTS = 0   # Requests allowed per pause window
+    RATE_LIMIT_PAUSE = 0      # Window length in seconds
+    MAX_CONCURRENCY = 1       # Model queries in flight (1 = sequential)
 
     # ===== Setup Test =====
 
@@ -41,7 +42,8 @@ def main():
         seed=SEED,
         auto_timestamp=True,
         rate_limit_requests=RATE_LIMIT_REQUESTS,
-        rate_limit_pause=RATE_LIMIT_PAUSE
+        rate_limit_pause=RATE_LIMIT_PAUSE,
+        max_concurrency=MAX_CONCURRENCY
     )
 
     print(f"\nOutput directory: {test0.output_dir}")
@@ -79,33 +81,13 @@ def main():
     print("MODEL SETUP")
     print("="*60)
 
-    if MODEL_TYPE == "dummy":
-        model_client = DummyModelClient()
+    provider = get_provider(MODEL_TYPE)
+    if not provider.api:
+        model_client = provider.create()
         print("✓ Using Dummy Model (random answers)\n")
-
-    elif MODEL_TYPE == "dashscope":
-        api_key = os.getenv("DASHSCOPE_API_KEY")
-        if not api_key:
-            raise ValueError("DASHSCOPE_API_KEY not found")
-        model_client = DashScopeModelClient(api_key=api_key)
-        print(f"✓ Using DashScope: {model_client.model_name}\n")
-
-    elif MODEL_TYPE == "novita":
-        api_key = os.getenv("NOVITA_API_KEY")
-        if not api_key:
-            raise ValueError("NOVITA_API_KEY not found")
-        model_client = NovitaModelClient(api_key=api_key, stream=False)
-        print(f"✓ Using Novita: {model_client.model_name}\n")
-
-    elif MODEL_TYPE == "xai":
-        api_key = os.getenv("XAI_API_KEY")
-        if not api_key:
-            raise ValueError("XAI_API_KEY not found")
-        model_client = XAIModelClient(api_key=api_key, stream=False)
-        print(f"✓ Using XAI: {model_client.model_name}\n")
-
     else:
-        raise ValueError(f"Unknown model type: {MODEL_TYPE}")
+        model_client = provider.create(stream=False)
+        print(f"✓ Using {provider.label}: {model_client.model_name}\n")
 
     # ===== Run Test =====
 
@@ -11,7 +11,8 @@ setup(
         "matplotlib",
         "python-dotenv",
         "requests",
-        "openai"
+        "openai",
+        "httpx"
     ],
     description="VLM Diagnostic Framework",
     python_requires=">=3.8",
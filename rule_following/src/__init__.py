@@ -1,29 +1,61 @@
 """VLM Rule Following Test Framework"""
 
+import importlib
+
 __version__ = "0.1.0"
 
-from .data_structures import TestResult, TestType, PieceType
-from .board_generator import ChessBoardGenerator
-from .model_client import (
-    ModelClient,
-    DummyModelClient,
-    NovitaModelClient,
-    DashScopeModelClient,
-    XAIModelClient,
-    SiliconFlowModelClient,
-    GoogleModelClient
-)
-
-__all__ = [
-    "TestResult",
-    "TestType",
-    "PieceType",
-    "ChessBoardGenerator",
-    "ModelClient",
-    "DummyModelClient",
-    "NovitaModelClient",
-    "DashScopeModelClient",
-    "XAIModelClient",
-    "SiliconFlowModelClient",
-    "GoogleModelClient"
-]
+# Public names by module. They are imported on first access, so importing
+# one submodule (e.g. src.providers from a run script) does not load every
+# client, PIL, chess and httpx
+_EXPORTS = {
+    ".data_structures": ("TestResult", "TestType", "PieceType"),
+    ".board_generator": ("ChessBoardGenerator",),
+    ".model_client": (
+        "ModelClient",
+        "DummyModelClient",
+        "ModelClientWrapper",
+        "CompositeModelClient",
+        "NovitaModelClient",
+        "DashScopeModelClient",
+        "XAIModelClient",
+        "SiliconFlowModelClient",
+        "GoogleModelClient",
+        "RetryPolicy",
+        "ModelQueryError",
+        "classify_error"
+    ),
+    ".providers": ("Provider", "register_provider", "get_provider", "create_client"),
+    ".executor": ("QueryExecutor", "QueryOutcome", "AdaptiveConcurrencyController"),
+    ".response_cache": ("ResponseCache",),
+    ".image_cache": ("ImagePayloadCache", "get_image_cache"),
+    ".rate_limiter": ("RateLimiter", "get_rate_limiter", "SharedBucketStore"),
+    ".hedging": ("RequestHedger",),
+    ".coalescing": ("SingleFlight",),
+    ".generation": ("GenerationConfig",),
+    ".transport": ("TransportConfig", "get_transport_pool"),
+    ".batch": ("BatchModelClient",),
+    ".mock_server": ("MockOpenAIServer",),
+    ".replay": ("RecordReplayModelClient",),
+    ".simulation": ("LatencyModel",),
+    ".failover": ("FailoverModelClient", "CircuitBreaker"),
+    ".balancer": ("LoadBalancedModelClient",),
+    ".telemetry": ("Telemetry", "HdrHistogram", "get_telemetry"),
+    ".transcode": ("TranscodeConfig",),
+    ".prompting": ("LayeredPrompt",),
+}
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name):
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,181 @@
+"""
+Load-balanced fan-out across endpoints
+Spreads the queries for one logical model over several endpoints serving
+it (one provider with several API keys, or several base URLs), so a run
+can use their combined quota instead of stalling on one key's rate cap.
+Each endpoint's share follows its observed throughput and remaining quota
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Union
+
+from .failover import REQUEST_ERRORS
+from .generation import GenerationConfig
+from .model_client import CompositeModelClient, ModelClient, ModelQueryError
+from .telemetry import watch_quota
+
+# Weight floor of an endpoint with no quota left, so it is still probed
+MIN_QUOTA = 0.05
+
+
+class Endpoint:
+    """Routing state of one endpoint"""
+
+    def __init__(self, name: str, client: ModelClient):
+        self.name = name
+        self.client = client
+        self.latency: Optional[float] = None  # EWMA of successful query latency
+        self.quota = 1.0                      # remaining share reported by the server
+        self.cooldown_until = 0.0
+        self.strikes = 0                      # consecutive rate-limit failures
+        self.current = 0.0                    # smooth weighted round-robin counter
+
+    def limiter_headroom(self) -> float:
+        """Headroom of the endpoint's own rate limiter (may read the shared store)"""
+        if self.client.rate_limiter is None:
+            return 1.0
+        return self.client.rate_limiter.headroom()
+
+    def headroom(self, limiter_headroom: float = 1.0) -> float:
+        """Remaining quota: server report and the limiter's headroom, whichever is lower"""
+        return max(MIN_QUOTA, min(self.quota, limiter_headroom))
+
+
+class LoadBalancedModelClient(CompositeModelClient):
+    """
+    Composite client that fans queries out over equivalent endpoints
+
+    Endpoints are chosen by smooth weighted round-robin. An endpoint's weight
+    is its throughput per connection (1 / EWMA latency) times its remaining
+    quota, the lower of the x-ratelimit-* headroom in its last response and
+    its own rate limiter's headroom. An endpoint that runs out of retries on
+    rate limits cools down (doubling from `cooldown` up to `max_cooldown`)
+    and the query is rerouted to another endpoint.
+    """
+
+    def __init__(self,
+                 endpoints: List[ModelClient],
+                 names: Optional[List[str]] = None,
+                 alpha: float = 0.2,
+                 cooldown: float = 5.0,
+                 max_cooldown: float = 60.0):
+        """
+        Initialize load balancer
+
+        Args:
+            endpoints: Clients for the same logical model (e.g. one per API key)
+            names: Endpoint labels (default: SERVICE_NAME#1, SERVICE_NAME#2, ...)
+            alpha: Weight of the newest latency in the EWMA
+            cooldown: Seconds an endpoint is skipped after failing on rate limits
+            max_cooldown: Upper bound of the doubling cooldown
+        """
+        if not endpoints:
+            raise ValueError("LoadBalancedModelClient needs at least one endpoint")
+        super().__init__(endpoints)
+        self.SERVICE_NAME = getattr(endpoints[0], "SERVICE_NAME", endpoints[0].model_name)
+        names = names or [f"{getattr(e, 'SERVICE_NAME', e.model_name)}#{i + 1}"
+                          for i, e in enumerate(endpoints)]
+        self.endpoints = [Endpoint(name, client) for name, client in zip(names, endpoints)]
+        self.names = names
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+
+    def _pick(self, exclude: List[int]) -> int:
+        """Index of the next endpoint (smooth weighted round-robin over available ones)"""
+        # Limiter headroom is snapshotted before taking the lock: with a shared
+        # store it is a database read, which must not serialize dispatch
+        limiter_headroom = [endpoint.limiter_headroom() for endpoint in self.endpoints]
+        with self._lock:
+            now = time.monotonic()
+            candidates = [i for i in range(len(self.endpoints)) if i not in exclude]
+            ready = [i for i in candidates if self.endpoints[i].cooldown_until <= now]
+            if not ready:
+                # Every remaining endpoint is cooling down: use the one that recovers first
+                self.record_stat("balancer", "all_cooling")
+                return min(candidates, key=lambda i: self.endpoints[i].cooldown_until)
+
+            # Endpoints without a latency sample yet are weighted like the average one
+            known = [e.latency for e in self.endpoints if e.latency is not None]
+            default_latency = sum(known) / len(known) if known else 1.0
+            weights = {i: self.endpoints[i].headroom(limiter_headroom[i]) /
+                          (self.endpoints[i].latency or default_latency)
+                       for i in ready}
+            for i in ready:
+                self.endpoints[i].current += weights[i]
+            best = max(ready, key=lambda i: self.endpoints[i].current)
+            self.endpoints[best].current -= sum(weights.values())
+            return best
+
+    def _send(self, i: int, prompt: str, image_path: Union[str, List[str]],
+              generation: Optional[GenerationConfig]) -> str:
+        """Query endpoint i and update its latency, quota and cooldown"""
+        endpoint = self.endpoints[i]
+        name = endpoint.name
+        report = watch_quota()
+        start = time.monotonic()
+        try:
+            response = endpoint.client.query(prompt, image_path, generation=generation)
+        except ModelQueryError as e:
+            with self._lock:
+                endpoint.quota = report.get("quota", endpoint.quota)
+                if e.error_class == "rate_limit":
+                    endpoint.strikes += 1
+                    endpoint.quota = 0.0
+                    endpoint.cooldown_until = time.monotonic() + min(
+                        self.max_cooldown, self.cooldown * 2 ** (endpoint.strikes - 1))
+            self.record_stat("balancer", f"{name}_failures")
+            if e.error_class == "rate_limit":
+                self.record_stat("balancer", f"{name}_rate_limited")
+            raise
+        latency = time.monotonic() - start
+
+        with self._lock:
+            endpoint.latency = latency if endpoint.latency is None else (
+                self.alpha * latency + (1 - self.alpha) * endpoint.latency)
+            endpoint.quota = report.get("quota", 1.0 if endpoint.strikes else endpoint.quota)
+            endpoint.strikes = 0
+        self.record_stat("balancer", f"{name}_requests")
+        self.record_stat("balancer", f"{name}_latency_seconds", latency)
+        usage = (self.peek_request_metrics() or {}).get("usage") or {}
+        tokens = usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+        if tokens:
+            self.record_stat("balancer", f"{name}_tokens", tokens)
+        self._record_request_metric("endpoint", name)
+        return response
+
+    def query(self, prompt: str, image_path: Union[str, List[str]],
+              generation: Optional[GenerationConfig] = None) -> str:
+        """
+        Query one endpoint, rerouting to the others on endpoint failures
+
+        Args:
+            prompt: Text prompt
+            image_path: Path to image file, or list of paths for multiple images
+            generation: Decoding budget for this query
+
+        Returns:
+            Model response
+        """
+        tried = []
+        while True:
+            i = self._pick(tried)
+            try:
+                return self._send(i, prompt, image_path, generation)
+            except ModelQueryError as e:
+                if e.error_class in REQUEST_ERRORS or len(tried) + 1 >= len(self.endpoints):
+                    raise
+                tried.append(i)
+                self.record_stat("balancer", "reroutes")
+
+    def endpoint_stats(self) -> Dict[str, Dict]:
+        """Current latency estimate, quota headroom and cooldown per endpoint"""
+        limiter_headroom = [endpoint.limiter_headroom() for endpoint in self.endpoints]
+        with self._lock:
+            now = time.monotonic()
+            return {e.name: {"latency": round(e.latency, 3) if e.latency is not None else None,
+                             "headroom": round(e.headroom(h), 3),
+                             "cooling_down": e.cooldown_until > now}
+                    for e, h in zip(self.endpoints, limiter_headroom)}
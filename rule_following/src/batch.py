@@ -0,0 +1,250 @@
+"""
+Offline batch-API execution mode
+Serializes every request of a test run into an OpenAI-style batch JSONL
+file, submits it, polls until the batch finishes and serves the results to
+the normal parsing and scoring loop by case_id
+"""
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+from .generation import GenerationConfig
+from .model_client import ModelClientWrapper, ModelQueryError, OpenAICompatibleModelClient
+from .usage import BATCH_PRICE_FACTOR
+
+# Batch states after which polling stops
+TERMINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+# Request parameters that cannot be used inside a batch
+_ONLINE_ONLY_PARAMS = {"stream"}
+
+
+def request_fingerprint(prompt: str, image_paths: Union[str, List[str]]) -> str:
+    """Identify a request by its prompt and image paths"""
+    if isinstance(image_paths, str):
+        image_paths = [image_paths]
+    digest = hashlib.sha256(prompt.encode("utf-8"))
+    for path in image_paths:
+        digest.update(b"\0" + os.path.abspath(path).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class BatchModelClient(ModelClientWrapper):
+    """
+    Runs a test's queries through a provider batch API
+
+    Wraps an OpenAICompatibleModelClient. When a test calls prefetch() with
+    all of its requests, they are written to a JSONL file, uploaded and
+    submitted as one batch; prefetch() returns once the batch has finished.
+    query() then answers from the batch results. Requests missing from the
+    results (e.g. not part of the batch) or with a malformed result entry
+    fall back to the online API.
+    """
+
+    def __init__(self,
+                 client: OpenAICompatibleModelClient,
+                 work_dir: str = "./output/batches",
+                 poll_interval: float = 30.0,
+                 completion_window: str = "24h",
+                 timeout: Optional[float] = None):
+        """
+        Initialize batch client
+
+        Args:
+            client: Online client whose endpoint, model and parameters are used
+            work_dir: Directory for the request and result JSONL files
+            poll_interval: Seconds between batch status checks
+            completion_window: Completion window requested from the provider
+            timeout: Give up waiting after this many seconds (None = wait indefinitely)
+        """
+        super().__init__(client)
+        self.work_dir = work_dir
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+        self.timeout = timeout
+        self._results: Dict[str, Union[Tuple[str, Optional[Dict]], Exception]] = {}
+
+    def _request_params(self, generation: Optional[GenerationConfig]) -> Dict:
+        """Decoding parameters for batched requests (as in the online client)"""
+        params = {}
+        if generation is not None:
+            params.update(generation.for_model(self.model_name).to_params())
+        params.update({key: value for key, value in self.client.extra_params.items()
+                       if key not in _ONLINE_ONLY_PARAMS})
+        return params
+
+    def write_batch_file(self, requests: List[Dict],
+                         generation: Optional[GenerationConfig] = None) -> str:
+        """
+        Serialize requests to an OpenAI batch JSONL file
+
+        Args:
+            requests: Dicts with custom_id, prompt and image_paths
+            generation: Decoding budget applied to every request
+
+        Returns:
+            Path of the written file
+        """
+        os.makedirs(self.work_dir, exist_ok=True)
+        path = os.path.join(
+            self.work_dir, f"batch_input_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jsonl")
+        params = self._request_params(generation)
+
+        with open(path, 'w', encoding='utf-8') as f:
+            for request in requests:
+                image_paths = request["image_paths"]
+                if isinstance(image_paths, str):
+                    image_paths = [image_paths]
+                body = {
+                    "model": self.model_name,
+                    "messages": self.client._build_messages(request["prompt"], image_paths),
+                    **params
+                }
+                f.write(json.dumps({
+                    "custom_id": request["custom_id"],
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": body
+                }) + "\n")
+        return path
+
+    def submit(self, path: str):
+        """Upload a batch file and create the batch; returns the batch object"""
+        api = self.client.client
+        with open(path, 'rb') as f:
+            input_file = api.files.create(file=f, purpose="batch")
+        return api.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window
+        )
+
+    def wait(self, batch_id: str):
+        """Poll a batch until it reaches a terminal state; returns the batch object"""
+        api = self.client.client
+        start = time.monotonic()
+        while True:
+            batch = api.batches.retrieve(batch_id)
+            counts = batch.request_counts
+            if counts is not None:
+                print(f"  Batch {batch_id}: {batch.status} "
+                      f"({counts.completed}/{counts.total} done, {counts.failed} failed)")
+            else:
+                print(f"  Batch {batch_id}: {batch.status}")
+            if batch.status in TERMINAL_STATES:
+                return batch
+            if self.timeout is not None and time.monotonic() - start > self.timeout:
+                raise TimeoutError(
+                    f"Batch {batch_id} still {batch.status} after {self.timeout:.0f}s")
+            time.sleep(self.poll_interval)
+
+    def download_results(self, batch) -> Dict[str, Union[Tuple[str, Optional[Dict]], Exception]]:
+        """
+        Fetch output and error files of a finished batch
+
+        Returns:
+            Mapping of custom_id to (response text, usage), or to an exception
+            for failed requests (retryable for malformed result entries)
+        """
+        api = self.client.client
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            text = api.files.content(file_id).text
+            path = os.path.join(self.work_dir, f"{batch.id}_{file_id}.jsonl")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+
+            for line in text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get("response") or {}
+                body = response.get("body") or {}
+                if record.get("error") or response.get("status_code", 200) != 200:
+                    error = record.get("error") or body.get("error") or {}
+                    results[record["custom_id"]] = ModelQueryError(
+                        f"Batch request failed: {error.get('message', error)}",
+                        error_class="batch_error")
+                    continue
+                try:
+                    choice = body["choices"][0]
+                    content = choice["message"]["content"]
+                except (KeyError, IndexError, TypeError) as e:
+                    results[record["custom_id"]] = ModelQueryError(
+                        f"Malformed batch result: missing {e}",
+                        error_class="batch_error", retryable=True)
+                    continue
+                self._record_truncation(choice.get("finish_reason"))
+                results[record["custom_id"]] = (content, body.get("usage"))
+        return results
+
+    def prefetch(self, requests: List[Dict],
+                 generation: Optional[GenerationConfig] = None):
+        """
+        Run all requests of a test as one batch and keep the results
+
+        Args:
+            requests: Dicts with custom_id, prompt and image_paths
+            generation: Decoding budget applied to every request
+        """
+        if not requests:
+            return
+
+        # custom_id must be unique within a batch
+        pending = {}  # custom_id -> request fingerprint
+        batch_requests = []
+        for request in requests:
+            custom_id = request["custom_id"]
+            if custom_id in pending:
+                custom_id = f"{custom_id}#{len(batch_requests)}"
+            pending[custom_id] = request_fingerprint(
+                request["prompt"], request["image_paths"])
+            batch_requests.append(dict(request, custom_id=custom_id))
+
+        path = self.write_batch_file(batch_requests, generation)
+        print(f"\n📦 Batch file: {path} ({len(batch_requests)} requests)")
+        batch = self.submit(path)
+        print(f"  Submitted batch {batch.id}")
+        batch = self.wait(batch.id)
+
+        results = self.download_results(batch)
+        for custom_id, request_key in pending.items():
+            if custom_id in results:
+                self._results[request_key] = results[custom_id]
+
+        n_failed = sum(1 for value in results.values() if isinstance(value, Exception))
+        self.record_stat("batch", "requests", len(requests))
+        self.record_stat("batch", "completed", len(results) - n_failed)
+        self.record_stat("batch", "failed", n_failed)
+        print(f"  Batch {batch.id} {batch.status}: "
+              f"{len(results) - n_failed} succeeded, {n_failed} failed, "
+              f"{len(requests) - len(results)} missing\n")
+
+    def query(self, prompt: str, image_path: Union[str, List[str]],
+              generation: Optional[GenerationConfig] = None) -> str:
+        """
+        Return the batch result for a request, or query online if it has none
+
+        Args:
+            prompt: Text prompt
+            image_path: Path to image file, or list of paths for multiple images
+            generation: Decoding budget (used for online fallbacks)
+
+        Returns:
+            Model response
+        """
+        result = self._results.pop(request_fingerprint(prompt, image_path), None)
+        if result is None or getattr(result, "retryable", False):
+            self.record_stat("batch", "online_fallbacks")
+            return self.client.query(prompt, image_path, generation=generation)
+        self._start_request_metrics(batch=True)
+        if isinstance(result, Exception):
+            raise result
+        text, usage = result
+        self._record_usage(usage, price_factor=BATCH_PRICE_FACTOR)
+        return text
@@ -0,0 +1,84 @@
+"""
+Single-flight coalescing of identical in-flight requests
+Cases that render to the same board with the same question (empty boards in
+Spatial Test 0, repeated castling positions in Levels 5 and 6) produce
+identical requests. While one is in flight, identical ones wait for it and
+share its response instead of paying for their own upstream call
+"""
+
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+
+class _Call:
+    """An upstream call that duplicates can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; concurrent callers of the same
+    key get the leader's result (or its exception)
+
+    Only calls that overlap are coalesced: once the leader returns, the next
+    call with the same key goes upstream again (repeats across time are the
+    response cache's job). Share one instance between clients to coalesce
+    across them, e.g. the endpoints of a load balancer.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], str]) -> Tuple[str, bool]:
+        """
+        Run fn unless a call with the same key is in flight, then share its result
+
+        Args:
+            key: Request fingerprint
+            fn: Function performing the upstream call
+
+        Returns:
+            (result, shared) where shared is True for coalesced duplicates
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict:
+        """Return upstream calls and coalesced duplicates"""
+        with self._lock:
+            total = self.leaders + self.coalesced
+            return {
+                "upstream_calls": self.leaders,
+                "coalesced": self.coalesced,
+                "coalesced_rate": round(self.coalesced / total, 3) if total else 0.0,
+            }
@@ -18,7 +18,8 @@ class ConditionTest1(ConditionTestBase):
                  seed: int = 42,
                  auto_timestamp: bool = True,
                  rate_limit_requests: int = 0,
-                 rate_limit_pause: int = 0):
+                 rate_limit_pause: int = 0,
+                 max_concurrency: int = 1):
         """
         Initialize Condition Test 1
         Args:
@@ -26,8 +27,9 @@ class ConditionTest1(ConditionTestBase):
             n_cases_per_level: Number of cases per condition level (1-6)
             seed: Random seed for reproducibility
             auto_timestamp: If True, append timestamp to output directory
-            rate_limit_requests: Number of requests before pausing
-            rate_limit_pause: Seconds to pause
+            rate_limit_requests: Requests allowed per rate_limit_pause window (0 = no limit)
+            rate_limit_pause: Window length in seconds for rate_limit_requests
+            max_concurrency: Number of model queries in flight (1 = sequential)
         """
         super().__init__(
             test_layer=1,
@@ -36,7 +38,8 @@ class ConditionTest1(ConditionTestBase):
             seed=seed,
             auto_timestamp=auto_timestamp,
             rate_limit_requests=rate_limit_requests,
-            rate_limit_pause=rate_limit_pause
+            rate_limit_pause=rate_limit_pause,
+            max_concurrency=max_concurrency
         )
 
     def generate_test_cases(self) -> List[Dict]:
@@ -9,6 +9,8 @@ from typing import List, Dict, Optional
 from datetime import datetime
 from enum import Enum
 
+from .usage import summarize_usage
+
 
 class TestType(Enum):
     SPATIAL = "spatial"
@@ -44,6 +46,7 @@ class TestResult:
     expected_answer: str = ""  # "yes", "no", "unknown"
     model_response: str = ""
     correct: bool = False
+    error: bool = False  # request failed (retries exhausted), not scored
 
     # Test 2 specific (Know-Do Gap)
     declarative_question: Optional[str] = None
@@ -58,6 +61,7 @@ class TestResult:
     image_paths: List[str] = None
     timestamp: str = ""
     model_name: str = ""
+    request_metrics: Optional[Dict] = None  # latency, attempts, ttft, ...
 
     def __post_init__(self):
         if self.image_paths is None:
@@ -118,22 +122,29 @@ def create_summary(results: List[TestResult], stats: Dict,
                - test_correct
                - test_incorrect
                - test_correct_given_verified
+               - errors (optional, failed requests; excluded from the rates)
+               - client_stats (optional, from ModelClient.get_run_stats)
+               - concurrency (optional, from AdaptiveConcurrencyController.stats)
+               - pack_size (optional, cases per request when packing)
         test_cases: Optional list of test case dictionaries for type breakdown
 
     Returns:
         Summary dictionary
     """
-    # Calculate rates
+    # Calculate rates over the cases that got an answer
+    answered = stats['total'] - stats.get('errors', 0)
     verification_rate = stats['verification_passed'] / \
-        stats['total'] if stats['total'] > 0 else 0
+        answered if answered > 0 else 0
     accuracy_given_verified = stats['test_correct_given_verified'] / \
         stats['verification_passed'] if stats['verification_passed'] > 0 else 0
     overall_accuracy = stats['test_correct'] / \
-        stats['total'] if stats['total'] > 0 else 0
+        answered if answered > 0 else 0
 
     summary = {
         "model_name": results[0].model_name if results else "unknown",
         "total_cases": stats['total'],
+        "answered_cases": answered,
+        "errors": stats.get('errors', 0),
         "timestamp": datetime.now().isoformat(),
         "board_recognition": {
             "verified_correctly": stats['verification_passed'],
@@ -181,6 +192,19 @@ def create_summary(results: List[TestResult], stats: Dict,
         summary["accuracy_by_type_verified_only"] = dict(
             sorted(type_breakdown.items()))
 
+    # Tokens and cost per case type (from each case's request metrics)
+    token_usage = summarize_usage(results, test_cases)
+    if token_usage["cases_with_usage"]:
+        summary["token_usage"] = token_usage
+
+    # Client-side counters recorded during the run (cache, etc.)
+    if stats.get('client_stats'):
+        summary["client_stats"] = stats['client_stats']
+    if stats.get('concurrency'):
+        summary["concurrency"] = stats['concurrency']
+    if stats.get('pack_size', 1) > 1:
+        summary["pack_size"] = stats['pack_size']
+
     return summary
 
 
@@ -0,0 +1,276 @@
+"""
+Query executor for running test cases against a model client
+Dispatches model queries sequentially or through a bounded thread pool,
+while always yielding outcomes in the original case order
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+from .telemetry import set_queue_wait
+
+# Error classes that signal provider overload and trigger a multiplicative cut
+CONGESTION_ERRORS = {"rate_limit", "timeout"}
+
+T = TypeVar("T")
+
+
+@dataclass
+class QueryOutcome:
+    """Result of a single model query (either a response or an error)"""
+    response: Optional[str] = None
+    error: Optional[Exception] = None
+    metrics: Optional[Dict] = None
+
+
+class AdaptiveConcurrencyController:
+    """
+    AIMD (additive-increase, multiplicative-decrease) concurrency limit
+
+    The limit grows by one after each full window of healthy responses
+    (a window is `limit` consecutive successes with latency within
+    latency_tolerance of the best observed latency). A 429 or timeout cuts
+    the limit by decrease_factor, at most once per cooldown so a burst of
+    failures from the same congested window counts once. Other errors only
+    reset the growth window. Every change is appended to a trace.
+    """
+
+    def __init__(self,
+                 max_limit: int,
+                 initial_limit: Optional[int] = None,
+                 min_limit: int = 1,
+                 decrease_factor: float = 0.5,
+                 latency_tolerance: float = 2.0,
+                 cooldown: float = 5.0,
+                 name: str = "default"):
+        """
+        Initialize controller
+
+        Args:
+            max_limit: Upper bound on queries in flight
+            initial_limit: Starting limit (default: min(4, max_limit))
+            min_limit: Lower bound on queries in flight
+            decrease_factor: Multiplier applied on 429s and timeouts
+            latency_tolerance: Latency (relative to the best seen) still considered healthy
+            cooldown: Minimum seconds between two decreases
+            name: Label used in reports
+        """
+        if max_limit < min_limit:
+            raise ValueError(
+                f"max_limit ({max_limit}) must be >= min_limit ({min_limit})")
+        self.name = name
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+
+        self.limit = max(min_limit, min(max_limit, initial_limit or 4))
+        self.in_flight = 0
+        self.min_latency = None
+        self._healthy_streak = 0
+        self._last_decrease = float("-inf")
+        self._start = time.monotonic()
+        self._cond = threading.Condition()
+        self.trace: List[Dict] = []
+        self._log("start")
+
+    def _log(self, event: str, latency: Optional[float] = None,
+             error_class: Optional[str] = None):
+        """Append a trace entry (caller holds the lock or is the constructor)"""
+        self.trace.append({
+            "t": round(time.monotonic() - self._start, 3),
+            "event": event,
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "latency": round(latency, 3) if latency is not None else None,
+            "error_class": error_class,
+        })
+
+    @contextmanager
+    def slot(self):
+        """Hold one in-flight slot, blocking while the limit is reached"""
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify()
+
+    def record(self, latency: float, error_class: Optional[str] = None):
+        """
+        Feed back the result of one API attempt
+
+        Args:
+            latency: Seconds the attempt took
+            error_class: None on success, else the class from classify_error()
+        """
+        with self._cond:
+            now = time.monotonic()
+            if error_class in CONGESTION_ERRORS:
+                self._healthy_streak = 0
+                if now - self._last_decrease >= self.cooldown:
+                    new_limit = max(self.min_limit,
+                                    int(self.limit * self.decrease_factor))
+                    self._last_decrease = now
+                    if new_limit != self.limit:
+                        self.limit = new_limit
+                        self._log("decrease", latency, error_class)
+                return
+
+            if error_class is not None:
+                self._healthy_streak = 0
+                return
+
+            if self.min_latency is None or latency < self.min_latency:
+                self.min_latency = latency
+            if latency > self.min_latency * self.latency_tolerance:
+                self._healthy_streak = 0
+                return
+
+            self._healthy_streak += 1
+            if self._healthy_streak >= self.limit and self.limit < self.max_limit:
+                self.limit += 1
+                self._healthy_streak = 0
+                self._log("increase", latency)
+                self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        """Return current limit and trace summary"""
+        with self._cond:
+            limits = [entry["limit"] for entry in self.trace]
+            return {
+                "name": self.name,
+                "limit": self.limit,
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "peak_limit": max(limits),
+                "increases": sum(1 for e in self.trace if e["event"] == "increase"),
+                "decreases": sum(1 for e in self.trace if e["event"] == "decrease"),
+                "min_latency": round(self.min_latency, 3) if self.min_latency is not None else None,
+            }
+
+    def save_trace(self, filepath: str):
+        """
+        Write the concurrency trace as JSON lines
+
+        Args:
+            filepath: Output file path
+        """
+        with self._cond:
+            trace = list(self.trace)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            for entry in trace:
+                f.write(json.dumps(entry) + "\n")
+
+
+class QueryExecutor:
+    """
+    Runs model queries with a configurable concurrency limit
+
+    With max_concurrency=1 queries are issued lazily one at a time, exactly
+    like a plain for-loop. With max_concurrency>1 all queries are submitted
+    to a thread pool up front and outcomes are yielded in submission order,
+    so callers can score and record results as if the run were sequential.
+    An optional AdaptiveConcurrencyController further limits how many of
+    those queries are actually in flight at any moment.
+    """
+
+    def __init__(self, max_concurrency: int = 1,
+                 controller: Optional[AdaptiveConcurrencyController] = None):
+        """
+        Initialize executor
+
+        Args:
+            max_concurrency: Maximum number of queries in flight (1 = sequential)
+            controller: Adaptive limit applied on top of max_concurrency (optional)
+        """
+        if max_concurrency < 1:
+            raise ValueError(
+                f"max_concurrency must be >= 1, got {max_concurrency}")
+        self.max_concurrency = max_concurrency
+        self.controller = controller
+
+    def map(self, query_fn: Callable[[dict], str],
+            cases: Iterable[dict],
+            metrics_fn: Optional[Callable[[], Optional[Dict]]] = None,
+            order: Optional[List[int]] = None) -> Iterator[QueryOutcome]:
+        """
+        Apply query_fn to every case and yield outcomes in case order
+
+        Exceptions raised by query_fn are captured in QueryOutcome.error
+        instead of propagating, so one failing case never aborts the run.
+
+        Args:
+            query_fn: Function taking a test case and returning the raw response
+            cases: Test cases to query
+            metrics_fn: Called in the worker thread after each query to collect
+                per-request metrics (e.g. ModelClient.pop_request_metrics)
+            order: Case indices in the order queries are sent (e.g.
+                prompting.prefix_order); outcomes still follow case order
+
+        Yields:
+            QueryOutcome for each case, in the same order as cases
+        """
+        if order is not None:
+            cases = list(cases)
+            yield from restore_order(order, self.map(query_fn, [cases[i] for i in order], metrics_fn))
+            return
+
+        def run_one(case: dict) -> QueryOutcome:
+            try:
+                if self.controller is not None and self.max_concurrency > 1:
+                    queued_at = time.monotonic()
+                    with self.controller.slot():
+                        set_queue_wait(time.monotonic() - queued_at)
+                        outcome = QueryOutcome(response=query_fn(case))
+                else:
+                    outcome = QueryOutcome(response=query_fn(case))
+            except Exception as e:
+                outcome = QueryOutcome(error=e)
+            if metrics_fn is not None:
+                outcome.metrics = metrics_fn()
+            return outcome
+
+        if self.max_concurrency == 1:
+            for case in cases:
+                yield run_one(case)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                thread_name_prefix="query") as pool:
+            futures = [pool.submit(run_one, case) for case in cases]
+            for future in futures:
+                yield future.result()
+
+
+def restore_order(order: List[int], outcomes: Iterable[T]) -> Iterator[T]:
+    """
+    Yield outcomes produced in dispatch order back in item order
+
+    outcomes[k] belongs to item order[k]. Each outcome is yielded as soon as
+    every item before it has arrived.
+
+    Args:
+        order: Item indices in dispatch order (a permutation of range(n))
+        outcomes: Outcomes in dispatch order
+
+    Yields:
+        Outcomes in item order
+    """
+    pending = {}
+    next_index = 0
+    for index, outcome in zip(order, outcomes):
+        pending[index] = outcome
+        while next_index in pending:
+            yield pending.pop(next_index)
+            next_index += 1
@@ -0,0 +1,229 @@
+"""
+Multi-provider failover
+Routes queries for one logical model across several providers that serve
+it (e.g. Qwen3-VL on DashScope, SiliconFlow and Novita), skipping providers
+whose circuit breaker has tripped on errors or latency and probing them
+again after a cooldown
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Union
+
+from .generation import GenerationConfig
+from .model_client import CompositeModelClient, ModelClient, ModelQueryError
+
+# Errors caused by the request itself: another provider would fail the same way
+REQUEST_ERRORS = {"bad_request", "payload_too_large"}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Error-rate / latency circuit breaker for one provider
+
+    Closed: requests flow, outcomes fill a rolling window. The breaker opens
+    when the window's error rate reaches error_threshold, or the mean latency
+    of its successes exceeds latency_threshold. Open: requests are refused
+    for `cooldown` seconds, then one probe is let through (half-open); its
+    success closes the breaker, its failure opens it again.
+    """
+
+    def __init__(self,
+                 name: str,
+                 error_threshold: float = 0.5,
+                 latency_threshold: Optional[float] = None,
+                 window: int = 20,
+                 min_requests: int = 5,
+                 cooldown: float = 30.0):
+        """
+        Initialize breaker
+
+        Args:
+            name: Provider label used in reports
+            error_threshold: Error rate in the window that trips the breaker
+            latency_threshold: Mean success latency (seconds) that trips it (None = off)
+            window: Number of recent outcomes considered
+            min_requests: Outcomes needed before the breaker may trip
+            cooldown: Seconds to stay open before probing
+        """
+        self.name = name
+        self.error_threshold = error_threshold
+        self.latency_threshold = latency_threshold
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.trips = 0
+        self._outcomes = deque(maxlen=window)  # (ok, latency)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (claims the probe when half-open)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release_probe(self):
+        """Give back a half-open probe whose outcome says nothing about the provider"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record(self, ok: bool, latency: float) -> bool:
+        """Feed the outcome of a request; returns True if this tripped the breaker"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                if ok:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                    return False
+                self._open()
+                return True
+            if self.state == OPEN:
+                return False
+
+            self._outcomes.append((ok, latency))
+            if len(self._outcomes) < self.min_requests:
+                return False
+            failures = sum(1 for outcome_ok, _ in self._outcomes if not outcome_ok)
+            latencies = [lat for outcome_ok, lat in self._outcomes if outcome_ok]
+            too_slow = (self.latency_threshold is not None and latencies and
+                        sum(latencies) / len(latencies) > self.latency_threshold)
+            if failures / len(self._outcomes) >= self.error_threshold or too_slow:
+                self._open()
+                return True
+            return False
+
+    def _open(self):
+        self.state = OPEN
+        self.trips += 1
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        print(f"  ⚡ Circuit open for {self.name} (retry in {self.cooldown:.0f}s)")
+
+    def opened_at(self) -> float:
+        with self._lock:
+            return self._opened_at
+
+
+class FailoverModelClient(CompositeModelClient):
+    """
+    Composite client that sends each query to the first healthy provider
+
+    Providers are tried in priority order; a provider is skipped while its
+    breaker is open, and a query that fails on one provider (after that
+    provider's own retries) moves on to the next. When every breaker is
+    open, the provider that tripped first is tried anyway.
+    """
+
+    def __init__(self,
+                 providers: List[ModelClient],
+                 names: Optional[List[str]] = None,
+                 error_threshold: float = 0.5,
+                 latency_threshold: Optional[float] = None,
+                 window: int = 20,
+                 min_requests: int = 5,
+                 cooldown: float = 30.0):
+        """
+        Initialize failover client
+
+        Args:
+            providers: Clients for the same logical model, in priority order
+            names: Provider labels (default: SERVICE_NAME or model_name)
+            error_threshold: Error rate that trips a provider's breaker
+            latency_threshold: Mean latency (seconds) that trips a provider's breaker
+            window: Outcomes per breaker window
+            min_requests: Outcomes needed before a breaker may trip
+            cooldown: Seconds before an open breaker is probed
+        """
+        if not providers:
+            raise ValueError("FailoverModelClient needs at least one provider")
+        super().__init__(providers)
+        self.providers = providers
+        self.names = names or [getattr(p, "SERVICE_NAME", p.model_name) for p in providers]
+        self.breakers = [
+            CircuitBreaker(name, error_threshold, latency_threshold, window, min_requests, cooldown)
+            for name in self.names
+        ]
+
+    def _try(self, i: int, prompt: str, image_path: Union[str, List[str]],
+             generation: Optional[GenerationConfig]) -> str:
+        """Query provider i and feed its breaker"""
+        name, breaker = self.names[i], self.breakers[i]
+        start = time.monotonic()
+        try:
+            response = self.providers[i].query(prompt, image_path, generation=generation)
+        except ModelQueryError as e:
+            if e.error_class in REQUEST_ERRORS:
+                # The request was at fault; let the next one probe instead
+                breaker.release_probe()
+            else:
+                self.record_stat("failover", f"{name}_failures")
+                if breaker.record(False, time.monotonic() - start):
+                    self.record_stat("failover", f"{name}_trips")
+            raise
+        except BaseException:
+            # Local failures (e.g. image encoding) never reached the provider
+            breaker.release_probe()
+            raise
+        latency = time.monotonic() - start
+        if breaker.record(True, latency):
+            self.record_stat("failover", f"{name}_trips")
+        self.record_stat("failover", f"{name}_requests")
+        self.record_stat("failover", f"{name}_latency_seconds", latency)
+        self._record_request_metric("provider", name)
+        return response
+
+    def query(self, prompt: str, image_path: Union[str, List[str]],
+              generation: Optional[GenerationConfig] = None) -> str:
+        """
+        Query the first healthy provider, failing over on provider errors
+
+        Args:
+            prompt: Text prompt
+            image_path: Path to image file, or list of paths for multiple images
+            generation: Decoding budget for this query
+
+        Returns:
+            Model response
+        """
+        last_error = None
+        for i, breaker in enumerate(self.breakers):
+            # allow() is only asked right before use: it may claim a half-open probe
+            if not breaker.allow():
+                continue
+            if last_error is not None:
+                self.record_stat("failover", "switches")
+            try:
+                return self._try(i, prompt, image_path, generation)
+            except ModelQueryError as e:
+                if e.error_class in REQUEST_ERRORS:
+                    raise
+                last_error = e
+
+        if last_error is not None:
+            raise last_error
+
+        # Every breaker is open: try the provider that has been down longest
+        self.record_stat("failover", "all_open")
+        i = min(range(len(self.breakers)), key=lambda j: self.breakers[j].opened_at())
+        return self._try(i, prompt, image_path, generation)
+
+    def provider_stats(self) -> Dict[str, Dict]:
+        """Breaker state and trip count per provider"""
+        return {name: {"state": breaker.state, "trips": breaker.trips}
+                for name, breaker in zip(self.names, self.breakers)}
@@ -0,0 +1,132 @@
+"""
+Generation budgets for model queries
+Declares max_tokens, stop strings and temperature per test suite, derived
+from the expected answers of the generated cases, so models are not left
+decoding long explanations nobody reads
+"""
+
+import fnmatch
+import math
+import os
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, List, Optional
+
+# Extra output tokens for models that reason before answering
+THINKING_HEADROOM_TOKENS = 8192
+# Budget multiplier and fixed slack on top of the expected answer length
+HEADROOM_FACTOR = 2.0
+HEADROOM_TOKENS = 64
+# Rough characters per token of English answer text
+CHARS_PER_TOKEN = 4
+
+# Models that reason before answering; their reasoning tokens count against
+# max_tokens. Shell-style patterns (case-insensitive) matched against the
+# model name without its "vendor/" prefix, so dated snapshots and router
+# names of a family match too. Add more with register_reasoning_model or a
+# comma-separated VLM_REASONING_MODELS
+REASONING_MODELS = {
+    # Qwen3-VL thinking editions
+    "qwen3-vl-*-thinking*",
+    # xAI (the grok-4 fast models also come as "-non-reasoning")
+    "grok-4",
+    "grok-4-[0-9]*",
+    "grok-4*-reasoning",
+    # Google
+    "gemini-2.5-pro*",
+    "gemini-2.5-flash",
+    "gemini-2.5-flash-preview*",
+    "gemini-3-pro*",
+    # Zhipu AI
+    "glm-4.1v-thinking*",
+    "glm-4.5v*",
+}
+# Variants that switch reasoning off, excluded whatever the patterns say
+NON_REASONING_MARKERS = ("non-reasoning", "nothinking")
+
+
+def register_reasoning_model(pattern: str):
+    """Give models matching pattern (a name or shell-style pattern) the extra output budget"""
+    REASONING_MODELS.add(pattern.lower())
+
+
+def is_reasoning_model(model_name: str) -> bool:
+    """True if model_name matches a reasoning model pattern"""
+    name = model_name.lower().rsplit("/", 1)[-1]
+    if any(marker in name for marker in NON_REASONING_MARKERS):
+        return False
+    extra = os.getenv("VLM_REASONING_MODELS", "")
+    patterns = REASONING_MODELS | {p.strip().lower() for p in extra.split(",") if p.strip()}
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of text"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass(frozen=True)
+class GenerationConfig:
+    """Decoding parameters sent with every query of a test suite"""
+    max_tokens: Optional[int] = None
+    stop: Optional[List[str]] = None
+    temperature: Optional[float] = None
+
+    @classmethod
+    def for_combined_answer(cls, verification_tokens: int = 32,
+                            answer_tokens: int = 8) -> "GenerationConfig":
+        """
+        Budget for the two-line "Verification: ... / Main answer: ..." format
+
+        No stop strings are set: both lines are needed by the parser and the
+        model may put a blank line between them. With streaming enabled the
+        client also stops reading once both lines are complete. Temperature
+        is left to the provider.
+
+        Args:
+            verification_tokens: Expected length of the verification answer
+            answer_tokens: Expected length of the main answer
+
+        Returns:
+            GenerationConfig with max_tokens set
+        """
+        # "Verification: " and "Main answer: " prefixes are ~4 tokens each
+        expected = verification_tokens + answer_tokens + 8
+        return cls(max_tokens=int(expected * HEADROOM_FACTOR) + HEADROOM_TOKENS)
+
+    def fit_answers(self, verification_answers: Iterable[str],
+                    main_answers: Iterable[str]) -> "GenerationConfig":
+        """
+        Size max_tokens to the longest expected answers of a suite
+
+        A max_tokens that is already set (e.g. from --max-tokens) is kept.
+
+        Args:
+            verification_answers: Expected verification answers of the cases
+            main_answers: Expected main answers of the cases
+
+        Returns:
+            GenerationConfig with max_tokens set
+        """
+        if self.max_tokens is not None:
+            return self
+        budget = GenerationConfig.for_combined_answer(
+            verification_tokens=max(map(estimate_tokens, verification_answers), default=0),
+            answer_tokens=max(map(estimate_tokens, main_answers), default=0))
+        return replace(self, max_tokens=budget.max_tokens)
+
+    def for_model(self, model_name: str) -> "GenerationConfig":
+        """Return this config, with extra room for reasoning models"""
+        if self.max_tokens is not None and is_reasoning_model(model_name):
+            return replace(self, max_tokens=self.max_tokens + THINKING_HEADROOM_TOKENS)
+        return self
+
+    def to_params(self) -> Dict:
+        """API parameters for the fields that are set"""
+        params = {}
+        if self.max_tokens is not None:
+            params["max_tokens"] = self.max_tokens
+        if self.stop:
+            params["stop"] = list(self.stop)
+        if self.temperature is not None:
+            params["temperature"] = self.temperature
+        return params
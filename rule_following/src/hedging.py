@@ -0,0 +1,186 @@
+"""
+Hedged requests for cutting tail latency
+If an API call has not completed by the observed p95 latency, a duplicate
+is sent and whichever finishes first wins. Hedges are capped to a fraction
+of all requests so the extra spend stays bounded
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, Tuple
+
+
+class LatencyTracker:
+    """Rolling window of recent successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        """
+        Initialize tracker
+
+        Args:
+            window: Number of most recent latencies kept
+        """
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, latency: float):
+        """Record one latency in seconds"""
+        with self._lock:
+            self._samples.append(latency)
+
+    def count(self) -> int:
+        """Number of latencies in the window"""
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Return the q-quantile (0-1) of the window, or None if empty
+
+        Uses the nearest-rank method.
+        """
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))
+        return ordered[index]
+
+
+class RequestHedger:
+    """
+    Races a duplicate request against a slow primary
+
+    The hedge delay is the given percentile of recent latencies; until
+    min_samples calls have completed, no hedges are sent. The number of
+    hedges never exceeds max_hedge_rate times the number of primary requests.
+    The losing call is not cancelled (the HTTP request is already paid for);
+    its result is discarded. The hedge delay counts from when the primary
+    starts running, so time spent queued for a thread never fires a hedge.
+    """
+
+    def __init__(self,
+                 percentile: float = 0.95,
+                 max_hedge_rate: float = 0.1,
+                 min_samples: int = 20,
+                 window: int = 200,
+                 max_concurrency: int = 32):
+        """
+        Initialize hedger
+
+        Args:
+            percentile: Latency quantile after which a hedge is sent
+            max_hedge_rate: Maximum hedges per primary request (e.g. 0.1 = 10%)
+            min_samples: Latencies required before hedging starts
+            window: Number of recent latencies used for the percentile
+            max_concurrency: Queries in flight at once (e.g. -j); the pool
+                has a thread for the primary and the hedge of each
+        """
+        self.percentile = percentile
+        self.max_hedge_rate = max_hedge_rate
+        self.min_samples = min_samples
+        self.latencies = LatencyTracker(window)
+
+        self.primaries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=2 * max_concurrency,
+                                        thread_name_prefix="hedge")
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while still warming up"""
+        if self.latencies.count() < self.min_samples:
+            return None
+        return self.latencies.percentile(self.percentile)
+
+    def _claim_hedge(self) -> bool:
+        """Reserve one hedge if under the hedge-rate cap"""
+        with self._lock:
+            if self.hedges + 1 > self.max_hedge_rate * self.primaries:
+                return False
+            self.hedges += 1
+            return True
+
+    def _timed(self, fn: Callable[[], str]) -> str:
+        """Run fn and record its latency on success"""
+        start = time.monotonic()
+        result = fn()
+        self.latencies.add(time.monotonic() - start)
+        return result
+
+    def call(self, fn: Callable[[], str],
+             admit: Optional[Callable[[], bool]] = None) -> Tuple[str, bool, bool]:
+        """
+        Run fn, sending a duplicate if it is slower than the hedge delay
+
+        Args:
+            fn: Function performing one API call
+            admit: Optional check run before hedging (e.g. a non-blocking
+                rate-limit acquire); the hedge is skipped if it returns False
+
+        Returns:
+            Tuple of (result, hedged, hedge_won)
+
+        Raises:
+            Exception: The primary's error if every launched call failed
+        """
+        with self._lock:
+            self.primaries += 1
+
+        delay = self.hedge_delay()
+        if delay is None:
+            return self._timed(fn), False, False
+
+        # Calls run in pool threads with a copy of the caller's context so
+        # per-request metrics land in the caller's dict
+        started = threading.Event()
+
+        def run_primary() -> str:
+            started.set()
+            return self._timed(fn)
+
+        primary = self._pool.submit(contextvars.copy_context().run, run_primary)
+        # The delay runs from the primary's start, not from its submission
+        started.wait()
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result(), False, False
+
+        if not self._claim_hedge():
+            return primary.result(), False, False
+        if admit is not None and not admit():
+            with self._lock:
+                self.hedges -= 1
+            return primary.result(), False, False
+
+        hedge = self._pool.submit(contextvars.copy_context().run, self._timed, fn)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    won = future is hedge
+                    if won:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result(), True, won
+
+        # Both failed: surface the primary's error to the retry engine
+        raise primary.exception()
+
+    def stats(self) -> Dict:
+        """Return hedge counters and the current hedge delay"""
+        delay = self.hedge_delay()
+        with self._lock:
+            return {
+                "primaries": self.primaries,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": round(self.hedges / self.primaries, 3) if self.primaries else 0.0,
+                "max_hedge_rate": self.max_hedge_rate,
+                "hedge_delay": round(delay, 3) if delay is not None else None,
+            }
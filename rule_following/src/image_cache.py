@@ -0,0 +1,162 @@
+"""
+In-process cache of base64-encoded image payloads
+Avoids re-reading and re-encoding the same board image for retries,
+repeated models and concurrent requests, and optionally transcodes images
+to a smaller format before they are encoded
+"""
+
+import base64
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from .transcode import TranscodeConfig, transcode_image
+
+
+@dataclass(frozen=True)
+class ImagePayload:
+    """Encoded image ready to be sent to an API"""
+    data_url: str
+    sha256: str  # of the bytes sent
+    media_type: str
+    file_size: int  # bytes sent
+    original_size: int = 0  # bytes on disk
+
+
+def guess_media_type(image_path: str) -> str:
+    """Determine image media type from the file extension"""
+    if image_path.lower().endswith('.png'):
+        return "image/png"
+    elif image_path.lower().endswith(('.jpg', '.jpeg')):
+        return "image/jpeg"
+    else:
+        return "image/png"  # default
+
+
+class ImagePayloadCache:
+    """
+    Bounded LRU cache of image data URLs
+
+    Entries are keyed by (absolute path, mtime, file size), so an image that
+    is regenerated on disk is transparently re-encoded. Memory is accounted
+    as the total length of the cached data URLs. With a TranscodeConfig,
+    images are re-encoded on a miss and the bytes before and after counted.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024,
+                 transcode: Optional[TranscodeConfig] = None):
+        """
+        Initialize image payload cache
+
+        Args:
+            max_bytes: Maximum total size of cached data URLs
+            transcode: Re-encode images before upload (None = send as stored)
+        """
+        self.max_bytes = max_bytes
+        self.transcode = transcode
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_transcode(self, transcode: Optional[TranscodeConfig]):
+        """
+        Change the transcoding of future payloads (drops cached payloads)
+
+        Args:
+            transcode: TranscodeConfig, or None to send images as stored
+        """
+        with self._lock:
+            self.transcode = transcode
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def get(self, image_path: str) -> ImagePayload:
+        """
+        Return the encoded payload for an image, encoding it on a miss
+
+        Args:
+            image_path: Path to image file
+
+        Returns:
+            ImagePayload with data URL and content hash
+        """
+        st = os.stat(image_path)
+        key = (os.path.abspath(image_path), st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload
+            self.misses += 1
+
+        # Encode outside the lock so other threads are not blocked on I/O
+        with open(image_path, "rb") as image_file:
+            original = image_file.read()
+        media_type = guess_media_type(image_path)
+        transcode = self.transcode
+        raw = original
+        if transcode is not None:
+            raw, media_type = transcode_image(original, transcode, media_type)
+        payload = ImagePayload(
+            data_url=f"data:{media_type};base64,{base64.b64encode(raw).decode('utf-8')}",
+            sha256=hashlib.sha256(raw).hexdigest(),
+            media_type=media_type,
+            file_size=len(raw),
+            original_size=len(original),
+        )
+
+        with self._lock:
+            self.bytes_before += len(original)
+            self.bytes_after += len(raw)
+            if key not in self._entries and transcode is self.transcode:
+                self._entries[key] = payload
+                self.current_bytes += len(payload.data_url)
+                self._evict_locked()
+        return payload
+
+    def _evict_locked(self):
+        """Drop least-recently-used entries until under max_bytes"""
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= len(evicted.data_url)
+            self.evictions += 1
+
+    def clear(self):
+        """Remove all cached payloads"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and memory usage"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "transcode": self.transcode.format if self.transcode else None,
+                "bytes_before": self.bytes_before,
+                "bytes_after": self.bytes_after,
+            }
+
+
+# Process-wide cache shared by all model clients
+_default_cache = ImagePayloadCache()
+
+
+def get_image_cache() -> ImagePayloadCache:
+    """Return the process-wide image payload cache"""
+    return _default_cache
@@ -0,0 +1,704 @@
+"""
+Local stand-in for an OpenAI-compatible API
+Serves chat completions (plain and streaming) plus the files and batches
+endpoints used by the batch execution mode, so real clients can be
+exercised and load-tested end-to-end without network access or API spend.
+Latency, 429/500 faults and answer quality are configurable; answers are
+synthesized from the test-case ground truth registered with the server.
+
+Command line:
+    python -m src.mock_server --port 8765 --latency 0.5 --rate-429 0.05 \\
+        --cases-dir ../perception/gomoku_density_test
+"""
+
+import argparse
+import base64
+import binascii
+import glob
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from .image_cache import get_image_cache
+from .packing import packed_case_count
+from .rate_limiter import CHARS_PER_TOKEN, PIXELS_PER_IMAGE_TOKEN
+from .simulation import LatencyModel, synthesize_matrix
+
+# Reply used when no responder is given and the request matches no case
+DEFAULT_REPLY = "Verification: unknown\nMain answer: unknown"
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:24]}"
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def usage_block(prompt_tokens: int, text: str, cached_tokens: int = 0) -> Dict:
+    """Usage of a reply, as reported in responses and the final stream chunk"""
+    completion_tokens = _estimate_tokens(text)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        "completion_tokens_details": {"reasoning_tokens": 0},
+    }
+
+
+def chat_completion(model: str, text: str, finish_reason: str = "stop",
+                    prompt_tokens: int = 0, cached_tokens: int = 0) -> Dict:
+    """Build a chat.completion response body"""
+    return {
+        "id": _new_id("chatcmpl"),
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "finish_reason": finish_reason,
+            "message": {"role": "assistant", "content": text},
+        }],
+        "usage": usage_block(prompt_tokens, text, cached_tokens),
+    }
+
+
+def _chunk(completion_id: str, model: str, delta: Dict,
+           finish_reason: Optional[str] = None) -> Dict:
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def image_key(image_bytes: bytes) -> str:
+    """Key under which a case is registered: digest of its first image"""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def request_images(body: Dict) -> List[bytes]:
+    """Decode the data-URL images of a chat request (any message, any position)"""
+    images = []
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if not isinstance(content, list):
+            continue
+        for part in content:
+            if part.get("type") != "image_url":
+                continue
+            url = part["image_url"]["url"] if isinstance(part.get("image_url"), dict) \
+                else part.get("image_url", "")
+            if url.startswith("data:") and "," in url:
+                try:
+                    images.append(base64.b64decode(url.split(",", 1)[1]))
+                except (binascii.Error, ValueError):
+                    pass
+    return images
+
+
+def request_text(body: Dict) -> str:
+    """Concatenated text parts of a chat request"""
+    texts = []
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, str):
+            texts.append(content)
+        elif isinstance(content, list):
+            texts.extend(part.get("text", "") for part in content if part.get("type") == "text")
+    return "\n".join(texts)
+
+
+def system_prefix(body: Dict) -> str:
+    """Text of the leading system message(s), the part a provider can serve from its prompt cache"""
+    texts = []
+    for message in body.get("messages", []):
+        if message.get("role") != "system":
+            break
+        content = message.get("content")
+        texts.append(content if isinstance(content, str) else
+                     "".join(part.get("text", "") for part in content or []))
+    return "\n".join(texts)
+
+
+def prompt_tokens(body: Dict) -> int:
+    """Estimate the prompt tokens of a chat request (text length and image pixels)"""
+    tokens = len(request_text(body)) // CHARS_PER_TOKEN
+    for image in request_images(body):
+        try:
+            with Image.open(io.BytesIO(image)) as img:
+                width, height = img.size
+            tokens += max(1, width * height // PIXELS_PER_IMAGE_TOKEN)
+        except OSError:
+            tokens += 1000
+    return tokens
+
+
+class AnswerBook:
+    """
+    Ground-truth answers keyed by the first image of each case
+
+    Rule-following cases answer in the combined "Verification: / Main answer:"
+    format; perception cases answer "Game State: <matrix>". accuracy is the
+    probability a main answer (or matrix cell) is right, verification_rate the
+    probability the verification line is right.
+    """
+
+    def __init__(self, accuracy: float = 1.0, verification_rate: float = 1.0,
+                 seed: Optional[int] = None):
+        """
+        Initialize answer book
+
+        Args:
+            accuracy: Probability of a correct main answer / matrix cell
+            verification_rate: Probability of a correct verification answer
+            seed: Random seed for reproducible mistakes
+        """
+        self.accuracy = accuracy
+        self.verification_rate = verification_rate
+        self._rng = random.Random(seed)
+        self._cases: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._cases)
+
+    def _register(self, image_path: str, entry: Dict):
+        with open(image_path, 'rb') as f:
+            key = image_key(f.read())
+        # Clients in this process may upload a transcoded copy of the file
+        sent_key = get_image_cache().get(image_path).sha256
+        with self._lock:
+            self._cases[key] = entry
+            self._cases[sent_key] = entry
+
+    def add_test_cases(self, test_cases: List[Dict]):
+        """Register rule-following test cases (image_paths or image_path)"""
+        for case in test_cases:
+            paths = case.get("image_paths") or case.get("image_path")
+            if isinstance(paths, list):
+                paths = paths[0]
+            if paths:
+                self._register(paths, {
+                    "verification": case.get("verification_expected", ""),
+                    "expected": case.get("expected", ""),
+                })
+
+    def add_perception_case(self, case: Union[str, Dict], base_dir: str = "."):
+        """Register a perception test case (JSON path or dict with image_file and ground_truth)"""
+        if isinstance(case, str):
+            base_dir = os.path.dirname(case)
+            with open(case) as f:
+                case = json.load(f)
+        image_path = case["image_file"]
+        if not os.path.exists(image_path):
+            image_path = os.path.join(base_dir, os.path.basename(image_path))
+        self._register(image_path, {"matrix": case["ground_truth"]})
+
+    def add_cases_dir(self, directory: str) -> int:
+        """Register every perception case JSON found under a directory; returns the count"""
+        added = 0
+        for path in glob.glob(os.path.join(directory, "**", "*.json"), recursive=True):
+            try:
+                with open(path) as f:
+                    case = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if isinstance(case, dict) and "image_file" in case and "ground_truth" in case:
+                try:
+                    self.add_perception_case(path)
+                    added += 1
+                except OSError:
+                    continue
+        return added
+
+    def respond(self, body: Dict) -> Optional[str]:
+        """Synthesize an answer for a chat request, or None if no case matches"""
+        images = request_images(body)
+        if not images:
+            return None
+        n_packed = packed_case_count(request_text(body))
+        if n_packed is not None and n_packed == len(images):
+            entries = [self._cases.get(image_key(image)) for image in images]
+            if any(entry is None or "matrix" in entry for entry in entries):
+                return None
+            return "\n".join(f"Case {i}:\n{self._combined_answer(entry)}"
+                             for i, entry in enumerate(entries, 1))
+
+        entry = self._cases.get(image_key(images[0]))
+        if entry is None:
+            return None
+        if "matrix" in entry:
+            with self._lock:
+                return f"Game State: {self._noisy_matrix(entry['matrix'])}"
+        return self._combined_answer(entry)
+
+    def _combined_answer(self, entry: Dict) -> str:
+        with self._lock:
+            verification = entry["verification"] if \
+                self._rng.random() < self.verification_rate else "I'm not sure"
+            answer = entry["expected"]
+            if self._rng.random() >= self.accuracy:
+                answer = self._rng.choice(
+                    [a for a in ("yes", "no", "unknown") if a != answer.lower()])
+        return f"Verification: {verification}\nMain answer: {answer}"
+
+    def _noisy_matrix(self, matrix: List[List[int]]) -> List[List[int]]:
+        return synthesize_matrix(len(matrix), self._rng, ground_truth=matrix,
+                                 error_rate=1 - self.accuracy)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Large backlog so load tests with many concurrent clients are not refused
+    request_queue_size = 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Routes requests to the owning MockOpenAIServer"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_bytes(self, data: bytes, content_type: str = "application/octet-stream"):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _not_found(self):
+        self._send_json(404, {"error": {"message": f"No route for {self.path}",
+                                        "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        mock = self.server.mock
+        path = self.path.split("?")[0].rstrip("/")
+        body = self._read_body()
+
+        try:
+            if path.endswith("/chat/completions"):
+                mock.handle_chat(self, json.loads(body), len(body))
+            elif path.endswith("/files"):
+                self._send_json(200, mock.store_file(self.headers, body))
+            elif path.endswith("/batches"):
+                payload = json.loads(body)
+                batch = mock.create_batch(payload["input_file_id"], payload.get("endpoint", ""),
+                                          payload.get("completion_window", "24h"))
+                self._send_json(200, batch)
+            else:
+                self._not_found()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away (e.g. closed a stream early)
+            self.close_connection = True
+
+    def do_GET(self):
+        mock = self.server.mock
+        parts = self.path.split("?")[0].rstrip("/").split("/")
+
+        if len(parts) >= 2 and parts[-2] == "batches" and parts[-1] in mock.batches:
+            self._send_json(200, mock.batches[parts[-1]])
+        elif len(parts) >= 3 and parts[-1] == "content" and parts[-2] in mock.files:
+            self._send_bytes(mock.files[parts[-2]]["data"])
+        elif len(parts) >= 2 and parts[-2] == "files" and parts[-1] in mock.files:
+            self._send_json(200, mock.files[parts[-1]]["object"])
+        else:
+            self._not_found()
+
+
+class MockOpenAIServer:
+    """
+    OpenAI-compatible HTTP server running in a background thread
+
+    Use as a context manager or call start()/stop(). Point a client at
+    base_url with any API key. Register cases with server.answers to get
+    ground-truth answers; stats() reports what the server saw.
+    """
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 responder: Optional[Callable[[Dict], str]] = None,
+                 answers: Optional[AnswerBook] = None,
+                 latency: Optional[LatencyModel] = None,
+                 rate_429: float = 0.0,
+                 rate_500: float = 0.0,
+                 retry_after: float = 1.0,
+                 tokens_per_second: float = 0.0,
+                 batch_delay: float = 0.5,
+                 key_rpm: Optional[float] = None,
+                 seed: Optional[int] = None):
+        """
+        Initialize server
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 = any free port)
+            responder: Function mapping a chat request body to the reply text
+                (default: ground-truth answers, else DEFAULT_REPLY)
+            answers: Ground-truth answer book (created empty if not given)
+            latency: Time to first token (whole response when not streaming)
+            rate_429: Fraction of chat requests rejected with 429 rate_limit
+            rate_500: Fraction of chat requests failing with 500 server_error
+            retry_after: Retry-After seconds sent with 429 responses
+            tokens_per_second: Decode speed after the first token (0 = instant)
+            batch_delay: Seconds a batch stays "in_progress" before it is processed
+            key_rpm: Chat requests per minute allowed per API key (None = unlimited);
+                enforced per clock minute and reported in x-ratelimit-* headers
+            seed: Random seed for latency and fault sampling
+        """
+        self.answers = answers if answers is not None else AnswerBook(seed=seed)
+        self.responder = responder or (lambda body: self.answers.respond(body) or DEFAULT_REPLY)
+        self.latency = latency or LatencyModel()
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.retry_after = retry_after
+        self.tokens_per_second = tokens_per_second
+        self.batch_delay = batch_delay
+        self.key_rpm = key_rpm
+        self._key_windows: Dict[str, Tuple[int, int]] = {}  # API key -> (minute, requests)
+        self.files: Dict[str, Dict] = {}
+        self.batches: Dict[str, Dict] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._cached_prefixes = set()
+        self._stats = {"requests": 0, "streamed": 0, "prompt_cache_hits": 0, "key_rate_limited": 0,
+                       "bytes_in": 0, "bytes_out": 0, "in_flight": 0, "peak_in_flight": 0, "status_codes": {}}
+
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.mock = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="mock-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def serve_forever(self):
+        """Serve in the calling thread (for command-line use)"""
+        self._httpd.serve_forever()
+
+    def stats(self) -> Dict:
+        """Chat request counters: totals, status codes, bytes and peak concurrency"""
+        with self._lock:
+            return dict(self._stats, status_codes=dict(self._stats["status_codes"]))
+
+    # Chat completions
+
+    def _sample(self):
+        """Draw (latency, fault status) for one request"""
+        with self._lock:
+            delay = self.latency.sample(self._rng)
+            roll = self._rng.random()
+        if roll < self.rate_429:
+            return delay, 429
+        if roll < self.rate_429 + self.rate_500:
+            return delay, 500
+        return delay, 200
+
+    def _count(self, **counters):
+        with self._lock:
+            for key, value in counters.items():
+                if key == "status":
+                    codes = self._stats["status_codes"]
+                    codes[value] = codes.get(value, 0) + 1
+                else:
+                    self._stats[key] += value
+            self._stats["peak_in_flight"] = max(
+                self._stats["peak_in_flight"], self._stats["in_flight"])
+
+    def handle_chat(self, handler: _Handler, body: Dict, size: int = 0):
+        """Answer one chat completion request (with latency, faults and streaming)"""
+        self._count(requests=1, bytes_in=size, in_flight=1)
+        try:
+            admitted, quota_headers = self._admit_key(handler.headers.get("Authorization", ""))
+            if not admitted:
+                self._count(status=429, key_rate_limited=1)
+                handler._send_json(429, {"error": {
+                    "message": "Rate limit reached for this API key (mock)",
+                    "type": "rate_limit_error", "code": "rate_limit_exceeded"}},
+                    headers=quota_headers)
+                return
+
+            delay, status = self._sample()
+            if status == 429:
+                # Rate limits are rejected quickly, as real gateways do
+                self._count(status=429)
+                handler._send_json(429, {"error": {
+                    "message": "Rate limit reached (mock)", "type": "rate_limit_error",
+                    "code": "rate_limit_exceeded"}},
+                    headers={"Retry-After": f"{self.retry_after:g}"})
+                return
+
+            time.sleep(delay)
+            if status == 500:
+                self._count(status=500)
+                handler._send_json(500, {"error": {
+                    "message": "Internal server error (mock)", "type": "server_error"}})
+                return
+
+            model = body.get("model", "mock")
+            text = self.responder(body)
+            finish_reason = "stop"
+            max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+            if max_tokens and _estimate_tokens(text) > max_tokens:
+                text, finish_reason = text[:max_tokens * 4], "length"
+
+            self._count(status=200)
+            n_prompt = prompt_tokens(body)
+            n_cached = self._cached_tokens(body)
+            if body.get("stream"):
+                self._count(streamed=1)
+                include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+                self._stream(handler, model, text, finish_reason,
+                             usage_block(n_prompt, text, n_cached) if include_usage else None,
+                             quota_headers)
+            else:
+                payload = chat_completion(model, text, finish_reason, n_prompt, n_cached)
+                self._count(bytes_out=len(json.dumps(payload)))
+                handler._send_json(200, payload, headers=quota_headers)
+        finally:
+            self._count(in_flight=-1)
+
+    def _cached_tokens(self, body: Dict) -> int:
+        """Prompt tokens of a system prefix already seen (a prompt-cache hit), else 0"""
+        prefix = system_prefix(body)
+        if not prefix:
+            return 0
+        with self._lock:
+            hit = prefix in self._cached_prefixes
+            self._cached_prefixes.add(prefix)
+        if hit:
+            self._count(prompt_cache_hits=1)
+        return len(prefix) // CHARS_PER_TOKEN if hit else 0
+
+    def _admit_key(self, api_key: str) -> Tuple[bool, Dict[str, str]]:
+        """Count a request against its key's per-minute quota; returns (admitted, headers)"""
+        if not self.key_rpm:
+            return True, {}
+        now = time.time()
+        minute = int(now // 60)
+        with self._lock:
+            window, count = self._key_windows.get(api_key, (minute, 0))
+            if window != minute:
+                count = 0
+            admitted = count < self.key_rpm
+            if admitted:
+                count += 1
+            self._key_windows[api_key] = (minute, count)
+        headers = {"x-ratelimit-limit-requests": f"{self.key_rpm:g}",
+                   "x-ratelimit-remaining-requests": f"{max(0, self.key_rpm - count):g}"}
+        if not admitted:
+            headers["Retry-After"] = f"{(minute + 1) * 60 - now:.1f}"
+        return admitted, headers
+
+    def _stream(self, handler: _Handler, model: str, text: str, finish_reason: str,
+                usage: Optional[Dict] = None, headers: Optional[Dict] = None):
+        """Send a reply as server-sent events, one ~token (4 chars) per chunk"""
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Transfer-Encoding", "chunked")
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+
+        def send(data: str):
+            event = f"data: {data}\n\n".encode("utf-8")
+            handler.wfile.write(f"{len(event):X}\r\n".encode("ascii") + event + b"\r\n")
+            handler.wfile.flush()
+            self._count(bytes_out=len(event))
+
+        completion_id = _new_id("chatcmpl")
+        send(json.dumps(_chunk(completion_id, model, {"role": "assistant", "content": ""})))
+        for start in range(0, len(text), 4):
+            if self.tokens_per_second > 0:
+                time.sleep(1 / self.tokens_per_second)
+            send(json.dumps(_chunk(completion_id, model, {"content": text[start:start + 4]})))
+        send(json.dumps(_chunk(completion_id, model, {}, finish_reason)))
+        if usage is not None:
+            # stream_options.include_usage: a last chunk without choices
+            send(json.dumps(dict(_chunk(completion_id, model, {}), choices=[], usage=usage)))
+        send("[DONE]")
+        handler.wfile.write(b"0\r\n\r\n")
+        handler.wfile.flush()
+
+    # Files and batches
+
+    def store_file(self, headers, data: bytes) -> Dict:
+        """Store an uploaded multipart file and return its file object"""
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {headers['Content-Type']}\r\n\r\n".encode("latin-1") + data)
+        content, filename, purpose = b"", "upload.jsonl", "batch"
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name == "file":
+                content = part.get_payload(decode=True)
+                filename = part.get_filename() or filename
+            elif name == "purpose":
+                purpose = part.get_content().strip()
+        return self._add_file(content, filename, purpose)
+
+    def _add_file(self, content: bytes, filename: str, purpose: str) -> Dict:
+        file_object = {
+            "id": _new_id("file"),
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        with self._lock:
+            self.files[file_object["id"]] = {"object": file_object, "data": content}
+        return file_object
+
+    def create_batch(self, input_file_id: str, endpoint: str, completion_window: str) -> Dict:
+        """Register a batch and process it in the background"""
+        lines = [line for line in self.files[input_file_id]["data"].decode("utf-8").splitlines()
+                 if line.strip()]
+        batch = {
+            "id": _new_id("batch"),
+            "object": "batch",
+            "endpoint": endpoint,
+            "input_file_id": input_file_id,
+            "completion_window": completion_window,
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+        }
+        with self._lock:
+            self.batches[batch["id"]] = batch
+        threading.Thread(target=self._process_batch, args=(batch, lines), daemon=True).start()
+        return batch
+
+    def _process_batch(self, batch: Dict, lines):
+        time.sleep(self.batch_delay)
+        outputs, errors = [], []
+        for line in lines:
+            request = json.loads(line)
+            try:
+                reply = self.responder(request["body"])
+                outputs.append(json.dumps({
+                    "id": _new_id("batch_req"),
+                    "custom_id": request["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "request_id": _new_id("req"),
+                        "body": chat_completion(request["body"].get("model", "mock"), reply,
+                                                prompt_tokens=prompt_tokens(request["body"])),
+                    },
+                    "error": None,
+                }))
+                batch["request_counts"]["completed"] += 1
+            except Exception as e:
+                errors.append(json.dumps({
+                    "id": _new_id("batch_req"),
+                    "custom_id": request["custom_id"],
+                    "response": None,
+                    "error": {"code": "server_error", "message": str(e)},
+                }))
+                batch["request_counts"]["failed"] += 1
+
+        if outputs:
+            batch["output_file_id"] = self._add_file(
+                ("\n".join(outputs) + "\n").encode("utf-8"), "output.jsonl", "batch_output")["id"]
+        if errors:
+            batch["error_file_id"] = self._add_file(
+                ("\n".join(errors) + "\n").encode("utf-8"), "errors.jsonl", "batch_output")["id"]
+        batch["status"] = "completed"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock server")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5,
+                        help="Mean latency to first token in seconds (default: 0.5)")
+    parser.add_argument("--distribution", type=str, default="lognormal",
+                        choices=["fixed", "uniform", "exponential", "lognormal"],
+                        help="Latency distribution (default: lognormal)")
+    parser.add_argument("--sigma", type=float, default=0.5,
+                        help="Shape of the lognormal distribution (default: 0.5)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                        help="Streaming decode speed (default: instant)")
+    parser.add_argument("--rate-429", type=float, default=0.0,
+                        help="Fraction of requests answered with 429 (default: 0)")
+    parser.add_argument("--rate-500", type=float, default=0.0,
+                        help="Fraction of requests answered with 500 (default: 0)")
+    parser.add_argument("--accuracy", type=float, default=0.9,
+                        help="Probability of a correct answer / matrix cell (default: 0.9)")
+    parser.add_argument("--cases-dir", type=str, nargs="*", default=[],
+                        help="Directories with perception case JSON files to answer from")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    answers = AnswerBook(accuracy=args.accuracy, seed=args.seed)
+    for directory in args.cases_dir:
+        print(f"Loaded {answers.add_cases_dir(directory)} cases from {directory}")
+
+    server = MockOpenAIServer(
+        host=args.host, port=args.port, answers=answers,
+        latency=LatencyModel(args.distribution, args.latency, args.sigma),
+        rate_429=args.rate_429, rate_500=args.rate_500,
+        tokens_per_second=args.tokens_per_second, seed=args.seed)
+    print(f"🧪 Mock OpenAI server on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.stats(), indent=2))
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,13 +5,148 @@ send images as base64-encoded data URLs
 """
 
 from abc import ABC, abstractmethod
-from typing import Optional, Union, List
-import base64
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Optional, Union, List, Dict, Callable, Iterator, Tuple
 import os
-from dotenv import load_dotenv
+import random
+import threading
+import time
+from .response_cache import ResponseCache
+from .image_cache import ImagePayloadCache, get_image_cache
+from .rate_limiter import RateLimiter, estimate_request_tokens
+from .coalescing import SingleFlight
+from .hedging import RequestHedger
+from .streaming import CombinedAnswerDetector
+from .packing import packed_case_count
+from .prompting import PROMPT_LAYOUTS, LayeredPrompt, build_messages
+from .generation import GenerationConfig
+from .transport import get_http_client
+from .telemetry import get_telemetry
+from .simulation import LatencyModel, SimulatedAPIError, matrix_size_from_prompt, synthesize_matrix
+from .usage import add_usage, estimate_cost, extract_usage
+from .providers import load_env
+
+# Timing details of the request currently handled in this context
+# (copied into hedge threads, so both calls write to the same dict)
+_request_metrics: ContextVar[Optional[Dict]] = ContextVar("request_metrics", default=None)
+
+
+class ModelQueryError(Exception):
+    """Raised when a model query fails after all retry attempts"""
+
+    def __init__(self, message: str, error_class: str = "unknown",
+                 retryable: bool = False, attempts: int = 1):
+        super().__init__(message)
+        self.error_class = error_class
+        self.retryable = retryable
+        self.attempts = attempts
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Retry configuration for model queries
+
+    Delays grow exponentially from base_delay up to max_delay; jitter is the
+    fraction of each delay that is randomized (0 = none, 1 = full jitter).
+    A Retry-After header from the server takes precedence when longer.
+    A rate limit whose wait exceeds max_rate_limit_wait fails at once, so a
+    load balancer can reroute the query to another endpoint instead.
+    """
+    max_attempts: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    max_total_time: float = 300.0
+    jitter: float = 0.5
+    max_rate_limit_wait: Optional[float] = None
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Seconds to wait before the next attempt
+
+        Args:
+            attempt: Number of the attempt that just failed (1-based)
+            retry_after: Server-requested delay, if any
+
+        Returns:
+            Delay in seconds
+        """
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        delay *= 1 - self.jitter * random.random()
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+# HTTP status codes worth retrying, mapped to their error class
+_RETRYABLE_STATUS = {
+    408: "timeout",
+    409: "conflict",
+    429: "rate_limit",
+}
+_FATAL_STATUS = {
+    400: "bad_request",
+    401: "auth",
+    403: "auth",
+    404: "not_found",
+    413: "payload_too_large",
+    422: "bad_request",
+}
+
+
+def _parse_retry_after(headers) -> Optional[float]:
+    """Read a Retry-After delay (seconds) from response headers, if present"""
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return float(value) / 1000.0
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error: Exception) -> Tuple[str, bool, Optional[float]]:
+    """
+    Classify an API exception for the retry engine
+
+    Works on openai SDK exceptions (status_code / response.headers) as well
+    as plain timeout and connection errors, without importing openai.
+
+    Args:
+        error: Exception raised by an API call
+
+    Returns:
+        Tuple of (error_class, retryable, retry_after_seconds)
+    """
+    status = getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    retry_after = _parse_retry_after(getattr(response, "headers", None))
 
-# Load environment variables
-load_dotenv()
+    if isinstance(status, int):
+        if status in _RETRYABLE_STATUS:
+            return _RETRYABLE_STATUS[status], True, retry_after
+        if status >= 500:
+            return "server_error", True, retry_after
+        return _FATAL_STATUS.get(status, f"http_{status}"), False, None
+
+    name = type(error).__name__
+    if isinstance(error, TimeoutError) or "Timeout" in name:
+        return "timeout", True, None
+    if isinstance(error, ConnectionError) or "Connection" in name:
+        return "connection", True, None
+    return "unknown", False, None
 
 
 class ModelClient(ABC):
@@ -19,15 +154,298 @@ class ModelClient(ABC):
 
     def __init__(self, model_name: str = "test_model"):
         self.model_name = model_name
+        self._stats_lock = threading.Lock()
+        self.run_stats = {}
+        self.rate_limiter = None
+        self.retry_policy = RetryPolicy()
+        self.concurrency_controller = None
+        self.hedger = None
+        self.single_flight = None
+
+    def record_stat(self, section: str, key: str, amount: float = 1):
+        """
+        Add amount to a per-run counter (thread-safe)
+
+        Args:
+            section: Counter group, e.g. "cache"
+            key: Counter name within the group, e.g. "hits"
+            amount: Value to add
+        """
+        with self._stats_lock:
+            group = self.run_stats.setdefault(section, {})
+            group[key] = group.get(key, 0) + amount
+
+    def _start_request_metrics(self, **initial) -> Dict:
+        """Begin collecting per-request metrics for the current query"""
+        metrics = dict(initial)
+        _request_metrics.set(metrics)
+        return metrics
+
+    def _record_request_metric(self, key: str, value):
+        """Set a per-request metric (ignored outside a query)"""
+        metrics = _request_metrics.get()
+        if metrics is not None:
+            metrics[key] = value
+
+    def peek_request_metrics(self) -> Optional[Dict]:
+        """Return the metrics of the query in progress in this thread (not cleared)"""
+        return _request_metrics.get()
+
+    def pop_request_metrics(self) -> Optional[Dict]:
+        """
+        Return and clear the metrics of the last query made in this thread
+
+        Returns:
+            Dict such as {"latency": 1.2, "attempts": 1, "ttft": 0.4}, or None
+        """
+        metrics = _request_metrics.get()
+        _request_metrics.set(None)
+        return metrics
+
+    def get_run_stats(self) -> Dict:
+        """Return a copy of the per-run counters"""
+        with self._stats_lock:
+            return {section: dict(group) for section, group in self.run_stats.items()}
+
+    def reset_run_stats(self):
+        """Clear the per-run counters (called at the start of each test run)"""
+        with self._stats_lock:
+            self.run_stats = {}
+
+    def set_rate_limiter(self, rate_limiter: Optional[RateLimiter]):
+        """
+        Attach a (possibly shared) rate limiter that every query waits on
+
+        Args:
+            rate_limiter: RateLimiter instance, or None to disable limiting
+        """
+        self.rate_limiter = rate_limiter
+
+    @contextmanager
+    def attached_rate_limiter(self, rate_limiter: Optional[RateLimiter]) -> Iterator[None]:
+        """
+        Attach a rate limiter for the duration of a block (e.g. one test run)
+
+        The previous limiter is restored when the block exits, so a limiter
+        built from one run's settings does not outlive the run.
+
+        Args:
+            rate_limiter: RateLimiter instance, or None to leave the current one
+        """
+        if rate_limiter is None:
+            yield
+            return
+        previous = self.rate_limiter
+        self.set_rate_limiter(rate_limiter)
+        try:
+            yield
+        finally:
+            self.set_rate_limiter(previous)
+
+    def set_concurrency_controller(self, controller):
+        """
+        Attach an AdaptiveConcurrencyController fed with every attempt's outcome
+
+        Args:
+            controller: Controller instance, or None to use the fixed concurrency
+        """
+        self.concurrency_controller = controller
+
+    def set_hedger(self, hedger: Optional[RequestHedger]):
+        """
+        Enable hedged requests (a duplicate is sent when a call exceeds p95)
+
+        Args:
+            hedger: RequestHedger instance, or None to disable hedging
+        """
+        self.hedger = hedger
+
+    def set_single_flight(self, single_flight: Optional[SingleFlight]):
+        """
+        Coalesce identical concurrent queries into one upstream call
+
+        Args:
+            single_flight: SingleFlight instance (share one to coalesce across
+                clients), or None for independent calls (e.g. sampling runs)
+        """
+        self.single_flight = single_flight
+
+    def _run_attempt(self, call: Callable[[], str], prompt: str,
+                     image_paths: List[str], max_output_tokens: int = 0) -> str:
+        """
+        Run a single API attempt, hedging it if a hedger is attached
+
+        Hedges must pass the rate limiter without waiting. Each hedge is
+        counted as extra spend under the "hedge" run stats.
+        """
+        if self.hedger is None:
+            return call()
+
+        tokens = estimate_request_tokens(prompt, image_paths, max_output_tokens)
+
+        def admit() -> bool:
+            return self.rate_limiter is None or self.rate_limiter.try_acquire(tokens)
+
+        response, hedged, hedge_won = self.hedger.call(call, admit)
+        if hedged:
+            self.record_stat("hedge", "fired")
+            self.record_stat("hedge", "extra_requests")
+            self.record_stat("hedge", "extra_tokens_estimated", tokens)
+            if hedge_won:
+                self.record_stat("hedge", "won")
+        return response
+
+    def _wait_for_rate_limit(self, prompt: str, image_paths: List[str],
+                             max_output_tokens: int = 0) -> int:
+        """
+        Block until the rate limiter admits one request
+
+        Args:
+            prompt: Text prompt
+            image_paths: Images sent with the prompt
+            max_output_tokens: Output budget reserved for the completion
+
+        Returns:
+            Estimated tokens charged to the limiter (0 if no limiter)
+        """
+        if self.rate_limiter is None:
+            return 0
+        tokens = estimate_request_tokens(prompt, image_paths, max_output_tokens)
+        waited = self.rate_limiter.acquire(tokens)
+        self.record_stat("rate_limit", "requests")
+        self.record_stat("rate_limit", "wait_seconds", waited)
+        return tokens
+
+    def _query_with_retries(self, call: Callable[[], str], prompt: str,
+                            image_paths: List[str], max_output_tokens: int = 0) -> str:
+        """
+        Run one API call under the rate limiter and retry policy
+
+        Each attempt waits on the rate limiter. Retryable failures (429, 5xx,
+        timeouts, connection errors) back off exponentially with jitter,
+        honouring Retry-After; fatal ones are raised immediately. Retries and
+        final failures are tallied by error class in the run stats, and every
+        attempt is recorded in the request telemetry.
+
+        Args:
+            call: Function performing a single API attempt
+            prompt: Text prompt (for rate limit estimation)
+            image_paths: Images sent with the prompt (for rate limit estimation)
+            max_output_tokens: Output budget reserved for the completion
+
+        Returns:
+            Response text from the first successful attempt
+
+        Raises:
+            ModelQueryError: When the call fails fatally or retries are exhausted
+        """
+        policy = self.retry_policy or RetryPolicy(max_attempts=1)
+        start = time.monotonic()
+        attempt = 0
+        metrics = self._start_request_metrics()
+
+        while True:
+            attempt += 1
+            metrics["attempts"] = attempt
+            queued_at = time.monotonic()
+            self._wait_for_rate_limit(prompt, image_paths, max_output_tokens)
+            attempt_start = time.monotonic()
+            try:
+                with get_telemetry().track(getattr(self, "SERVICE_NAME", self.model_name),
+                                           self.model_name, attempt_start - queued_at):
+                    response = self._run_attempt(
+                        call, prompt, image_paths, max_output_tokens)
+            except Exception as e:
+                error_class, retryable, retry_after = classify_error(e)
+                if self.concurrency_controller is not None:
+                    self.concurrency_controller.record(
+                        time.monotonic() - attempt_start, error_class)
+                delay = policy.backoff_delay(attempt, retry_after)
+                elapsed = time.monotonic() - start
+
+                if (not retryable or attempt >= policy.max_attempts
+                        or elapsed + delay > policy.max_total_time
+                        or (error_class == "rate_limit" and policy.max_rate_limit_wait is not None
+                            and delay > policy.max_rate_limit_wait)):
+                    self.record_stat("errors", error_class)
+                    raise ModelQueryError(
+                        f"{getattr(self, 'SERVICE_NAME', self.model_name)} API call failed "
+                        f"after {attempt} attempt(s) [{error_class}]: {e}",
+                        error_class=error_class,
+                        retryable=retryable,
+                        attempts=attempt
+                    ) from e
+
+                self.record_stat("retries", error_class)
+                time.sleep(delay)
+                continue
+
+            if self.concurrency_controller is not None:
+                self.concurrency_controller.record(time.monotonic() - attempt_start)
+            metrics["latency"] = round(time.monotonic() - start, 3)
+            return response
+
+    def prefetch(self, requests: List[Dict],
+                 generation: Optional[GenerationConfig] = None):
+        """
+        Receive every request of a test run before querying starts
+
+        Clients that submit work in bulk (e.g. BatchModelClient) override
+        this; interactive clients ignore it.
+
+        Args:
+            requests: Dicts with custom_id (the case_id), prompt and image_paths
+            generation: Decoding budget that the queries will use
+        """
+        pass
+
+    def _record_truncation(self, finish_reason: Optional[str]):
+        """Count a response cut off by max_tokens"""
+        if finish_reason == "length":
+            self.record_stat("generation", "truncated")
+            self._record_request_metric("truncated", True)
+
+    def _record_usage(self, usage, price_factor: float = 1.0, simulated: bool = False):
+        """
+        Count the tokens (and cost) of one API response
+
+        Usage is summed into the request metrics of the current query (a
+        query may make several calls, e.g. hedges) and the "usage" run stats.
+
+        Args:
+            usage: Usage block of the response (SDK object or dict), or None
+            price_factor: Price multiplier, e.g. for batch jobs
+            simulated: Usage was made up offline (e.g. DummyModelClient): it
+                is counted as "simulated" requests and never priced
+        """
+        counts = extract_usage(usage)
+        if counts is None:
+            self.record_stat("usage", "unreported")
+            return
+        # Replayed recordings keep the label of simulated usage
+        simulated = simulated or bool(isinstance(usage, dict) and usage.get("simulated"))
+        counts["requests"] = 1
+        cost = None if simulated else estimate_cost(counts, self.model_name, price_factor)
+        if simulated:
+            counts["simulated"] = 1
+        if cost is not None:
+            counts["cost_usd"] = cost
+        for key, value in counts.items():
+            self.record_stat("usage", key, value)
+        metrics = _request_metrics.get()
+        if metrics is not None:
+            add_usage(metrics.setdefault("usage", {}), counts)
 
     @abstractmethod
-    def query(self, prompt: str, image_path: Union[str, List[str]]) -> str:
+    def query(self, prompt: str, image_path: Union[str, List[str]],
+              generation: Optional[GenerationConfig] = None) -> str:
         """
         Query the model with text and image(s)
 
         Args:
             prompt: Text prompt
             image_path: Path to image file, or list of paths for multiple images
+            generation: Decoding budget (max_tokens, stop, temperature) for this query
 
         Returns:
             Model response as string
@@ -35,6 +453,123 @@ class ModelClient(ABC):
         pass
 
 
+class ModelClientWrapper(ModelClient):
+    """
+    Base class for clients that delegate (some) queries to another client
+
+    Rate limiting, concurrency control, hedging and per-run counters are
+    forwarded to the inner client, and its counters are merged into
+    get_run_stats().
+    """
+
+    def __init__(self, client: Optional[ModelClient], model_name: Optional[str] = None):
+        super().__init__(model_name=model_name or client.model_name)
+        self.client = client
+
+    @property
+    def api_key(self) -> Optional[str]:
+        """API key of the inner client (keys its shared rate-limit budget)"""
+        return getattr(self.client, "api_key", None)
+
+    def set_rate_limiter(self, rate_limiter: Optional[RateLimiter]):
+        super().set_rate_limiter(rate_limiter)
+        if self.client is not None:
+            self.client.set_rate_limiter(rate_limiter)
+
+    def set_concurrency_controller(self, controller):
+        super().set_concurrency_controller(controller)
+        if self.client is not None:
+            self.client.set_concurrency_controller(controller)
+
+    def set_hedger(self, hedger: Optional[RequestHedger]):
+        super().set_hedger(hedger)
+        if self.client is not None:
+            self.client.set_hedger(hedger)
+
+    def set_single_flight(self, single_flight: Optional[SingleFlight]):
+        super().set_single_flight(single_flight)
+        if self.client is not None:
+            self.client.set_single_flight(single_flight)
+
+    def reset_run_stats(self):
+        super().reset_run_stats()
+        if self.client is not None:
+            self.client.reset_run_stats()
+
+    def prefetch(self, requests: List[Dict],
+                 generation: Optional[GenerationConfig] = None):
+        if self.client is not None:
+            self.client.prefetch(requests, generation=generation)
+
+    def get_run_stats(self) -> Dict:
+        stats = super().get_run_stats()
+        if self.client is not None:
+            _merge_run_stats(stats, self.client.get_run_stats())
+        return stats
+
+
+class CompositeModelClient(ModelClient):
+    """
+    Base class for clients that route each query to one of several clients
+
+    Rate limiting, concurrency control, hedging, coalescing and per-run
+    counters are forwarded to every child, and their counters are merged
+    into get_run_stats(). A child that already has a rate limiter (e.g. one
+    per provider or per API key) keeps it.
+    """
+
+    def __init__(self, clients: List[ModelClient], model_name: Optional[str] = None):
+        super().__init__(model_name=model_name or clients[0].model_name)
+        self.clients = clients
+
+    @property
+    def api_key(self) -> Optional[str]:
+        """API key shared by every child, or None if they use different keys"""
+        keys = {getattr(client, "api_key", None) for client in self.clients}
+        return keys.pop() if len(keys) == 1 else None
+
+    def set_rate_limiter(self, rate_limiter: Optional[RateLimiter]):
+        forwarded = self.rate_limiter
+        super().set_rate_limiter(rate_limiter)
+        for client in self.clients:
+            if client.rate_limiter is None or client.rate_limiter is forwarded:
+                client.set_rate_limiter(rate_limiter)
+
+    def set_concurrency_controller(self, controller):
+        super().set_concurrency_controller(controller)
+        for client in self.clients:
+            client.set_concurrency_controller(controller)
+
+    def set_hedger(self, hedger: Optional[RequestHedger]):
+        super().set_hedger(hedger)
+        for client in self.clients:
+            client.set_hedger(hedger)
+
+    def set_single_flight(self, single_flight: Optional[SingleFlight]):
+        super().set_single_flight(single_flight)
+        for client in self.clients:
+            client.set_single_flight(single_flight)
+
+    def reset_run_stats(self):
+        super().reset_run_stats()
+        for client in self.clients:
+            client.reset_run_stats()
+
+    def get_run_stats(self) -> Dict:
+        stats = super().get_run_stats()
+        for client in self.clients:
+            _merge_run_stats(stats, client.get_run_stats())
+        return stats
+
+
+def _merge_run_stats(stats: Dict, other: Dict):
+    """Add the counters of other into stats"""
+    for section, group in other.items():
+        merged = stats.setdefault(section, {})
+        for key, value in group.items():
+            merged[key] = merged.get(key, 0) + value
+
+
 class OpenAICompatibleModelClient(ModelClient):
     """
     Base class for OpenAI-compatible API clients
@@ -47,12 +582,22 @@ class OpenAICompatibleModelClient(ModelClient):
     ENV_BASE_URL = None
     ENV_MODEL = None
     SERVICE_NAME = "OpenAI-compatible"
+    # Where layered prompts put their static instructions (see src/prompting.py);
+    # "inline" sends the prompt exactly as the benchmark defines it
+    PROMPT_LAYOUT = "inline"
 
     def __init__(
         self,
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
         model_name: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        image_cache: Optional[ImagePayloadCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        early_stop: bool = False,
+        http_client=None,
+        prompt_layout: Optional[str] = None,
+        coalesce: bool = False,
         **kwargs
     ):
         """
@@ -62,9 +607,25 @@ class OpenAICompatibleModelClient(ModelClient):
             api_key: API key (if None, reads from environment variable)
             base_url: API base URL (if None, reads from environment variable)
             model_name: Model name (if None, reads from environment variable)
+            cache: Optional response cache checked before calling the API
+            image_cache: Cache of encoded images (if None, uses the process-wide cache)
+            retry_policy: Retry configuration (if None, uses RetryPolicy defaults)
+            early_stop: With stream=True, close the stream once the
+                Verification and Main answer lines are complete (opt-in:
+                the model's text after them is never seen)
+            http_client: httpx.Client to use (if None, uses the shared pool for base_url)
+            prompt_layout: "inline" sends the whole prompt in the user message,
+                "system" the static lead-in of layered prompts as a leading
+                system message (cacheable prefix; opt-in, as the model then
+                sees the same text in a different message layout)
+                (default: PROMPT_LAYOUT)
+            coalesce: Let identical concurrent queries share one API call
+                (see set_single_flight); opt-in, as duplicates then get one
+                answer instead of independent samples
             **kwargs: Additional parameters to pass to the API
         """
-        # Get configuration from env vars if not provided
+        # Get configuration from env vars (and .env) if not provided
+        load_env()
         self.api_key = api_key or os.getenv(self.ENV_API_KEY)
         self.base_url = base_url or os.getenv(
             self.ENV_BASE_URL, self.DEFAULT_BASE_URL)
@@ -93,30 +654,48 @@ class OpenAICompatibleModelClient(ModelClient):
 
         # Store any additional parameters
         self.extra_params = kwargs
+        self.cache = cache
+        self.image_cache = image_cache or get_image_cache()
+        if retry_policy is not None:
+            self.retry_policy = retry_policy
+        self.early_stop = early_stop
+        self.prompt_layout = prompt_layout or self.PROMPT_LAYOUT
+        self.single_flight = SingleFlight() if coalesce else None
+        if self.prompt_layout not in PROMPT_LAYOUTS:
+            raise ValueError(f"Unknown prompt layout {self.prompt_layout!r}, expected one of {PROMPT_LAYOUTS}")
 
         # Initialize OpenAI client
         try:
             from openai import OpenAI
+            # Retries are handled by _query_with_retries, not the SDK;
+            # connections come from the pool shared by all clients of base_url
             self.client = OpenAI(
                 api_key=self.api_key,
-                base_url=self.base_url
+                base_url=self.base_url,
+                max_retries=0,
+                http_client=http_client or get_http_client(self.base_url)
             )
             print(f"✓ {self.SERVICE_NAME} client initialized")
             print(f"  Model: {self.model_name}")
             if self.extra_params:
                 print(f"  Extra params: {self.extra_params}")
+            if self.cache is not None:
+                print(f"  Response cache: {self.cache.path}")
         except ImportError:
             raise ImportError(
                 "openai package is required. Install it with: pip install 'openai>=1.0.0'"
             )
 
-    def query(self, prompt: str, image_path: Union[str, List[str]]) -> str:
+    def query(self, prompt: str, image_path: Union[str, List[str]],
+              generation: Optional[GenerationConfig] = None) -> str:
         """
         Call OpenAI-compatible API with image(s)
 
         Args:
             prompt: Text prompt
             image_path: Path to image file, or list of paths for multiple images
+            generation: Decoding budget; parameters passed to the constructor
+                take precedence over it
 
         Returns:
             Model response
@@ -127,72 +706,152 @@ class OpenAICompatibleModelClient(ModelClient):
         else:
             image_paths = image_path
 
-        # Build content array with images and text
-        content = []
-
-        # Add all images first
-        for img_path in image_paths:
-            # Read and encode image as base64
-            with open(img_path, "rb") as image_file:
-                image_data = base64.b64encode(
-                    image_file.read()).decode("utf-8")
-
-            # Determine image media type
-            if img_path.lower().endswith('.png'):
-                media_type = "image/png"
-            elif img_path.lower().endswith(('.jpg', '.jpeg')):
-                media_type = "image/jpeg"
-            else:
-                media_type = "image/png"  # default
+        # Suite budget first, explicit client parameters override it
+        request_params = {}
+        if generation is not None:
+            request_params.update(generation.for_model(self.model_name).to_params())
+        request_params.update(self.extra_params)
+
+        key_params = request_params
+        if self.prompt_layout == "system" and isinstance(prompt, LayeredPrompt):
+            key_params = dict(request_params, prompt_layout="system")
+        image_digests = None
+        if self.cache is not None or self.single_flight is not None:
+            image_digests = [self.image_cache.get(img_path).sha256 for img_path in image_paths]
+
+        # Serve from the response cache when possible
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.make_key(
+                self.model_name, self.base_url, prompt, image_digests, key_params)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.record_stat("cache", "hits")
+                self._start_request_metrics(cached=True)
+                return cached
+            self.record_stat("cache", "misses")
+
+        def send() -> str:
+            messages = self._build_messages(prompt, image_paths)
+            early_stop = (self.early_stop
+                          and "Verification:" in prompt and "Main answer:" in prompt
+                          and packed_case_count(prompt) is None)
+            response_text = self._query_with_retries(
+                lambda: self._call_api(messages, request_params, early_stop=early_stop),
+                prompt, image_paths, request_params.get("max_tokens", 0))
+            if cache_key is not None:
+                self.cache.put(cache_key, response_text)
+            return response_text
+
+        if self.single_flight is None:
+            return send()
+
+        # Identical queries in flight share one call; the fingerprint is the
+        # payload (no base_url), so endpoints of one model coalesce too
+        flight_key = ResponseCache.make_key(self.model_name, "", prompt, image_digests, key_params)
+        response_text, shared = self.single_flight.do(flight_key, send)
+        if shared:
+            self.record_stat("coalesce", "duplicates")
+            self._start_request_metrics(coalesced=True)
+        return response_text
+
+    def _build_messages(self, prompt: str, image_paths: List[str]) -> List[Dict]:
+        """
+        Build the chat messages: images first and the prompt text last, with
+        the static instructions of a layered prompt in a leading system
+        message when prompt_layout is "system"
+        """
+        # Encoded data URLs are cached in-process
+        image_parts = [
+            {"type": "image_url", "image_url": {"url": self.image_cache.get(img_path).data_url}}
+            for img_path in image_paths
+        ]
+        return build_messages(prompt, image_parts, self.prompt_layout)
 
-            # Construct data URL
-            image_url = f"data:{media_type};base64,{image_data}"
+    def _call_api(self, messages: List[Dict], request_params: Dict,
+                  early_stop: bool = False) -> str:
+        """
+        Send one chat completion request and return the response text
 
-            content.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": image_url
-                }
-            })
+        Exceptions from the SDK propagate unchanged so the retry engine can
+        classify them.
 
-        # Add text prompt at the end
-        content.append({
-            "type": "text",
-            "text": prompt
-        })
+        Args:
+            messages: Chat messages (see _build_messages)
+            request_params: Extra API parameters (generation budget, stream, ...)
+            early_stop: When streaming, stop reading once both answer lines are parsed
+        """
+        # Prepare base parameters
+        params = {
+            "model": self.model_name,
+            "messages": messages
+        }
+
+        # Add generation budget and any extra parameters
+        params.update(request_params)
+        if params.get("stream") and "stream_options" not in params:
+            # Token usage arrives in a final chunk only when asked for
+            params["stream_options"] = {"include_usage": True}
+
+        # Call API
+        request_start = time.monotonic()
+        chat_completion_res = self.client.chat.completions.create(**params)
+
+        # Handle streaming vs non-streaming responses
+        if request_params.get('stream', False):
+            return self._read_stream(chat_completion_res, request_start, early_stop)
+        else:
+            # Return non-streaming response
+            choice = chat_completion_res.choices[0]
+            self._record_truncation(getattr(choice, "finish_reason", None))
+            self._record_usage(getattr(chat_completion_res, "usage", None))
+            return choice.message.content
 
-        try:
-            # Prepare base parameters
-            params = {
-                "model": self.model_name,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": content
-                    }
-                ]
-            }
-
-            # Add any extra parameters if provided
-            params.update(self.extra_params)
-
-            # Call API
-            chat_completion_res = self.client.chat.completions.create(**params)
-
-            # Handle streaming vs non-streaming responses
-            if self.extra_params.get('stream', False):
-                # Collect streamed response
-                response_text = ""
-                for chunk in chat_completion_res:
-                    if chunk.choices[0].delta.content:
-                        response_text += chunk.choices[0].delta.content
-                return response_text
-            else:
-                # Return non-streaming response
-                return chat_completion_res.choices[0].message.content
+    def _read_stream(self, stream, request_start: float, early_stop: bool) -> str:
+        """
+        Collect a streamed response, optionally closing it early
 
-        except Exception as e:
-            raise Exception(f"{self.SERVICE_NAME} API call failed: {str(e)}")
+        Records time-to-first-token and time-to-answer (both answer lines
+        parsed) in the request metrics and the "streaming" run stats.
+        """
+        detector = CombinedAnswerDetector()
+        first_token_at = None
+        stopped_early = False
+        usage = None
+
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            self._record_truncation(getattr(chunk.choices[0], "finish_reason", None))
+            if not chunk.choices[0].delta.content:
+                continue
+            if first_token_at is None:
+                first_token_at = time.monotonic()
+            if detector.feed(chunk.choices[0].delta.content) and early_stop:
+                stopped_early = True
+                break
+
+        # Closing the stream drops the connection so the server stops decoding
+        if stopped_early and hasattr(stream, "close"):
+            stream.close()
+
+        # A stream closed early never receives the usage chunk
+        self._record_usage(usage)
+        now = time.monotonic()
+        self.record_stat("streaming", "requests")
+        if first_token_at is not None:
+            ttft = first_token_at - request_start
+            self._record_request_metric("ttft", round(ttft, 3))
+            self.record_stat("streaming", "ttft_seconds", ttft)
+        if detector.complete:
+            self._record_request_metric("time_to_answer", round(now - request_start, 3))
+            self.record_stat("streaming", "answer_seconds", now - request_start)
+        if stopped_early:
+            self._record_request_metric("early_stop", True)
+            self.record_stat("streaming", "early_stops")
+        return detector.text
 
 
 class NovitaModelClient(OpenAICompatibleModelClient):
@@ -246,81 +905,191 @@ class GoogleModelClient(OpenAICompatibleModelClient):
 
 
 class DummyModelClient(ModelClient):
-    """Dummy model client for testing the framework"""
+    """
+    Dummy model client for testing the framework
 
-    def __init__(self, verification_pass_rate: float = 0.7):
+    Answers offline from the registered test cases. Besides answer quality it
+    can simulate an API: per-request latency, injected 429/500/timeout
+    errors (retried like real ones) and perception matrix outputs. With a
+    seed, every request draws from its own RNG derived from the seed and the
+    request, so results do not depend on thread scheduling.
+    """
+
+    def __init__(self, verification_pass_rate: float = 0.7,
+                 answer_accuracy: Optional[float] = None,
+                 matrix_error_rate: float = 0.05,
+                 latency: Optional[LatencyModel] = None,
+                 rate_429: float = 0.0,
+                 rate_500: float = 0.0,
+                 timeout_rate: float = 0.0,
+                 retry_after: float = 1.0,
+                 seed: Optional[int] = None):
         """
         Initialize dummy model
 
         Args:
             verification_pass_rate: Probability of passing verification (0.0 to 1.0)
+            answer_accuracy: Probability of a correct main answer (None = random answer)
+            matrix_error_rate: Probability that a cell of a perception matrix is wrong
+            latency: Simulated response time per attempt (default: instant)
+            rate_429: Fraction of attempts failing with 429 rate_limit
+            rate_500: Fraction of attempts failing with 500 server_error
+            timeout_rate: Fraction of attempts failing with a timeout
+            retry_after: Retry-After seconds attached to simulated 429s
+            seed: Random seed (None = nondeterministic)
         """
         super().__init__(model_name="dummy_model")
         self.verification_pass_rate = verification_pass_rate
+        self.answer_accuracy = answer_accuracy
+        self.matrix_error_rate = matrix_error_rate
+        self.latency = latency or LatencyModel()
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.timeout_rate = timeout_rate
+        self.retry_after = retry_after
+        self.seed = seed
         self.test_cases_lookup = {}  # image_path -> case info
+        self._lookup_lock = threading.Lock()
+        self._request_counts: Dict[str, int] = {}
 
     def set_test_cases(self, test_cases: list):
         """
         Provide test cases to dummy model so it can "know" correct answers
 
+        Cases are keyed by their first image (image_paths or image_path) and
+        may carry a perception "ground_truth" matrix.
+
         Args:
             test_cases: List of test case dictionaries
         """
-        self.test_cases_lookup = {}
+        lookup = {}
         for case in test_cases:
             # Handle both single image_path and multiple image_paths
             if 'image_paths' in case and case['image_paths']:
                 # Use first image path as key for temporal tests
                 key = case['image_paths'][0] if isinstance(
                     case['image_paths'], list) else case['image_paths']
-                self.test_cases_lookup[key] = case
             elif 'image_path' in case:
-                self.test_cases_lookup[case['image_path']] = case
-
-        print(f"  Dummy model loaded {len(self.test_cases_lookup)} test cases")
-
-    def query(self, prompt: str, image_path: Union[str, List[str]]) -> str:
+                key = case['image_path']
+            elif 'image_file' in case:
+                key = case['image_file']
+            else:
+                continue
+            lookup[os.path.abspath(key)] = case
+
+        # Swap in the complete table so concurrent queries never see a partial one
+        with self._lookup_lock:
+            self.test_cases_lookup = lookup
+            self._request_counts = {}
+
+        print(f"  Dummy model loaded {len(lookup)} test cases")
+
+    def _request_rng(self, key: str) -> random.Random:
+        """RNG for one attempt, derived from the seed, the request and its attempt number"""
+        with self._lookup_lock:
+            n = self._request_counts.get(key, 0) + 1
+            self._request_counts[key] = n
+        if self.seed is None:
+            return random.Random()
+        return random.Random(f"{self.seed}|{key}|{n}")
+
+    def _simulate_transport(self, rng: random.Random):
+        """Sleep for the sampled latency, then maybe fail like an API would"""
+        time.sleep(self.latency.sample(rng))
+        roll = rng.random()
+        if roll < self.rate_429:
+            raise SimulatedAPIError("Rate limit reached (simulated)", 429, self.retry_after)
+        roll -= self.rate_429
+        if roll < self.rate_500:
+            raise SimulatedAPIError("Internal server error (simulated)", 500)
+        roll -= self.rate_500
+        if roll < self.timeout_rate:
+            raise TimeoutError("Request timed out (simulated)")
+
+    def query(self, prompt: str, image_path: Union[str, List[str]],
+              generation: Optional[GenerationConfig] = None) -> str:
         """
         Return simulated answer for testing
 
         Args:
             prompt: Text prompt
             image_path: Path to image file, or list of paths for multiple images
+            generation: Accepted for interface compatibility (ignored)
 
         Returns:
             Simulated response
         """
-        import random
-
-        # Get the first image path as lookup key
-        if isinstance(image_path, list):
-            lookup_key = image_path[0]
-        else:
-            lookup_key = image_path
-
-        # Look up the case info
-        case = self.test_cases_lookup.get(lookup_key)
+        image_paths = image_path if isinstance(image_path, list) else [image_path]
+
+        # Look up the case info by the first image
+        lookup_key = os.path.abspath(image_paths[0])
+        with self._lookup_lock:
+            case = self.test_cases_lookup.get(lookup_key)
+
+        def call() -> str:
+            # File name rather than path: output dirs carry run timestamps
+            rng = self._request_rng(f"{os.path.basename(lookup_key)}|{prompt}")
+            self._simulate_transport(rng)
+
+            # Perception prompts ask for a board matrix
+            matrix_size = matrix_size_from_prompt(prompt) if "Game State" in prompt else None
+            if matrix_size is not None:
+                matrix = synthesize_matrix(
+                    matrix_size, rng,
+                    ground_truth=case.get("ground_truth") if case else None,
+                    error_rate=self.matrix_error_rate)
+                return f"Game State: {matrix}"
+
+            # Packed prompts: one numbered combined answer per image
+            n_packed = packed_case_count(prompt)
+            if n_packed is not None and n_packed == len(image_paths):
+                return "\n".join(
+                    f"Case {i}:\n" + self._generate_combined_response(prompt, packed_case, rng)
+                    for i, packed_case in enumerate(self._lookup_cases(image_paths), 1))
+
+            # Check if this is a combined prompt (verification + test)
+            if "Verification:" in prompt and "Main answer:" in prompt:
+                return self._generate_combined_response(prompt, case, rng)
+            else:
+                # Single question - random answer
+                return rng.choice(["yes", "no", "unknown"])
+
+        response = self._query_with_retries(call, prompt, image_paths)
+        # Estimated usage, so token accounting can be exercised offline;
+        # labelled simulated and never priced
+        self._record_usage({
+            "prompt_tokens": estimate_request_tokens(prompt, image_paths),
+            "completion_tokens": max(1, len(response) // 4),
+        }, simulated=True)
+        return response
 
-        # Check if this is a combined prompt (verification + test)
-        if "Verification:" in prompt and "Main answer:" in prompt:
-            return self._generate_combined_response(prompt, case)
-        else:
-            # Single question - random answer
-            return random.choice(["yes", "no", "unknown"])
+    def _lookup_cases(self, image_paths: List[str]) -> List[Optional[dict]]:
+        """Registered case of each image (None when unknown)"""
+        with self._lookup_lock:
+            return [self.test_cases_lookup.get(os.path.abspath(path)) for path in image_paths]
 
-    def _generate_combined_response(self, prompt: str, case: dict = None) -> str:
+    def _generate_combined_response(self, prompt: str, case: dict = None,
+                                    rng: Optional[random.Random] = None) -> str:
         """Generate response for combined verification + test prompt"""
-        import random
+        rng = rng or random.Random()
 
         # Generate verification response (using case info if available)
         if case:
             verification_response = self._generate_verification_response_with_case(
-                case)
+                case, rng)
         else:
-            verification_response = self._generate_random_verification()
+            verification_response = self._generate_random_verification(rng)
 
-        # Random answer for main question
-        main_answer = random.choice(["yes", "no", "unknown"])
+        # Main answer: correct with answer_accuracy, otherwise random
+        expected = (case or {}).get("expected")
+        if expected and self.answer_accuracy is not None:
+            if rng.random() < self.answer_accuracy:
+                main_answer = expected
+            else:
+                main_answer = rng.choice(
+                    [a for a in ("yes", "no", "unknown") if a != expected.lower()])
+        else:
+            main_answer = rng.choice(["yes", "no", "unknown"])
 
         # Format response
         response = f"""Verification: {verification_response}
@@ -328,18 +1097,17 @@ Main answer: {main_answer}"""
 
         return response
 
-    def _generate_verification_response_with_case(self, case: dict) -> str:
+    def _generate_verification_response_with_case(self, case: dict,
+                                                   rng: random.Random) -> str:
         """
         Generate verification response using case information
 
         Pass with probability = verification_pass_rate
         """
-        import random
-
         # Decide if this attempt passes
-        if random.random() > self.verification_pass_rate:
+        if rng.random() > self.verification_pass_rate:
             # Fail: return wrong answer
-            return self._generate_wrong_verification()
+            return self._generate_wrong_verification(rng)
 
         # Pass: return correct answer from case
         verification_expected = case.get('verification_expected', '')
@@ -367,7 +1135,7 @@ Main answer: {main_answer}"""
             if len(squares) >= 2:
                 return f"{squares[0]} and {squares[1]}"
             else:
-                return self._generate_wrong_verification()
+                return self._generate_wrong_verification(rng)
 
         elif "what squares" in verification_q and len(squares) >= 3:
             # Three or more squares
@@ -383,42 +1151,37 @@ Main answer: {main_answer}"""
                 piece_sq = list(pieces.keys())[0]
                 return piece_sq
             else:
-                return self._generate_wrong_verification()
+                return self._generate_wrong_verification(rng)
 
         else:
             # Default: return verification_expected if available
             return verification_expected if verification_expected else "I see the board"
 
-    def _generate_random_verification(self) -> str:
+    def _generate_random_verification(self, rng: random.Random) -> str:
         """Generate random verification response (when case info not available)"""
-        import random
-
         responses = [
             "I see a chess board",
-            f"{self._generate_square_name()}",
-            f"{self._generate_square_name()} and {self._generate_square_name()}",
+            f"{self._generate_square_name(rng)}",
+            f"{self._generate_square_name(rng)} and {self._generate_square_name(rng)}",
         ]
-        return random.choice(responses)
+        return rng.choice(responses)
 
-    def _generate_square_name(self) -> str:
+    def _generate_square_name(self, rng: random.Random) -> str:
         """Generate a random valid square name"""
-        import random
         files = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
         ranks = ['1', '2', '3', '4', '5', '6', '7', '8']
-        return random.choice(files) + random.choice(ranks)
+        return rng.choice(files) + rng.choice(ranks)
 
-    def _generate_wrong_verification(self) -> str:
+    def _generate_wrong_verification(self, rng: random.Random) -> str:
         """Generate intentionally wrong verification response"""
-        import random
-
         wrong_responses = [
             "I see a chess board",
             "The board looks normal",
-            f"{self._generate_square_name()}",  # Wrong square
-            f"{self._generate_square_name()} and {self._generate_square_name()}",
+            f"{self._generate_square_name(rng)}",  # Wrong square
+            f"{self._generate_square_name(rng)} and {self._generate_square_name(rng)}",
             "I'm not sure",
             "c3 d4",  # Random squares
             "There are pieces on the board",
         ]
 
-        return random.choice(wrong_responses)
+        return rng.choice(wrong_responses)
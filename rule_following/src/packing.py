@@ -0,0 +1,128 @@
+"""
+Multi-case request packing
+Puts several independent single-image cases (verification question plus
+yes/no question) into one request with numbered images and a numbered
+answer block, and splits the response back into per-case answers
+"""
+
+import re
+from dataclasses import replace
+from typing import Dict, List, Optional
+
+from .generation import GenerationConfig
+
+# First line of every packed prompt; also how clients and simulators recognize one
+_PACKED_HEADER = re.compile(r"^This request contains (\d+) independent cases\.", re.M)
+
+# "Case 3:", "**Case 3**", "### Image 3 -", ... at the start of a line
+_CASE_HEADER = re.compile(
+    r"^[ \t>#*_-]*(?:case|image|board)[ \t]*#?[ \t]*(\d+)[ \t]*[*_]*[ \t]*[:.)\-]?[ \t]*[*_]*[ \t]*(.*)$",
+    re.I | re.M)
+_VERIFICATION_LINE = re.compile(r"^\s*verification\s*:", re.I | re.M)
+_MAIN_LINE = re.compile(r"^\s*main(?: answer)?\s*:", re.I | re.M)
+
+# Output tokens for each "Case N:" header
+HEADER_TOKENS = 4
+
+
+def build_packed_prompt(cases: List[Dict]) -> str:
+    """
+    Prompt asking the combined verification + main question of several cases
+
+    Images are attached in case order, so image N belongs to case N.
+
+    Args:
+        cases: Cases with verification_question and question
+
+    Returns:
+        Prompt text
+    """
+    k = len(cases)
+    blocks = []
+    for i, case in enumerate(cases, 1):
+        blocks.append(f"""Case {i} (image {i}):
+Verification question: {case.get('verification_question', '')}
+Main question: {case['question']}""")
+    answer_format = "\n".join(
+        f"Case {i}:\nVerification: [your answer to the verification question of case {i}]\n"
+        f"Main answer: [yes/no/unknown for the main question of case {i}]"
+        for i in range(1, k + 1))
+
+    return f"""This request contains {k} independent cases.
+You are given {k} chess board images, numbered 1 to {k} in the order they are attached. Each case refers only to its own image; look at each board carefully.
+
+{chr(10).join(blocks)}
+
+Answer every case. Format your response as:
+{answer_format}"""
+
+
+def packed_case_count(prompt: str) -> Optional[int]:
+    """Number of cases in a packed prompt, or None for an ordinary prompt"""
+    match = _PACKED_HEADER.search(prompt)
+    return int(match.group(1)) if match else None
+
+
+def packed_generation(generation: GenerationConfig, k: int) -> GenerationConfig:
+    """Output budget for k cases packed into one request"""
+    if generation.max_tokens is None:
+        return generation
+    return replace(generation, max_tokens=k * (generation.max_tokens + HEADER_TOKENS))
+
+
+def split_packed_response(response: str, k: int) -> Optional[List[str]]:
+    """
+    Split a packed response into the combined answer of each case
+
+    Every case 1..k must appear exactly once under a "Case N" header (also
+    "Image N" / "Board N", optionally in markdown) and contain both a
+    verification and a main answer line. Anything else is treated as a parse
+    failure, so ambiguous responses are never attributed to the wrong case.
+
+    Args:
+        response: Model response to a packed prompt
+        k: Number of cases in the request
+
+    Returns:
+        One "Verification: ...\\nMain answer: ..." text per case, or None
+    """
+    text = response.replace("**", "").replace("__", "")
+    matches = list(_CASE_HEADER.finditer(text))
+    sections = {}
+    for match, following in zip(matches, matches[1:] + [None]):
+        index = int(match.group(1))
+        if index in sections or not 1 <= index <= k:
+            return None
+        end = following.start() if following is not None else len(text)
+        # The header match stops at the end of its line
+        sections[index] = (match.group(2) + text[match.end():end]).strip()
+
+    if set(sections) != set(range(1, k + 1)):
+        return None
+    answers = [sections[i] for i in range(1, k + 1)]
+    if not all(_VERIFICATION_LINE.search(a) and _MAIN_LINE.search(a) for a in answers):
+        return None
+    return answers
+
+
+def share_metrics(metrics: Optional[Dict], k: int, index: int) -> Optional[Dict]:
+    """
+    Per-case share of a packed request's metrics
+
+    Timing fields describe the shared request and are kept; token usage and
+    cost are divided evenly so per-case and per-type totals still add up.
+
+    Args:
+        metrics: Request metrics of the packed request
+        k: Number of cases in the request
+        index: Position of the case in the request (0-based)
+
+    Returns:
+        Metrics dict with a "pack" entry
+    """
+    shared = dict(metrics or {})
+    if isinstance(shared.get("usage"), dict):
+        shared["usage"] = {key: value / k if isinstance(value, (int, float)) else value
+                           for key, value in shared["usage"].items()}
+    shared["pack"] = {"size": k, "index": index}
+    return shared
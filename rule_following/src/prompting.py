@@ -0,0 +1,102 @@
+"""
+Prompt assembly for provider prompt caching
+Test prompts know where their static leading instructions end and the
+per-case text begins, so clients can (opt-in) send the instructions as a
+stable leading system message, a prefix the provider can cache, and cases
+sharing instructions can be sent back to back. The split is verbatim: both
+parts concatenate back to the original prompt
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, List
+
+# "inline": the whole prompt after the images in one user message (original layout)
+# "system": instructions in a leading system message, then images and case text
+PROMPT_LAYOUTS = ("inline", "system")
+
+
+class LayeredPrompt(str):
+    """
+    Prompt text that also knows where its static part ends
+
+    The string value is the complete prompt as sent with the "inline"
+    layout, so fingerprints, caches and simulators treat it like any other
+    prompt. `instructions` is its leading text up to the first per-case
+    part and `body` the rest, so instructions + body == prompt. With the
+    "system" layout, instructions become the system message and body the
+    user text.
+    """
+
+    def __new__(cls, text: str, split_at: int):
+        prompt = super().__new__(cls, text)
+        prompt.split_at = split_at
+        return prompt
+
+    @classmethod
+    def split(cls, text: str, *case_parts: str) -> "LayeredPrompt":
+        """
+        Split a prompt before the first occurrence of any per-case part
+
+        Args:
+            text: Complete prompt
+            *case_parts: Text that varies between cases (empty parts are ignored)
+
+        Returns:
+            LayeredPrompt with the same string value
+        """
+        positions = [text.find(part) for part in case_parts if part]
+        return cls(text, min([pos for pos in positions if pos >= 0] or [0]))
+
+    @property
+    def instructions(self) -> str:
+        return str(self)[:self.split_at]
+
+    @property
+    def body(self) -> str:
+        return str(self)[self.split_at:]
+
+    def __reduce__(self):
+        return LayeredPrompt, (str(self), self.split_at)
+
+
+def build_messages(prompt: str, image_parts: List[Dict], layout: str = "inline") -> List[Dict]:
+    """
+    Chat messages for a prompt and its image content parts
+
+    Args:
+        prompt: Prompt text (a LayeredPrompt for the system layout)
+        image_parts: image_url content parts, in order
+        layout: One of PROMPT_LAYOUTS
+
+    Returns:
+        Messages list for chat.completions.create
+    """
+    if layout == "system" and isinstance(prompt, LayeredPrompt) and prompt.instructions:
+        return [
+            {"role": "system", "content": prompt.instructions},
+            {"role": "user", "content": image_parts + [{"type": "text", "text": prompt.body}]},
+        ]
+    return [{"role": "user", "content": image_parts + [{"type": "text", "text": str(prompt)}]}]
+
+
+def prefix_order(cases: List[Dict], prompt_fn: Callable[[Dict], str]) -> List[int]:
+    """
+    Dispatch order grouping cases whose prompts share instructions
+
+    Groups appear in the order of their first case, so a run with a single
+    kind of prompt keeps its original order. The cases themselves are not
+    reordered; results are reported in generation order.
+
+    Args:
+        cases: Test cases
+        prompt_fn: Builds a case's prompt (e.g. generate_combined_prompt)
+
+    Returns:
+        Case indices in the order they should be sent
+    """
+    groups: "OrderedDict[str, List[int]]" = OrderedDict()
+    for i, case in enumerate(cases):
+        prompt = prompt_fn(case)
+        key = prompt.instructions if isinstance(prompt, LayeredPrompt) else ""
+        groups.setdefault(key, []).append(i)
+    return [i for group in groups.values() for i in group]
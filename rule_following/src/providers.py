@@ -0,0 +1,148 @@
+"""
+Provider registry for model clients
+Maps provider names (the --model choices) to client classes, which are
+imported only when a client is created. The environment (.env) is read
+once per process, on first use. New OpenAI-compatible endpoints can be
+registered in code or from a JSON file named by VLM_PROVIDERS
+"""
+
+import importlib
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Class of JSON-registered endpoints without a "class" entry
+GENERIC_CLIENT = ".model_client:OpenAICompatibleModelClient"
+
+
+@dataclass(frozen=True)
+class Provider:
+    """
+    Registry entry of a model client
+
+    target is "module:ClassName"; a module starting with "." is relative to
+    this package. attributes (e.g. DEFAULT_BASE_URL, ENV_API_KEY) are set on
+    a subclass of the target, and defaults are constructor arguments.
+    """
+    name: str
+    target: str
+    label: str
+    api: bool = True               # False for offline clients (dummy)
+    attributes: Dict = field(default_factory=dict)
+    defaults: Dict = field(default_factory=dict)
+
+    def load(self) -> type:
+        """Client class of this provider (imported on first call)"""
+        with _lock:
+            if self.name not in _classes:
+                module, _, attribute = self.target.partition(":")
+                cls = getattr(importlib.import_module(module, __package__), attribute)
+                if self.attributes:
+                    cls = type(f"{cls.__name__}_{self.name}", (cls,), dict(self.attributes))
+                _classes[self.name] = cls
+            return _classes[self.name]
+
+    def create(self, **kwargs):
+        """New client; kwargs override the provider's defaults"""
+        load_env()
+        return self.load()(**{**self.defaults, **kwargs})
+
+
+_providers: Dict[str, Provider] = {}
+_classes: Dict[str, type] = {}
+_lock = threading.RLock()
+_env_loaded = False
+
+
+def register_provider(name: str, target: str, label: Optional[str] = None, api: bool = True,
+                      attributes: Optional[Dict] = None, **defaults) -> Provider:
+    """
+    Add (or replace) a provider
+
+    Args:
+        name: Registry key, e.g. "dashscope"
+        target: "module:ClassName" of the client class
+        label: Display name (default: name)
+        api: Whether the client calls an API (False for offline simulators)
+        attributes: Class attributes overriding the target's (e.g. DEFAULT_BASE_URL)
+        **defaults: Constructor arguments
+
+    Returns:
+        The registered Provider
+    """
+    provider = Provider(name, target, label or name, api, dict(attributes or {}), defaults)
+    with _lock:
+        _providers[name] = provider
+        _classes.pop(name, None)
+    return provider
+
+
+def get_provider(name: str) -> Provider:
+    """Registered provider by name (raises ValueError for unknown names)"""
+    load_env()
+    if name not in _providers:
+        raise ValueError(f"Unknown model type: {name} (available: {', '.join(provider_names())})")
+    return _providers[name]
+
+
+def provider_names(api_only: bool = False) -> List[str]:
+    """Registered provider names, in registration order"""
+    load_env()
+    return [name for name, provider in _providers.items() if provider.api or not api_only]
+
+
+def create_client(name: str, **kwargs):
+    """New client of a registered provider (see Provider.create)"""
+    return get_provider(name).create(**kwargs)
+
+
+def load_providers(path: str):
+    """
+    Register providers from a JSON file
+
+    Each entry is {name: {"label", "base_url", "env_prefix", "class", ...}}.
+    Without "class" the endpoint uses OpenAICompatibleModelClient and reads
+    <PREFIX>_API_KEY, <PREFIX>_BASE_URL and <PREFIX>_MODEL (env_prefix
+    defaults to the upper-cased name); other keys are constructor arguments.
+
+    Args:
+        path: JSON file
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    for name, entry in entries.items():
+        entry = dict(entry)
+        target = entry.pop("class", GENERIC_CLIENT)
+        label = entry.pop("label", name)
+        attributes = {}
+        if target == GENERIC_CLIENT or "env_prefix" in entry:
+            prefix = entry.pop("env_prefix", re.sub(r"\W", "_", name).upper())
+            attributes.update(ENV_API_KEY=f"{prefix}_API_KEY", ENV_BASE_URL=f"{prefix}_BASE_URL",
+                              ENV_MODEL=f"{prefix}_MODEL", SERVICE_NAME=label)
+        if "base_url" in entry:
+            attributes["DEFAULT_BASE_URL"] = entry.pop("base_url")
+        register_provider(name, target, label, attributes=attributes, **entry)
+
+
+def load_env():
+    """Load .env into os.environ and the VLM_PROVIDERS file, once per process"""
+    global _env_loaded
+    with _lock:
+        if _env_loaded:
+            return
+        _env_loaded = True
+        from dotenv import load_dotenv
+        load_dotenv()
+        if os.getenv("VLM_PROVIDERS"):
+            load_providers(os.environ["VLM_PROVIDERS"])
+
+
+register_provider("dummy", ".model_client:DummyModelClient", "Dummy", api=False)
+register_provider("novita", ".model_client:NovitaModelClient", "Novita")
+register_provider("dashscope", ".model_client:DashScopeModelClient", "DashScope")
+register_provider("xai", ".model_client:XAIModelClient", "XAI")
+register_provider("sf", ".model_client:SiliconFlowModelClient", "SiliconFlow")
+register_provider("google", ".model_client:GoogleModelClient", "Google")
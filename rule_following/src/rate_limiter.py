@@ -0,0 +1,472 @@
+"""
+Token-bucket rate limiting for model API requests
+Enforces requests-per-minute and tokens-per-minute budgets per provider,
+with a burst allowance, and is safe to share between concurrent threads.
+With a shared store (VLM_RATE_LIMIT_DB) the bucket levels live in a SQLite
+file, so every process using the same API key draws from one budget; a
+process without a budget of its own follows the one stored for its key
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from PIL import Image
+
+# Rough conversion used when estimating prompt tokens before a request
+CHARS_PER_TOKEN = 4
+# Most VLMs encode images as 28x28-pixel patches (one token each)
+PIXELS_PER_IMAGE_TOKEN = 28 * 28
+# store= value that keeps a limiter's buckets in this process even when a
+# shared store is configured
+PROCESS_LOCAL = object()
+
+
+class TokenBucket:
+    """
+    Continuous-refill token bucket supporting reservations
+
+    A caller that takes more than is available drives the level negative
+    and is told how long to wait; later callers queue behind it. This keeps
+    admission fair and correctly spaced under concurrency.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        """
+        Initialize token bucket
+
+        Args:
+            rate_per_second: Refill rate
+            capacity: Maximum stored amount (the burst allowance)
+        """
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        # Shared buckets may have been updated by a process whose clock read later
+        self.level = min(self.capacity,
+                         self.level + max(0.0, now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """
+        Take amount from the bucket and return the seconds to wait before using it
+
+        Requests larger than the capacity are clamped so they can still proceed.
+        """
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        if self.level >= 0:
+            return 0.0
+        return -self.level / self.rate
+
+    def available(self, amount: float, now: float) -> bool:
+        """Check whether amount could be taken without waiting"""
+        self._refill(now)
+        return self.level >= min(amount, self.capacity)
+
+    def fraction(self, now: float, level: Optional[float] = None,
+                 updated: Optional[float] = None) -> float:
+        """
+        Share of the capacity available now (0 while reservations are queued)
+
+        Read-only: the refill is computed, not applied. level and updated
+        project a stored state instead of the bucket's own.
+        """
+        level = self.level if level is None else level
+        updated = self.updated if updated is None else updated
+        level = min(self.capacity, level + max(0.0, now - updated) * self.rate)
+        return max(0.0, level) / self.capacity
+
+
+class SharedBucketStore:
+    """
+    Token-bucket levels in a SQLite file shared by the processes of one host
+
+    Each bucket is a row (key, rate, capacity, level, updated) read and
+    written inside a BEGIN IMMEDIATE transaction, so SQLite's file lock
+    serializes reservations across processes. Shared levels refill against
+    wall-clock time. perception/shared/rate_limit.py uses the same table.
+    """
+
+    SCHEMA = ("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, rate REAL, "
+              "capacity REAL, level REAL, updated REAL)")
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        """
+        Open (or create) a shared store
+
+        Args:
+            path: SQLite database file
+            timeout: Seconds to wait for another process's lock
+        """
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.timeout = timeout
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._local = threading.local()
+        self._connection().execute(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connection of the calling thread (sqlite3 connections are not shared)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def budget(self, key: str) -> Optional[Tuple[float, float]]:
+        """Stored (rate per second, capacity) of a bucket, or None if no process set one"""
+        row = self._connection().execute(
+            "SELECT rate, capacity FROM buckets WHERE key = ?", (key,)).fetchone()
+        return tuple(row) if row else None
+
+    def peek(self, keys: List[str]) -> Dict[str, Tuple[float, float]]:
+        """Stored (level, updated) of the given buckets, read without taking the write lock"""
+        conn = self._connection()
+        rows = {}
+        for key in keys:
+            row = conn.execute(
+                "SELECT level, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            if row:
+                rows[key] = tuple(row)
+        return rows
+
+    @contextmanager
+    def sync(self, buckets: Dict[str, TokenBucket]) -> Iterator[float]:
+        """
+        Load the shared levels into buckets, yield the time, and save them back
+
+        The block runs under the database write lock. Buckets without a row
+        start full.
+
+        Args:
+            buckets: Buckets by shared key
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            for key, bucket in buckets.items():
+                row = conn.execute(
+                    "SELECT level, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                bucket.level, bucket.updated = row if row else (bucket.capacity, now)
+            yield now
+            conn.executemany(
+                "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?, ?)",
+                [(key, b.rate, b.capacity, b.level, b.updated) for key, b in buckets.items()])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter
+
+    Both budgets are optional; a limiter with neither never waits, unless it
+    has a shared key and store: it then follows the budgets other processes
+    stored for that key (as the perception runners do). Only limiters with a
+    shared key (an API key fingerprint) use the shared store, so clients with
+    different keys never draw from one bucket.
+    """
+
+    def __init__(self,
+                 requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None,
+                 burst: Optional[int] = None,
+                 name: str = "default",
+                 shared_key: Optional[str] = None,
+                 store: Union[SharedBucketStore, object, None] = None):
+        """
+        Initialize rate limiter
+
+        Args:
+            requests_per_minute: Request budget (None = unlimited)
+            tokens_per_minute: Token budget (None = unlimited)
+            burst: Requests that may be sent back-to-back (default: 10 seconds' worth)
+            name: Label used in reports
+            shared_key: Budget key in the shared store, see api_key_fingerprint
+                (None = this process only). Without budgets, the limiter
+                follows the ones stored under this key
+            store: Shared store (None = get_shared_store(), PROCESS_LOCAL =
+                this process only)
+        """
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.shared_key = shared_key
+        if store is None:
+            store = get_shared_store()
+        self.store = store if shared_key is not None and store is not PROCESS_LOCAL else None
+        self.following = (not requests_per_minute and not tokens_per_minute
+                          and self.store is not None)
+
+        self._lock = threading.Lock()
+        self.total_wait = 0.0
+        self.total_requests = 0
+        self.total_tokens = 0
+
+        self._request_bucket = None
+        self._token_bucket = None
+
+        if requests_per_minute:
+            if burst is None:
+                burst = max(1, int(requests_per_minute / 6))
+            self._request_bucket = TokenBucket(
+                requests_per_minute / 60.0, float(burst))
+        if tokens_per_minute:
+            # Token burst mirrors the request burst (10 seconds' worth by default)
+            burst_fraction = (burst / requests_per_minute
+                              if requests_per_minute and burst else 1 / 6)
+            self._token_bucket = TokenBucket(
+                tokens_per_minute / 60.0,
+                max(1.0, tokens_per_minute * burst_fraction))
+        self.burst = burst
+
+    @classmethod
+    def from_pause_config(cls, rate_limit_requests: int,
+                          rate_limit_pause: float,
+                          shared_key: Optional[str] = None) -> Optional["RateLimiter"]:
+        """
+        Build a limiter equivalent to the old "pause N seconds every M requests" settings
+
+        Args:
+            rate_limit_requests: Number of requests per window (0 = no limit)
+            rate_limit_pause: Window length in seconds
+            shared_key: Budget key in the shared store, if one is configured
+
+        Returns:
+            RateLimiter, or None if rate limiting is disabled and there is no
+            shared budget to follow
+        """
+        if not rate_limit_requests or rate_limit_requests <= 0 or not rate_limit_pause:
+            if shared_key is None or get_shared_store() is None:
+                return None
+            return cls(name="shared", shared_key=shared_key)
+        return cls(
+            requests_per_minute=rate_limit_requests * 60.0 / rate_limit_pause,
+            burst=rate_limit_requests,
+            name="legacy",
+            shared_key=shared_key)
+
+    def _follow_stored_budgets(self):
+        """Adopt the budgets other processes stored for the shared key (caller holds the lock)"""
+        budget = self.store.budget(f"{self.shared_key}:requests")
+        if budget is not None:
+            self._request_bucket = _adopt_budget(self._request_bucket, *budget)
+            self.requests_per_minute, self.burst = budget[0] * 60.0, int(budget[1])
+        budget = self.store.budget(f"{self.shared_key}:tokens")
+        if budget is not None:
+            self._token_bucket = _adopt_budget(self._token_bucket, *budget)
+            self.tokens_per_minute = budget[0] * 60.0
+
+    def _buckets(self) -> Dict[str, TokenBucket]:
+        """Configured buckets by shared-store key (caller holds the lock)"""
+        return {f"{self.shared_key}:{kind}": bucket
+                for kind, bucket in (("requests", self._request_bucket),
+                                     ("tokens", self._token_bucket))
+                if bucket is not None}
+
+    @contextmanager
+    def _synced(self) -> Iterator[float]:
+        """Hold the limiter's lock (and the shared store's, if any); yields the time"""
+        with self._lock:
+            if self.following:
+                self._follow_stored_budgets()
+            buckets = self._buckets()
+            if self.store is None or not buckets:
+                yield time.monotonic()
+            else:
+                with self.store.sync(buckets) as now:
+                    yield now
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Block until one request with the given token count is admitted
+
+        Args:
+            tokens: Estimated tokens consumed by the request
+
+        Returns:
+            Seconds spent waiting
+        """
+        with self._synced() as now:
+            wait = 0.0
+            if self._request_bucket is not None:
+                wait = max(wait, self._request_bucket.reserve(1, now))
+            if self._token_bucket is not None and tokens:
+                wait = max(wait, self._token_bucket.reserve(tokens, now))
+            self.total_wait += wait
+            self.total_requests += 1
+            self.total_tokens += tokens
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def try_acquire(self, tokens: int = 0) -> bool:
+        """
+        Admit one request only if it would not have to wait
+
+        Args:
+            tokens: Estimated tokens consumed by the request
+
+        Returns:
+            True if admitted
+        """
+        with self._synced() as now:
+            if self._request_bucket is not None and not self._request_bucket.available(1, now):
+                return False
+            if self._token_bucket is not None and tokens and not self._token_bucket.available(tokens, now):
+                return False
+            if self._request_bucket is not None:
+                self._request_bucket.reserve(1, now)
+            if self._token_bucket is not None and tokens:
+                self._token_bucket.reserve(tokens, now)
+            self.total_requests += 1
+            self.total_tokens += tokens
+            return True
+
+    def headroom(self) -> float:
+        """
+        Share of the burst allowance available now (1.0 without budgets)
+
+        A read-only snapshot: nothing is written back, and a shared store is
+        read without its write lock, so routing decisions can poll it cheaply.
+        """
+        with self._lock:
+            buckets = self._buckets()
+            states = {key: (bucket.level, bucket.updated) for key, bucket in buckets.items()}
+        if not buckets:
+            return 1.0
+        if self.store is None:
+            now = time.monotonic()
+        else:
+            # Shared levels refill against wall-clock time; buckets without a row are full
+            now = time.time()
+            stored = self.store.peek(list(buckets))
+            states = {key: stored.get(key, (bucket.capacity, now)) for key, bucket in buckets.items()}
+        return min(bucket.fraction(now, *states[key]) for key, bucket in buckets.items())
+
+    def stats(self) -> Dict:
+        """Return configuration and cumulative wait statistics"""
+        with self._lock:
+            return {
+                "name": self.name,
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "burst": self.burst,
+                "shared": self.store.path if self.store is not None else None,
+                "requests": self.total_requests,
+                "tokens": self.total_tokens,
+                "wait_seconds": round(self.total_wait, 3),
+            }
+
+
+def _adopt_budget(bucket: Optional[TokenBucket], rate: float, capacity: float) -> TokenBucket:
+    """Bucket with the given budget, keeping the existing one's state"""
+    if bucket is None:
+        return TokenBucket(rate, capacity)
+    bucket.rate, bucket.capacity = rate, capacity
+    return bucket
+
+
+# Limiters shared by every client talking to the same provider
+_registry: Dict[str, RateLimiter] = {}
+_registry_lock = threading.Lock()
+# Cross-process stores by path, and the path set by use_shared_store
+_stores: Dict[str, SharedBucketStore] = {}
+_shared_path: Optional[str] = None
+
+
+def api_key_fingerprint(api_key: Optional[str]) -> Optional[str]:
+    """Shared budget key of an API key (a hash, so the key is never stored)"""
+    if not api_key:
+        return None
+    return "key-" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def use_shared_store(path: Optional[str]):
+    """Share limiters created from now on through the SQLite file at path (None = VLM_RATE_LIMIT_DB)"""
+    global _shared_path
+    _shared_path = path
+
+
+def get_shared_store() -> Optional[SharedBucketStore]:
+    """Store set by use_shared_store or VLM_RATE_LIMIT_DB, or None to limit per process"""
+    path = _shared_path or os.getenv("VLM_RATE_LIMIT_DB")
+    if not path:
+        return None
+    with _registry_lock:
+        if path not in _stores:
+            _stores[path] = SharedBucketStore(path)
+        return _stores[path]
+
+
+def get_rate_limiter(provider: str,
+                     requests_per_minute: Optional[float] = None,
+                     tokens_per_minute: Optional[float] = None,
+                     burst: Optional[int] = None,
+                     shared_key: Optional[str] = None) -> RateLimiter:
+    """
+    Return the shared limiter for a provider, creating it on first use
+
+    Later calls with different limits return the existing limiter unchanged.
+
+    Args:
+        provider: Provider key (e.g. the client's SERVICE_NAME)
+        requests_per_minute: Request budget (None = unlimited)
+        tokens_per_minute: Token budget (None = unlimited)
+        burst: Requests that may be sent back-to-back
+        shared_key: Budget key across processes (api_key_fingerprint of the
+            client's key); used when a shared store is configured (None =
+            this process only). With no budgets the limiter follows the ones
+            stored under this key
+
+    Returns:
+        RateLimiter shared by all callers with the same provider key
+    """
+    store = get_shared_store()
+    with _registry_lock:
+        limiter = _registry.get(provider)
+        if limiter is None:
+            limiter = RateLimiter(
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+                burst=burst,
+                name=provider,
+                shared_key=shared_key,
+                store=store)
+            _registry[provider] = limiter
+        return limiter
+
+
+def estimate_request_tokens(prompt: str, image_paths: List[str],
+                            max_output_tokens: int = 0) -> int:
+    """
+    Estimate the tokens a request will consume before sending it
+
+    Args:
+        prompt: Text prompt
+        image_paths: Images sent with the prompt
+        max_output_tokens: Output budget reserved for the completion
+
+    Returns:
+        Estimated total tokens
+    """
+    tokens = len(prompt) // CHARS_PER_TOKEN + max_output_tokens
+    for img_path in image_paths:
+        try:
+            with Image.open(img_path) as img:
+                width, height = img.size
+            tokens += max(1, width * height // PIXELS_PER_IMAGE_TOKEN)
+        except OSError:
+            tokens += 1000
+    return tokens
@@ -0,0 +1,188 @@
+"""
+Record/replay model client
+Records every request fingerprint with its response, observed latency and
+token usage to a compact JSONL log (gzip-compressed for .gz paths), and
+replays those responses later without network access, optionally with the
+recorded latency or a scaled version of it
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Union
+
+from .generation import GenerationConfig
+from .image_cache import ImagePayloadCache, get_image_cache
+from .model_client import ModelClient, ModelClientWrapper, ModelQueryError, classify_error
+from .response_cache import ResponseCache
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+def _open_log(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class RecordReplayModelClient(ModelClientWrapper):
+    """
+    Records queries of a live client, or replays a recorded log
+
+    Requests are identified by prompt, image content and decoding budget
+    (not by image path or model), so a log recorded with one seed replays
+    for any run that regenerates the same cases. A request recorded several
+    times is replayed in recorded order, repeating the last entry.
+    """
+
+    def __init__(self,
+                 log_path: str,
+                 client: Optional[ModelClient] = None,
+                 mode: str = RECORD,
+                 latency_scale: float = 0.0,
+                 image_cache: Optional[ImagePayloadCache] = None):
+        """
+        Initialize record/replay client
+
+        Args:
+            log_path: JSONL log file (.gz for gzip compression)
+            client: Live client to record (record mode) or to query on
+                replay misses (replay mode, optional)
+            mode: "record" or "replay"
+            latency_scale: Replay delay as a multiple of the recorded latency
+                (0 = instant, 1 = as recorded)
+            image_cache: Image payload cache used for image digests
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"mode must be '{RECORD}' or '{REPLAY}', got {mode!r}")
+        if mode == RECORD and client is None:
+            raise ValueError("Record mode needs a live client")
+
+        self.log_path = log_path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.image_cache = image_cache or get_image_cache()
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Deque[Dict]] = {}
+
+        if mode == RECORD:
+            super().__init__(client)
+            os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+            self._log = _open_log(log_path, "a")
+            self._write({"header": True, "model_name": client.model_name,
+                         "created": datetime.now().isoformat()})
+            print(f"⏺️  Recording responses to {log_path}")
+        else:
+            model_name = self._load()
+            super().__init__(client, model_name=model_name)
+            print(f"⏯️  Replaying {sum(len(e) for e in self._entries.values())} responses "
+                  f"from {log_path} (latency x{latency_scale:g})")
+
+    def _load(self) -> str:
+        """Read the log into per-fingerprint queues; returns the recorded model name"""
+        model_name = "replay"
+        with _open_log(self.log_path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry.get("header"):
+                    model_name = entry.get("model_name", model_name)
+                    continue
+                self._entries.setdefault(entry["key"], deque()).append(entry)
+        return model_name
+
+    def _write(self, entry: Dict):
+        with self._lock:
+            self._log.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self._log.flush()
+
+    def close(self):
+        """Close the record log"""
+        if self.mode == RECORD:
+            with self._lock:
+                self._log.close()
+
+    def prefetch(self, requests: List[Dict],
+                 generation: Optional[GenerationConfig] = None):
+        # Replays need no bulk submission; only a recorded client may want it
+        if self.mode == RECORD:
+            super().prefetch(requests, generation=generation)
+
+    def fingerprint(self, prompt: str, image_paths: List[str],
+                    generation: Optional[GenerationConfig] = None) -> str:
+        """Identify a request by prompt, image content and decoding budget"""
+        params = generation.for_model(self.model_name).to_params() if generation else {}
+        digests = [self.image_cache.get(path).sha256 for path in image_paths]
+        return ResponseCache.make_key("", "", prompt, digests, params)
+
+    def query(self, prompt: str, image_path: Union[str, List[str]],
+              generation: Optional[GenerationConfig] = None) -> str:
+        """
+        Record a live query, or replay the recorded response
+
+        Args:
+            prompt: Text prompt
+            image_path: Path to image file, or list of paths for multiple images
+            generation: Decoding budget (part of the request fingerprint)
+
+        Returns:
+            Model response
+        """
+        image_paths = image_path if isinstance(image_path, list) else [image_path]
+        key = self.fingerprint(prompt, image_paths, generation)
+        if self.mode == RECORD:
+            return self._record(key, prompt, image_path, generation)
+        return self._replay(key, prompt, image_path, generation)
+
+    def _record(self, key: str, prompt: str, image_path: Union[str, List[str]],
+                generation: Optional[GenerationConfig]) -> str:
+        start = time.monotonic()
+        try:
+            response = self.client.query(prompt, image_path, generation=generation)
+        except Exception as e:
+            error_class = e.error_class if isinstance(e, ModelQueryError) else classify_error(e)[0]
+            self._write({"key": key, "error": str(e), "error_class": error_class,
+                         "latency": round(time.monotonic() - start, 4)})
+            self.record_stat("replay", "recorded")
+            raise
+        entry = {"key": key, "response": response,
+                 "latency": round(time.monotonic() - start, 4)}
+        usage = (self.peek_request_metrics() or {}).get("usage")
+        if usage:
+            entry["usage"] = usage
+        self._write(entry)
+        self.record_stat("replay", "recorded")
+        return response
+
+    def _replay(self, key: str, prompt: str, image_path: Union[str, List[str]],
+                generation: Optional[GenerationConfig]) -> str:
+        with self._lock:
+            queue = self._entries.get(key)
+            entry = None
+            if queue:
+                entry = queue.popleft() if len(queue) > 1 else queue[0]
+
+        if entry is None:
+            self.record_stat("replay", "misses")
+            if self.client is not None:
+                return self.client.query(prompt, image_path, generation=generation)
+            raise ModelQueryError("No recorded response for this request",
+                                  error_class="replay_miss")
+
+        self.record_stat("replay", "hits")
+        self._start_request_metrics(replayed=True, latency=entry["latency"])
+        if self.latency_scale > 0:
+            time.sleep(entry["latency"] * self.latency_scale)
+        if "error" in entry:
+            self.record_stat("errors", entry["error_class"])
+            raise ModelQueryError(entry["error"], error_class=entry["error_class"])
+        if entry.get("usage"):
+            # Replayed runs report the recorded token usage
+            self._record_usage(entry["usage"])
+        return entry["response"]
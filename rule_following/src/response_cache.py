@@ -0,0 +1,195 @@
+"""
+Persistent content-addressed cache of model responses
+Stores responses in a SQLite database keyed by a hash of everything that
+determines the request (model, endpoint, prompt, image content, extra params)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Request parameters that do not change the returned text
+_NON_SEMANTIC_PARAMS = {"stream"}
+
+
+class ResponseCache:
+    """
+    SQLite-backed response cache with LRU eviction
+
+    Entries are evicted least-recently-used first once the total size of
+    stored responses exceeds max_bytes. The database can be shared by several
+    processes; all access from one process is serialized through a lock.
+    """
+
+    def __init__(self,
+                 path: str = "./.cache/vlm_responses.sqlite",
+                 max_bytes: int = 1024 * 1024 * 1024,
+                 refresh: bool = False):
+        """
+        Initialize response cache
+
+        Args:
+            path: Path of the SQLite database file (created if missing)
+            max_bytes: Size cap for stored responses before LRU eviction
+            refresh: If True, never serve cached responses but store new ones
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_access REAL NOT NULL)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model_name: str, base_url: str, prompt: str,
+                 image_digests: List[str], extra_params: Optional[Dict] = None) -> str:
+        """
+        Compute the content address of a request
+
+        Images are identified by the sha256 of their bytes, so regenerated
+        images with identical content map to the same key regardless of path.
+
+        Args:
+            model_name: Model identifier
+            base_url: API base URL
+            prompt: Text prompt
+            image_digests: sha256 hex digests of the images (in order)
+            extra_params: Additional API parameters
+
+        Returns:
+            Hex digest identifying the request
+        """
+        params = {k: v for k, v in (extra_params or {}).items()
+                  if k not in _NON_SEMANTIC_PARAMS}
+        header = json.dumps({
+            "model": model_name,
+            "base_url": base_url,
+            "prompt": prompt,
+            "params": params,
+        }, sort_keys=True, default=str)
+
+        digest = hashlib.sha256(header.encode("utf-8"))
+        for image_digest in image_digests:
+            digest.update(bytes.fromhex(image_digest))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response
+
+        Args:
+            key: Request key from make_key()
+
+        Returns:
+            Cached response, or None on a miss (always None when refreshing)
+        """
+        if self.refresh:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """
+        Store a response and evict old entries if over the size cap
+
+        Args:
+            key: Request key from make_key()
+            response: Model response text
+        """
+        if response is None:
+            return
+
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (key, response, size, created, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now))
+            self.writes += 1
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self):
+        """Delete least-recently-used entries until under max_bytes"""
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Remove all cached responses"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and current cache size"""
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "refresh": self.refresh,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "entries": entries,
+                "size_bytes": total,
+                "max_bytes": self.max_bytes,
+            }
+
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,97 @@
+"""
+Building blocks for simulated model endpoints
+Latency distributions, API-like errors and synthesized board matrices,
+shared by DummyModelClient and the local mock server
+"""
+
+import math
+import random
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+# Cell values used when a matrix is synthesized without ground truth
+PERCEPTION_VALUES = {
+    8: list(range(-6, 7)),   # chess: signed piece codes
+    15: [0, 1, 2],           # gomoku: empty / black / white
+    3: [0, 1, 2],            # tic-tac-toe: empty / X / O
+}
+
+
+@dataclass
+class LatencyModel:
+    """
+    Response latency distribution in seconds
+
+    distribution is one of "fixed", "uniform" (0 to 2 * mean),
+    "exponential" or "lognormal" (median = mean, shape = sigma).
+    """
+    distribution: str = "fixed"
+    mean: float = 0.0
+    sigma: float = 0.5
+
+    def sample(self, rng: random.Random) -> float:
+        if self.mean <= 0:
+            return 0.0
+        if self.distribution == "fixed":
+            return self.mean
+        if self.distribution == "uniform":
+            return rng.uniform(0, 2 * self.mean)
+        if self.distribution == "exponential":
+            return rng.expovariate(1 / self.mean)
+        if self.distribution == "lognormal":
+            return rng.lognormvariate(math.log(self.mean), self.sigma)
+        raise ValueError(f"Unknown latency distribution: {self.distribution}")
+
+
+class _SimulatedResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class SimulatedAPIError(Exception):
+    """HTTP error shaped like an openai SDK APIStatusError (for classify_error)"""
+
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = _SimulatedResponse(
+            {"retry-after": f"{retry_after:g}"} if retry_after is not None else {})
+
+
+def matrix_size_from_prompt(prompt: str) -> Optional[int]:
+    """Board size requested by a perception prompt ("15×15 matrix" -> 15)"""
+    match = re.search(r"(\d+)\s*[×x]\s*\1", prompt)
+    return int(match.group(1)) if match else None
+
+
+def synthesize_matrix(size: int,
+                      rng: random.Random,
+                      ground_truth: Optional[List[List[int]]] = None,
+                      error_rate: float = 0.0,
+                      values: Optional[Sequence[int]] = None) -> List[List[int]]:
+    """
+    Produce a board matrix as a perception model would report it
+
+    Args:
+        size: Rows/columns (used when there is no ground truth)
+        rng: Random source
+        ground_truth: Correct matrix; without it a random board is drawn
+        error_rate: Probability that each cell is misreported
+        values: Possible cell values (default: taken from ground truth / board size)
+
+    Returns:
+        Matrix as a list of rows
+    """
+    if values is None:
+        values = sorted({v for row in ground_truth for v in row} | {0}) \
+            if ground_truth else PERCEPTION_VALUES.get(size, [0, 1, 2])
+    if ground_truth is None:
+        # Mostly empty, like real positions
+        ground_truth = [[rng.choice(values) if rng.random() < 0.3 else 0
+                         for _ in range(size)] for _ in range(size)]
+    if error_rate <= 0 or len(values) < 2:
+        return [list(row) for row in ground_truth]
+    return [[rng.choice([v for v in values if v != value])
+             if rng.random() < error_rate else value
+             for value in row] for row in ground_truth]
@@ -4,18 +4,27 @@ Provides common functionality for test execution, verification, and result repor
 """
 
 import os
-from typing import List, Dict, Tuple
+from typing import Iterator, List, Dict, Tuple
 from datetime import datetime
 from abc import ABC, abstractmethod
 from ..data_structures import TestResult, save_results, create_summary
 from ..board_generator import ChessBoardGenerator
 from .verification_generator import VerificationQuestionGenerator
-import time
+from ..executor import QueryExecutor, QueryOutcome, restore_order
+from ..rate_limiter import RateLimiter, api_key_fingerprint
+from ..generation import GenerationConfig
+from ..packing import build_packed_prompt, packed_generation, share_metrics, split_packed_response
+from ..usage import add_usage
+from ..prompting import LayeredPrompt, prefix_order
 
 
 class SpatialTestBase(ABC):
     """Abstract base class for spatial tests"""
 
+    # Output budget for the two-line verification + main answer format;
+    # max_tokens is sized to the generated cases (see fit_generation_config)
+    GENERATION_CONFIG = GenerationConfig()
+
     def __init__(self,
                  test_layer: int,
                  base_output_dir: str,
@@ -23,7 +32,9 @@ class SpatialTestBase(ABC):
                  seed: int = 42,
                  auto_timestamp: bool = True,
                  rate_limit_requests: int = 0,
-                 rate_limit_pause: int = 0):
+                 rate_limit_pause: int = 0,
+                 max_concurrency: int = 1,
+                 pack_size: int = 1):
         """
         Initialize Spatial Test Base
 
@@ -33,11 +44,16 @@ class SpatialTestBase(ABC):
             n_cases_per_type: Number of cases per test type
             seed: Random seed for reproducibility
             auto_timestamp: If True, append timestamp to output directory
+            max_concurrency: Number of model queries in flight (1 = sequential)
+            pack_size: Cases per request (1 = one request per case, see src/packing.py)
         """
         self.test_layer = test_layer
 
         self.rate_limit_requests = rate_limit_requests
         self.rate_limit_pause = rate_limit_pause
+        self.max_concurrency = max_concurrency
+        self.pack_size = max(1, pack_size)
+        self.generation_config = self.GENERATION_CONFIG
 
         if auto_timestamp:
             timestamp = datetime.now().strftime("%m%d_%H%M%S")
@@ -109,7 +125,20 @@ Please answer both questions. Format your response as:
 Verification: [your answer to verification question]
 Main answer: [yes/no/unknown for the main question]"""
 
-        return prompt
+        # Static lead-in up to the first per-case text (cacheable prefix)
+        return LayeredPrompt.split(prompt, verification_q, test_q)
+
+    def fit_generation_config(self) -> GenerationConfig:
+        """
+        Size the output budget to the longest expected answers of the test cases
+
+        Returns:
+            The generation config used for the queries
+        """
+        self.generation_config = self.generation_config.fit_answers(
+            [case.get('verification_expected') or '' for case in self.test_cases],
+            [case['expected'] for case in self.test_cases])
+        return self.generation_config
 
     def run_test(self, model_client, save_results_flag: bool = True) -> Tuple[List[TestResult], Dict]:
         """
@@ -122,6 +151,21 @@ Main answer: [yes/no/unknown for the main question]"""
         Returns:
             Tuple of (results_list, statistics_dict)
         """
+        # rate_limit_requests/rate_limit_pause map onto a token bucket shared
+        # by all in-flight queries of this run (unless the client already has
+        # a limiter), and by other processes using the same API key when
+        # VLM_RATE_LIMIT_DB is set; the client gets its previous limiter back
+        # when the run ends
+        run_limiter = None
+        if model_client.rate_limiter is None:
+            run_limiter = RateLimiter.from_pause_config(
+                self.rate_limit_requests, self.rate_limit_pause,
+                shared_key=api_key_fingerprint(getattr(model_client, "api_key", None)))
+        with model_client.attached_rate_limiter(run_limiter):
+            return self._run_test(model_client, save_results_flag)
+
+    def _run_test(self, model_client, save_results_flag: bool) -> Tuple[List[TestResult], Dict]:
+        """Body of run_test, with the run's rate limiter attached"""
         results = []
         stats = {
             'total': 0,
@@ -130,23 +174,37 @@ Main answer: [yes/no/unknown for the main question]"""
             'test_correct': 0,
             'test_incorrect': 0,
             'test_correct_given_verified': 0,
+            'errors': 0,
+            'pack_size': self.pack_size,
         }
+        model_client.reset_run_stats()
+        self.fit_generation_config()
+
+        # Cases sharing prompt instructions are sent back to back (provider
+        # prefix caching); results keep generation order
+        dispatch_order = prefix_order(self.test_cases, self.generate_combined_prompt)
 
         print(f"{'='*60}")
         print(f"Running Spatial Test {self.test_layer}")
         print("(Each case includes verification question + test question)")
         print(f"{'='*60}\n")
 
-        for i, case in enumerate(self.test_cases, 1):
+        if self.pack_size > 1:
+            outcomes = self._query_packed(model_client, dispatch_order)
+        else:
+            outcomes = self._query_single(model_client, dispatch_order)
+
+        for i, (case, outcome) in enumerate(zip(self.test_cases, outcomes), 1):
             print(f"[{i}/{len(self.test_cases)}] Testing {case['case_id']}...")
 
             stats['total'] += 1
-
-            prompt = self.generate_combined_prompt(case)
+            error = False
 
             try:
-                # Query model with combined prompt
-                response = model_client.query(prompt, case["image_path"])
+                # Queries are dispatched by the executor; outcomes arrive in case order
+                if outcome.error is not None:
+                    raise outcome.error
+                response = outcome.response
 
                 # Parse response
                 verification_response, test_response = self._parse_combined_response(
@@ -186,13 +244,6 @@ Main answer: [yes/no/unknown for the main question]"""
                         f"    Expected: {case.get('verification_expected', 'N/A')}")
                     print(f"    Got: {verification_response[:50]}...")
 
-                # Handle rate limiting
-                if self.rate_limit_requests > 0 and i % self.rate_limit_requests == 0 and i < len(self.test_cases):
-                    print(
-                        f"\n  ⏸️  Rate limit: Processed {i} requests, pausing for {self.rate_limit_pause} seconds...")
-                    time.sleep(self.rate_limit_pause)
-                    print(f"  ▶️  Resuming...\n")
-
             except Exception as e:
                 print(f"  ✗ Error: {e}")
                 verification_response = "error"
@@ -200,7 +251,10 @@ Main answer: [yes/no/unknown for the main question]"""
                 verification_passed = False
                 model_answer = "error"
                 correct = False
-                stats['verification_failed'] += 1
+                # Failed requests (retries exhausted) are not recognition
+                # failures; they are left out of the rates
+                error = True
+                stats['errors'] += 1
 
             # Record result
             result = TestResult(
@@ -216,11 +270,18 @@ Main answer: [yes/no/unknown for the main question]"""
                 expected_answer=case["expected"],
                 model_response=test_response,
                 correct=correct,
+                error=error,
                 image_paths=[case["image_path"]],
-                model_name=model_client.model_name
+                model_name=model_client.model_name,
+                request_metrics=outcome.metrics
             )
             results.append(result)
 
+        # Client-side counters (cache hits, etc.) for this run
+        stats['client_stats'] = model_client.get_run_stats()
+        if model_client.concurrency_controller is not None:
+            stats['concurrency'] = model_client.concurrency_controller.stats()
+
         # Print results
         self._print_results_summary(results, stats)
 
@@ -232,6 +293,98 @@ Main answer: [yes/no/unknown for the main question]"""
 
         return results, stats
 
+    def _query_single(self, model_client, order: List[int]) -> Iterator[QueryOutcome]:
+        """Query every case in its own request; outcomes in case order"""
+        # Bulk clients (e.g. batch mode) receive all requests up front
+        model_client.prefetch(
+            [{"custom_id": case["case_id"],
+              "prompt": self.generate_combined_prompt(case),
+              "image_paths": case["image_path"]}
+             for case in self.test_cases],
+            generation=self.generation_config)
+
+        executor = QueryExecutor(max_concurrency=self.max_concurrency,
+                                 controller=model_client.concurrency_controller)
+        return executor.map(
+            lambda case: model_client.query(
+                self.generate_combined_prompt(case), case["image_path"],
+                generation=self.generation_config),
+            self.test_cases,
+            metrics_fn=model_client.pop_request_metrics,
+            order=order)
+
+    def _query_packed(self, model_client, order: List[int]) -> Iterator[QueryOutcome]:
+        """
+        Query pack_size cases per request; outcomes in case order
+
+        Packs are cut from the cases in dispatch order. A pack whose response
+        cannot be split into per-case answers is asked again one case per
+        request. Token usage of the packed request is shared evenly among its
+        cases.
+        """
+        dispatched = [self.test_cases[i] for i in order]
+        packs = [dispatched[i:i + self.pack_size]
+                 for i in range(0, len(dispatched), self.pack_size)]
+        print(f"Packing {self.pack_size} cases per request ({len(packs)} requests)\n")
+
+        model_client.prefetch(
+            [{"custom_id": f"pack_{pack[0]['case_id']}",
+              "prompt": build_packed_prompt(pack),
+              "image_paths": [case["image_path"] for case in pack]}
+             for pack in packs],
+            generation=packed_generation(self.generation_config, self.pack_size))
+
+        def query_pack(pack: List[Dict]) -> List[QueryOutcome]:
+            k = len(pack)
+            model_client.record_stat("packing", "packs")
+            model_client.record_stat("packing", "cases", k)
+            try:
+                response = model_client.query(
+                    build_packed_prompt(pack), [case["image_path"] for case in pack],
+                    generation=packed_generation(self.generation_config, k))
+            except Exception as e:
+                metrics = model_client.pop_request_metrics()
+                return [QueryOutcome(error=e, metrics=share_metrics(metrics, k, i))
+                        for i in range(k)]
+            metrics = model_client.pop_request_metrics()
+
+            answers = split_packed_response(response, k)
+            if answers is not None:
+                return [QueryOutcome(response=answer, metrics=share_metrics(metrics, k, i))
+                        for i, answer in enumerate(answers)]
+
+            # Unparseable pack: ask each case on its own
+            model_client.record_stat("packing", "fallback_packs")
+            outcomes = []
+            for i, case in enumerate(pack):
+                try:
+                    outcome = QueryOutcome(response=model_client.query(
+                        self.generate_combined_prompt(case), case["image_path"],
+                        generation=self.generation_config))
+                except Exception as e:
+                    outcome = QueryOutcome(error=e)
+                case_metrics = model_client.pop_request_metrics() or {}
+                shared = share_metrics(metrics, k, i)
+                if shared.get("usage"):
+                    usage = dict(case_metrics.get("usage") or {})
+                    add_usage(usage, shared["usage"])
+                    case_metrics["usage"] = usage
+                case_metrics["pack"] = dict(shared["pack"], fallback=True)
+                outcome.metrics = case_metrics
+                outcomes.append(outcome)
+            return outcomes
+
+        executor = QueryExecutor(max_concurrency=self.max_concurrency,
+                                 controller=model_client.concurrency_controller)
+        def dispatched_outcomes() -> Iterator[QueryOutcome]:
+            for pack, outcome in zip(packs, executor.map(query_pack, packs)):
+                if outcome.error is not None:
+                    yield from (QueryOutcome(error=outcome.error) for _ in pack)
+                else:
+                    yield from outcome.response
+
+        yield from restore_order(order, dispatched_outcomes())
+
     def _parse_combined_response(self, response: str) -> Tuple[str, str]:
         """
         Parse model response into verification answer and test answer
@@ -244,9 +397,11 @@ Main answer: [yes/no/unknown for the main question]"""
         for line in lines:
             line_lower = line.lower().strip()
 
-            if line_lower.startswith('verification:'):
+            # The first answer line counts, as when a stream stops early
+            if line_lower.startswith('verification:') and not verification_response:
                 verification_response = line.split(':', 1)[1].strip()
-            elif line_lower.startswith('main answer:') or line_lower.startswith('main:'):
+            elif (line_lower.startswith('main answer:') or line_lower.startswith('main:')) \
+                    and not test_response:
                 test_response = line.split(':', 1)[1].strip()
 
         # If parsing failed, try to extract from full response
@@ -281,14 +436,17 @@ Main answer: [yes/no/unknown for the main question]"""
         print(f"RESULTS SUMMARY")
         print(f"{'='*60}")
 
-        # Verification statistics
+        # Verification statistics (cases whose request failed are excluded)
+        answered = stats['total'] - stats.get('errors', 0)
         verification_rate = stats['verification_passed'] / \
-            stats['total'] if stats['total'] > 0 else 0
+            answered if answered > 0 else 0
         print(f"\nBoard Recognition:")
         print(
-            f"  Verified correctly: {stats['verification_passed']}/{stats['total']} ({verification_rate:.1%})")
+            f"  Verified correctly: {stats['verification_passed']}/{answered} ({verification_rate:.1%})")
         print(
-            f"  Failed to recognize: {stats['verification_failed']}/{stats['total']} ({1-verification_rate:.1%})")
+            f"  Failed to recognize: {stats['verification_failed']}/{answered} ({1-verification_rate:.1%})")
+        if stats.get('errors'):
+            print(f"  Request errors (excluded): {stats['errors']}/{stats['total']}")
 
         # Test accuracy (only among verified cases)
         if stats['verification_passed'] > 0:
@@ -302,10 +460,10 @@ Main answer: [yes/no/unknown for the main question]"""
 
         # Overall accuracy (including verification failures)
         overall_accuracy = stats['test_correct'] / \
-            stats['total'] if stats['total'] > 0 else 0
-        print(f"\nOverall Accuracy (all cases):")
+            answered if answered > 0 else 0
+        print(f"\nOverall Accuracy (all answered cases):")
         print(
-            f"  Correct: {stats['test_correct']}/{stats['total']} ({overall_accuracy:.1%})")
+            f"  Correct: {stats['test_correct']}/{answered} ({overall_accuracy:.1%})")
 
         # Breakdown by type (only verified cases)
         self._print_type_breakdown(results)
@@ -18,7 +18,9 @@ class SpatialTest1(SpatialTestBase):
                  seed: int = 42,
                  auto_timestamp: bool = True,
                  rate_limit_requests: int = 0,
-                 rate_limit_pause: int = 0):
+                 rate_limit_pause: int = 0,
+                 max_concurrency: int = 1,
+                 pack_size: int = 1):
         """
         Initialize Spatial Test 1
 
@@ -27,6 +29,8 @@ class SpatialTest1(SpatialTestBase):
             n_cases_per_type: Number of cases per piece type
             seed: Random seed for reproducibility
             auto_timestamp: If True, append timestamp to output directory
+            max_concurrency: Number of model queries in flight (1 = sequential)
+            pack_size: Cases per request (1 = one request per case)
         """
         super().__init__(
             test_layer=1,
@@ -35,7 +39,9 @@ class SpatialTest1(SpatialTestBase):
             seed=seed,
             auto_timestamp=auto_timestamp,
             rate_limit_requests=rate_limit_requests,
-            rate_limit_pause=rate_limit_pause
+            rate_limit_pause=rate_limit_pause,
+            max_concurrency=max_concurrency,
+            pack_size=pack_size
         )
 
     def generate_test_cases(self) -> List[Dict]:
@@ -0,0 +1,56 @@
+"""
+Incremental parsing of streamed combined (verification + main answer) responses
+Lets a streaming client stop reading once both answer lines are complete,
+instead of paying for the explanation many models append afterwards
+"""
+
+from typing import Optional
+
+
+class CombinedAnswerDetector:
+    """
+    Detects when a streamed response contains both answer lines
+
+    Uses the same line rules as the test bases' _parse_combined_response:
+    the first line starting with "Verification:" and the first line starting
+    with "Main answer:" (or "Main:"), case-insensitive, so later lines cannot
+    change the parsed answers. A line only counts once its terminating
+    newline has arrived, so the parsed answer is never cut mid-line.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._scanned = 0  # Offset of the first line not yet checked
+        self.verification_line: Optional[str] = None
+        self.main_answer_line: Optional[str] = None
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Append a streamed chunk
+
+        Args:
+            chunk: Text delta from the stream
+
+        Returns:
+            True once both the verification and main answer lines are complete
+        """
+        self.text += chunk
+        while True:
+            newline = self.text.find('\n', self._scanned)
+            if newline == -1:
+                break
+            line = self.text[self._scanned:newline]
+            self._scanned = newline + 1
+
+            line_lower = line.lower().strip()
+            if line_lower.startswith('verification:') and self.verification_line is None:
+                self.verification_line = line
+            elif (line_lower.startswith('main answer:') or line_lower.startswith('main:')) \
+                    and self.main_answer_line is None:
+                self.main_answer_line = line
+        return self.complete
+
+    @property
+    def complete(self) -> bool:
+        """Whether both answer lines have been seen"""
+        return self.verification_line is not None and self.main_answer_line is not None
@@ -0,0 +1,344 @@
+"""
+Per-request telemetry
+Records queue wait, time to first byte, total latency, bytes uploaded and
+status of every API attempt, keeps HDR-style histograms per provider and
+model, and exports them as a Prometheus text file and as JSONL
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Histogram metrics kept per (provider, model)
+METRICS = {
+    "queue_wait_seconds": "Time waiting for a concurrency slot and the rate limiter",
+    "ttfb_seconds": "Time from sending the request to receiving response headers",
+    "latency_seconds": "Total time of one API attempt",
+    "bytes": "Bytes uploaded per request",
+}
+QUANTILES = (0.5, 0.9, 0.95, 0.99, 0.999)
+
+# Attempt being recorded in this context (filled in by the transport hooks)
+_current: ContextVar[Optional[Dict]] = ContextVar("telemetry_attempt", default=None)
+# Concurrency-slot wait not yet charged to an attempt
+_pending_queue_wait: ContextVar[float] = ContextVar("telemetry_queue_wait", default=0.0)
+# Receives the rate-limit headroom reported by the server (see watch_quota)
+_quota_report: ContextVar[Optional[Dict]] = ContextVar("telemetry_quota", default=None)
+
+
+class HdrHistogram:
+    """
+    Log-linear histogram with bounded relative error (as in HdrHistogram)
+
+    Values are scaled to integer units; each power-of-two range is split
+    into 2^(sub_bucket_bits - 1) linear buckets, so any recorded value is
+    reproduced within 1 / 2^(sub_bucket_bits - 1) of itself (< 1% with the
+    default), however long the run. Memory grows only with the number of
+    distinct buckets hit.
+    """
+
+    def __init__(self, unit: float = 1e-6, sub_bucket_bits: int = 8):
+        """
+        Initialize histogram
+
+        Args:
+            unit: Value of one integer unit (1e-6 = microsecond resolution for seconds)
+            sub_bucket_bits: Precision bits (8 = 2 significant digits)
+        """
+        self.unit = unit
+        self.sub_bucket_bits = sub_bucket_bits
+        self.counts: Dict[Tuple[int, int], int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _key(self, units: int) -> Tuple[int, int]:
+        shift = max(0, units.bit_length() - self.sub_bucket_bits)
+        return shift, units >> shift
+
+    def _bounds(self, key: Tuple[int, int]) -> Tuple[float, float]:
+        shift, sub = key
+        return (sub << shift) * self.unit, ((sub + 1) << shift) * self.unit
+
+    def record(self, value: float):
+        """Add one value (negative values are clamped to 0)"""
+        value = max(0.0, value)
+        key = self._key(int(value / self.unit))
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "HdrHistogram"):
+        """Add the counts of a histogram with the same unit and precision"""
+        for key, n in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + n
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Value at quantile q (0-1), as the midpoint of its bucket"""
+        if not self.count:
+            return None
+        rank = max(1, int(round(q * self.count)))
+        seen = 0
+        for key in sorted(self.counts, key=self._bounds):
+            seen += self.counts[key]
+            if seen >= rank:
+                lower, upper = self._bounds(key)
+                return min(max((lower + upper) / 2, self.min), self.max)
+        return self.max
+
+    def buckets(self) -> List[List[float]]:
+        """Non-empty buckets as [lower, upper, count], in value order"""
+        return [[*self._bounds(key), self.counts[key]]
+                for key in sorted(self.counts, key=self._bounds)]
+
+    def to_dict(self) -> Dict:
+        summary = {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "min": self.min,
+            "max": self.max,
+            "mean": round(self.total / self.count, 6) if self.count else None,
+        }
+        for q in QUANTILES:
+            value = self.percentile(q)
+            summary[f"p{q * 100:g}"] = round(value, 6) if value is not None else None
+        return summary
+
+
+def _histogram(metric: str) -> HdrHistogram:
+    # Bytes are counted exactly; times at microsecond resolution
+    return HdrHistogram(unit=1.0) if metric == "bytes" else HdrHistogram()
+
+
+class Telemetry:
+    """
+    Process-wide collector of per-attempt request telemetry
+
+    Model clients wrap each API attempt in track(); the shared HTTP
+    transport reports bytes, response headers and status codes into the
+    attempt being tracked in the same thread. Per-request records can be
+    streamed to a JSONL file to follow throttling drift during long runs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[Tuple[str, str], Dict[str, HdrHistogram]] = {}
+        self.statuses: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self.bytes_sent: Dict[Tuple[str, str], int] = {}
+        self._sink = None
+
+    def open_request_log(self, path: str):
+        """Append every request record to a JSONL file from now on"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            if self._sink is not None:
+                self._sink.close()
+            self._sink = open(path, 'a', encoding='utf-8')
+
+    def close(self):
+        """Close the request log"""
+        with self._lock:
+            if self._sink is not None:
+                self._sink.close()
+                self._sink = None
+
+    @contextmanager
+    def track(self, provider: str, model: str, queue_wait: float = 0.0) -> Iterator[Dict]:
+        """
+        Record one API attempt
+
+        Args:
+            provider: Provider label, e.g. "DashScope"
+            model: Model name
+            queue_wait: Seconds the attempt waited before being sent
+        """
+        queue_wait += _pending_queue_wait.get()
+        _pending_queue_wait.set(0.0)
+        record = {"provider": provider, "model": model,
+                  "queue_wait": queue_wait, "bytes_out": 0}
+        token = _current.set(record)
+        start = time.monotonic()
+        try:
+            yield record
+        except Exception as e:
+            if "status" not in record:
+                record["status"] = str(getattr(e, "status_code", None) or type(e).__name__)
+            raise
+        finally:
+            _current.reset(token)
+            record["latency"] = time.monotonic() - start
+            record.setdefault("status", "ok")
+            self.observe(record)
+
+    def observe(self, record: Dict):
+        """Add a finished attempt to the histograms (and the request log)"""
+        key = (record["provider"], record["model"])
+        record.pop("sent_at", None)
+        with self._lock:
+            histograms = self.histograms.setdefault(
+                key, {metric: _histogram(metric) for metric in METRICS})
+            histograms["queue_wait_seconds"].record(record["queue_wait"])
+            histograms["latency_seconds"].record(record["latency"])
+            if "ttfb" in record:
+                histograms["ttfb_seconds"].record(record["ttfb"])
+            if record["bytes_out"]:
+                histograms["bytes"].record(record["bytes_out"])
+            statuses = self.statuses.setdefault(key, {})
+            statuses[str(record["status"])] = statuses.get(str(record["status"]), 0) + 1
+            self.bytes_sent[key] = self.bytes_sent.get(key, 0) + record["bytes_out"]
+            if self._sink is not None:
+                entry = {"ts": round(time.time(), 3)}
+                entry.update({k: round(v, 4) if isinstance(v, float) else v
+                              for k, v in record.items()})
+                self._sink.write(json.dumps(entry) + "\n")
+                self._sink.flush()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Histogram summaries and status counts per "provider/model" """
+        with self._lock:
+            return {
+                f"{provider}/{model}": {
+                    "statuses": dict(self.statuses.get((provider, model), {})),
+                    "bytes_sent": self.bytes_sent.get((provider, model), 0),
+                    **{metric: hist.to_dict() for metric, hist in histograms.items()},
+                }
+                for (provider, model), histograms in self.histograms.items()
+            }
+
+    def export_jsonl(self, path: str):
+        """Write one line per provider, model and metric with percentiles and buckets"""
+        with self._lock:
+            lines = []
+            for (provider, model), histograms in self.histograms.items():
+                for metric, hist in histograms.items():
+                    lines.append({"provider": provider, "model": model, "metric": metric,
+                                  **hist.to_dict(), "buckets": hist.buckets()})
+                lines.append({"provider": provider, "model": model, "metric": "status",
+                              "counts": dict(self.statuses.get((provider, model), {}))})
+        with open(path, 'w', encoding='utf-8') as f:
+            for line in lines:
+                f.write(json.dumps(line) + "\n")
+
+    def export_prometheus(self, path: str):
+        """Write the histograms as Prometheus summaries in text exposition format"""
+        out = []
+        with self._lock:
+            items = list(self.histograms.items())
+            for metric, help_text in METRICS.items():
+                name = f"vlm_request_{metric}"
+                out.append(f"# HELP {name} {help_text}")
+                out.append(f"# TYPE {name} summary")
+                for (provider, model), histograms in items:
+                    hist = histograms[metric]
+                    labels = f'provider="{_escape(provider)}",model="{_escape(model)}"'
+                    for q in QUANTILES:
+                        value = hist.percentile(q)
+                        if value is not None:
+                            out.append(f'{name}{{{labels},quantile="{q:g}"}} {value:.6g}')
+                    out.append(f"{name}_sum{{{labels}}} {hist.total:.6g}")
+                    out.append(f"{name}_count{{{labels}}} {hist.count}")
+            out.append("# HELP vlm_requests_total API attempts by status")
+            out.append("# TYPE vlm_requests_total counter")
+            for (provider, model), statuses in self.statuses.items():
+                for status, n in sorted(statuses.items()):
+                    out.append(f'vlm_requests_total{{provider="{_escape(provider)}",'
+                               f'model="{_escape(model)}",status="{_escape(status)}"}} {n}')
+            out.append("# HELP vlm_request_bytes_sent_total Bytes uploaded")
+            out.append("# TYPE vlm_request_bytes_sent_total counter")
+            for (provider, model), n in self.bytes_sent.items():
+                out.append(f'vlm_request_bytes_sent_total{{provider="{_escape(provider)}",'
+                           f'model="{_escape(model)}"}} {n}')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(out) + "\n")
+
+    def export(self, path_prefix: str) -> Dict[str, str]:
+        """
+        Write <path_prefix>.prom and <path_prefix>_histograms.jsonl
+
+        Returns:
+            Paths of the written files
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path_prefix)), exist_ok=True)
+        paths = {"prometheus": f"{path_prefix}.prom",
+                 "jsonl": f"{path_prefix}_histograms.jsonl"}
+        self.export_prometheus(paths["prometheus"])
+        self.export_jsonl(paths["jsonl"])
+        return paths
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def set_queue_wait(seconds: float):
+    """Charge time spent waiting for a concurrency slot to the next attempt in this context"""
+    _pending_queue_wait.set(seconds)
+
+
+def note_request_sent(num_bytes: int):
+    """Transport hook: the tracked attempt is being sent"""
+    record = _current.get()
+    if record is not None:
+        record["bytes_out"] += num_bytes
+        record.setdefault("sent_at", time.monotonic())
+
+
+def quota_from_headers(headers) -> Optional[float]:
+    """Remaining fraction of the tightest x-ratelimit-* budget in response headers, if reported"""
+    fractions = []
+    for kind in ("requests", "tokens"):
+        try:
+            remaining = float(headers.get(f"x-ratelimit-remaining-{kind}"))
+            limit = float(headers.get(f"x-ratelimit-limit-{kind}"))
+        except (TypeError, ValueError):
+            continue
+        if limit > 0:
+            fractions.append(max(0.0, min(1.0, remaining / limit)))
+    return min(fractions) if fractions else None
+
+
+def watch_quota() -> Dict:
+    """
+    Collect the rate-limit headroom of the next requests in this context
+
+    Returns:
+        Dict that gets a "quota" entry (remaining fraction) when a response reports one
+    """
+    report = {}
+    _quota_report.set(report)
+    return report
+
+
+def note_response_headers(status_code: int, headers=None):
+    """Transport hook: response headers of the tracked attempt arrived"""
+    record = _current.get()
+    if record is not None and "ttfb" not in record:
+        record["ttfb"] = time.monotonic() - record.get("sent_at", time.monotonic())
+        record["status"] = status_code
+    report = _quota_report.get()
+    if report is not None and headers is not None:
+        quota = quota_from_headers(headers)
+        if quota is not None:
+            report["quota"] = quota
+
+
+# Process-wide collector shared by all model clients
+_default_telemetry = Telemetry()
+
+
+def get_telemetry() -> Telemetry:
+    """Return the process-wide telemetry collector"""
+    return _default_telemetry
@@ -18,7 +18,8 @@ class TemporalTest1(TemporalTestBase):
                  seed: int = 42,
                  auto_timestamp: bool = True,
                  rate_limit_requests: int = 0,
-                 rate_limit_pause: int = 0):
+                 rate_limit_pause: int = 0,
+                 max_concurrency: int = 1):
         """
         Initialize Temporal Test 1
 
@@ -27,6 +28,7 @@ class TemporalTest1(TemporalTestBase):
             n_cases_per_type: Number of cases per test type
             seed: Random seed for reproducibility
             auto_timestamp: If True, append timestamp to output directory
+            max_concurrency: Number of model queries in flight (1 = sequential)
         """
         super().__init__(
             test_layer=1,
@@ -35,7 +37,8 @@ class TemporalTest1(TemporalTestBase):
             seed=seed,
             auto_timestamp=auto_timestamp,
             rate_limit_requests=rate_limit_requests,
-            rate_limit_pause=rate_limit_pause
+            rate_limit_pause=rate_limit_pause,
+            max_concurrency=max_concurrency
         )
 
     def generate_test_cases(self) -> List[Dict]:
@@ -64,6 +64,7 @@ class StandardTemporalLevel(TemporalLevelBase):
                  auto_timestamp: bool = True,
                  rate_limit_requests: int = 0,
                  rate_limit_pause: int = 0,
+                 max_concurrency: int = 1,
                  **generator_kwargs):
         """
         Initialize Standard Temporal Level
@@ -78,6 +79,7 @@ class StandardTemporalLevel(TemporalLevelBase):
             auto_timestamp: Append timestamp to output dir
             rate_limit_requests: Rate limiting config
             rate_limit_pause: Rate limiting pause seconds
+            max_concurrency: Number of model queries in flight (1 = sequential)
             **generator_kwargs: Extra arguments for generator
         """
         if base_output_dir is None:
@@ -90,7 +92,8 @@ class StandardTemporalLevel(TemporalLevelBase):
             seed=seed,
             auto_timestamp=auto_timestamp,
             rate_limit_requests=rate_limit_requests,
-            rate_limit_pause=rate_limit_pause
+            rate_limit_pause=rate_limit_pause,
+            max_concurrency=max_concurrency
         )
 
         # Use provided generator_class, otherwise select based on mode
@@ -137,7 +140,8 @@ def _create_level_class(level: int):
                      auto_timestamp: bool = True,
                      rate_limit_requests: int = 0,
                      rate_limit_pause: int = 0,
-                     mode: Mode = 'predictive'):
+                     mode: Mode = 'predictive',
+                     max_concurrency: int = 1):
             super().__init__(
                 level=level,
                 mode=mode,
@@ -146,7 +150,8 @@ def _create_level_class(level: int):
                 seed=seed,
                 auto_timestamp=auto_timestamp,
                 rate_limit_requests=rate_limit_requests,
-                rate_limit_pause=rate_limit_pause
+                rate_limit_pause=rate_limit_pause,
+                max_concurrency=max_concurrency
             )
 
     _TemporalLevelN.__name__ = f"TemporalLevel{level}"
@@ -11,12 +11,19 @@ from PIL import Image, ImageDraw, ImageFont
 from ..data_structures import TestResult, save_results, create_summary
 from ..board_generator import ChessBoardGenerator
 from .verification_generator import TemporalLevelVerificationGenerator
-import time
+from ..executor import QueryExecutor
+from ..rate_limiter import RateLimiter, api_key_fingerprint
+from ..generation import GenerationConfig
+from ..prompting import LayeredPrompt, prefix_order
 
 
 class TemporalLevelBase(ABC):
     """Abstract base class for temporal level tests"""
 
+    # Output budget for the two-line verification + main answer format;
+    # max_tokens is sized to the generated cases (see fit_generation_config)
+    GENERATION_CONFIG = GenerationConfig()
+
     def __init__(self,
                  level: int,
                  base_output_dir: str,
@@ -24,7 +31,8 @@ class TemporalLevelBase(ABC):
                  seed: int = 42,
                  auto_timestamp: bool = True,
                  rate_limit_requests: int = 0,
-                 rate_limit_pause: int = 0):
+                 rate_limit_pause: int = 0,
+                 max_concurrency: int = 1):
         """
         Initialize Temporal Level Base
 
@@ -34,12 +42,15 @@ class TemporalLevelBase(ABC):
             n_cases: Total number of test cases
             seed: Random seed for reproducibility
             auto_timestamp: If True, append timestamp to output directory
-            rate_limit_requests: Number of requests before pausing
-            rate_limit_pause: Seconds to pause
+            rate_limit_requests: Requests allowed per rate_limit_pause window (0 = no limit)
+            rate_limit_pause: Window length in seconds for rate_limit_requests
+            max_concurrency: Number of model queries in flight (1 = sequential)
         """
         self.level = level
         self.rate_limit_pause = rate_limit_pause
         self.rate_limit_requests = rate_limit_requests
+        self.max_concurrency = max_concurrency
+        self.generation_config = self.GENERATION_CONFIG
 
         if auto_timestamp:
             timestamp = datetime.now().strftime("%m%d_%H%M%S")
@@ -198,7 +209,20 @@ Please answer both questions. Format your response exactly as:
 Verification: [your answer]
 Main answer: [yes/no/unknown]"""
 
-        return prompt
+        # Static lead-in up to the first per-case text (cacheable prefix)
+        return LayeredPrompt.split(prompt, image_ref, verification_q, test_q)
+
+    def fit_generation_config(self) -> GenerationConfig:
+        """
+        Size the output budget to the longest expected answers of the test cases
+
+        Returns:
+            The generation config used for the queries
+        """
+        self.generation_config = self.generation_config.fit_answers(
+            [case.get('verification_expected') or '' for case in self.test_cases],
+            [case['expected'] for case in self.test_cases])
+        return self.generation_config
 
     def run_test(self, model_client, save_results_flag: bool = True) -> Tuple[List[TestResult], Dict]:
         """
@@ -211,6 +235,21 @@ Main answer: [yes/no/unknown]"""
         Returns:
             Tuple of (results_list, statistics_dict)
         """
+        # rate_limit_requests/rate_limit_pause map onto a token bucket shared
+        # by all in-flight queries of this run (unless the client already has
+        # a limiter), and by other processes using the same API key when
+        # VLM_RATE_LIMIT_DB is set; the client gets its previous limiter back
+        # when the run ends
+        run_limiter = None
+        if model_client.rate_limiter is None:
+            run_limiter = RateLimiter.from_pause_config(
+                self.rate_limit_requests, self.rate_limit_pause,
+                shared_key=api_key_fingerprint(getattr(model_client, "api_key", None)))
+        with model_client.attached_rate_limiter(run_limiter):
+            return self._run_test(model_client, save_results_flag)
+
+    def _run_test(self, model_client, save_results_flag: bool) -> Tuple[List[TestResult], Dict]:
+        """Body of run_test, with the run's rate limiter attached"""
         results = []
         stats = {
             'total': 0,
@@ -219,23 +258,49 @@ Main answer: [yes/no/unknown]"""
             'test_correct': 0,
             'test_incorrect': 0,
             'test_correct_given_verified': 0,
+            'errors': 0,
         }
+        model_client.reset_run_stats()
+        self.fit_generation_config()
+
+        # Cases sharing prompt instructions are sent back to back (provider
+        # prefix caching); results keep generation order
+        dispatch_order = prefix_order(self.test_cases, self.generate_combined_prompt)
 
         print(f"{'=' * 60}")
         print(f"Running Temporal Level {self.level}")
         print("(Each case includes verification question + test question)")
         print(f"{'=' * 60}\n")
 
-        for i, case in enumerate(self.test_cases, 1):
+        # Bulk clients (e.g. batch mode) receive all requests up front
+        model_client.prefetch(
+            [{"custom_id": case["case_id"],
+              "prompt": self.generate_combined_prompt(case),
+              "image_paths": case["image_paths"]}
+             for case in self.test_cases],
+            generation=self.generation_config)
+
+        executor = QueryExecutor(max_concurrency=self.max_concurrency,
+                                 controller=model_client.concurrency_controller)
+        outcomes = executor.map(
+            lambda case: model_client.query(
+                self.generate_combined_prompt(case), case["image_paths"],
+                generation=self.generation_config),
+            self.test_cases,
+            metrics_fn=model_client.pop_request_metrics,
+            order=dispatch_order)
+
+        for i, (case, outcome) in enumerate(zip(self.test_cases, outcomes), 1):
             print(f"[{i}/{len(self.test_cases)}] Testing {case['case_id']}...")
 
             stats['total'] += 1
-
-            prompt = self.generate_combined_prompt(case)
+            error = False
 
             try:
-                # Query model with combined prompt and ALL images
-                response = model_client.query(prompt, case["image_paths"])
+                # Queries are dispatched by the executor; outcomes arrive in case order
+                if outcome.error is not None:
+                    raise outcome.error
+                response = outcome.response
 
                 # Parse response
                 verification_response, test_response = self._parse_combined_response(
@@ -275,13 +340,6 @@ Main answer: [yes/no/unknown]"""
                         f"    Expected: {case.get('verification_expected', 'N/A')}")
                     print(f"    Got: {verification_response[:50]}...")
 
-                # Rate limiting
-                if self.rate_limit_requests > 0 and i % self.rate_limit_requests == 0 and i < len(self.test_cases):
-                    print(
-                        f"\n  ⏸️  Rate limit: Processed {i} requests, pausing for {self.rate_limit_pause} seconds...")
-                    time.sleep(self.rate_limit_pause)
-                    print(f"  ▶️  Resuming...\n")
-
             except Exception as e:
                 print(f"  ✗ Error: {e}")
                 verification_response = "error"
@@ -289,7 +347,10 @@ Main answer: [yes/no/unknown]"""
                 verification_passed = False
                 model_answer = "error"
                 correct = False
-                stats['verification_failed'] += 1
+                # Failed requests (retries exhausted) are not recognition
+                # failures; they are left out of the rates
+                error = True
+                stats['errors'] += 1
 
             # Record result
             result = TestResult(
@@ -304,11 +365,18 @@ Main answer: [yes/no/unknown]"""
                 expected_answer=case["expected"],
                 model_response=test_response,
                 correct=correct,
+                error=error,
                 image_paths=case["image_paths"],
-                model_name=model_client.model_name
+                model_name=model_client.model_name,
+                request_metrics=outcome.metrics
             )
             results.append(result)
 
+        # Client-side counters (cache hits, etc.) for this run
+        stats['client_stats'] = model_client.get_run_stats()
+        if model_client.concurrency_controller is not None:
+            stats['concurrency'] = model_client.concurrency_controller.stats()
+
         # Print results
         self._print_results_summary(results, stats)
 
@@ -332,9 +400,11 @@ Main answer: [yes/no/unknown]"""
         for line in lines:
             line_lower = line.lower().strip()
 
-            if line_lower.startswith('verification:'):
+            # The first answer line counts, as when a stream stops early
+            if line_lower.startswith('verification:') and not verification_response:
                 verification_response = line.split(':', 1)[1].strip()
-            elif line_lower.startswith('main answer:') or line_lower.startswith('main:'):
+            elif (line_lower.startswith('main answer:') or line_lower.startswith('main:')) \
+                    and not test_response:
                 test_response = line.split(':', 1)[1].strip()
 
         # If parsing failed, try to extract from full response
@@ -369,14 +439,17 @@ Main answer: [yes/no/unknown]"""
         print(f"RESULTS SUMMARY - Level {self.level}")
         print(f"{'=' * 60}")
 
-        # Verification statistics
+        # Verification statistics (cases whose request failed are excluded)
+        answered = stats['total'] - stats.get('errors', 0)
         verification_rate = stats['verification_passed'] / \
-            stats['total'] if stats['total'] > 0 else 0
+            answered if answered > 0 else 0
         print(f"\nBoard Recognition:")
         print(
-            f"  Verified correctly: {stats['verification_passed']}/{stats['total']} ({verification_rate:.1%})")
+            f"  Verified correctly: {stats['verification_passed']}/{answered} ({verification_rate:.1%})")
         print(
-            f"  Failed to recognize: {stats['verification_failed']}/{stats['total']} ({1-verification_rate:.1%})")
+            f"  Failed to recognize: {stats['verification_failed']}/{answered} ({1-verification_rate:.1%})")
+        if stats.get('errors'):
+            print(f"  Request errors (excluded): {stats['errors']}/{stats['total']}")
 
         # Test accuracy (only among verified cases)
         if stats['verification_passed'] > 0:
@@ -390,10 +463,10 @@ Main answer: [yes/no/unknown]"""
 
         # Overall accuracy (including verification failures)
         overall_accuracy = stats['test_correct'] / \
-            stats['total'] if stats['total'] > 0 else 0
-        print(f"\nOverall Accuracy (all cases):")
+            answered if answered > 0 else 0
+        print(f"\nOverall Accuracy (all answered cases):")
         print(
-            f"  Correct: {stats['test_correct']}/{stats['total']} ({overall_accuracy:.1%})")
+            f"  Correct: {stats['test_correct']}/{answered} ({overall_accuracy:.1%})")
 
         # Breakdown by type (only verified cases)
         self._print_type_breakdown(results)
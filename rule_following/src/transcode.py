@@ -0,0 +1,127 @@
+"""
+Client-side image transcoding
+Re-encodes board images before upload (palette PNG, lossless WebP or
+quality-bounded JPEG) to shrink request payloads; the smaller of the
+original and the transcoded image is sent
+"""
+
+import io
+import math
+from dataclasses import dataclass, replace
+from typing import Optional, Tuple
+
+from PIL import Image, ImageChops, ImageStat, features
+
+FORMATS = ("png8", "webp", "jpeg")
+MEDIA_TYPES = {"png8": "image/png", "webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+@dataclass(frozen=True)
+class TranscodeConfig:
+    """
+    How to re-encode images before upload
+
+    png8 quantizes to a palette (lossless when the image has at most
+    `colors` colors); webp is lossless; jpeg uses the lowest quality in
+    jpeg_qualities whose PSNR against the original reaches min_psnr. Lossy
+    results below min_psnr are discarded in favour of the original.
+    """
+    format: str = "png8"
+    colors: int = 256
+    min_psnr: float = 40.0
+    jpeg_qualities: Tuple[int, ...] = (60, 70, 80, 90, 95)
+
+    def __post_init__(self):
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown transcode format {self.format!r}, expected one of {FORMATS}")
+
+
+# Defaults per test suite (used by --transcode auto). The rule-following
+# boards are flat renders with a few hundred anti-aliasing shades, which a
+# 256-color palette reproduces at >70 dB PSNR; PNG is accepted by every provider.
+SUITE_DEFAULTS = {
+    "temporal_levels": TranscodeConfig("png8"),
+    "temporal": TranscodeConfig("png8"),
+    "spatial": TranscodeConfig("png8"),
+    "condition": TranscodeConfig("png8"),
+}
+
+
+def resolve_transcode(choice: Optional[str], suite: str,
+                      min_psnr: float = 40.0) -> Optional[TranscodeConfig]:
+    """
+    Turn a --transcode choice into a config
+
+    Args:
+        choice: "off"/None, "auto" (suite default) or a format name
+        suite: Key in SUITE_DEFAULTS
+        min_psnr: Quality floor for lossy formats
+
+    Returns:
+        TranscodeConfig, or None to send images unchanged
+    """
+    if choice in (None, "off"):
+        return None
+    if choice == "auto":
+        default = SUITE_DEFAULTS.get(suite)
+        return replace(default, min_psnr=min_psnr) if default else None
+    return TranscodeConfig(choice, min_psnr=min_psnr)
+
+
+def psnr(original: Image.Image, candidate: Image.Image) -> float:
+    """Peak signal-to-noise ratio in dB (inf for identical images)"""
+    diff = ImageChops.difference(original.convert("RGB"), candidate.convert("RGB"))
+    mse = sum(rms ** 2 for rms in ImageStat.Stat(diff).rms) / 3
+    return math.inf if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def _encode(image: Image.Image, fmt: str, quality: int = 95, colors: int = 256) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "png8":
+        method = Image.Quantize.FASTOCTREE if image.mode == "RGBA" else Image.Quantize.MEDIANCUT
+        image.quantize(colors=colors, method=method).save(buffer, "PNG", optimize=True)
+    elif fmt == "webp":
+        image.save(buffer, "WEBP", lossless=True, quality=100, method=6)
+    else:
+        image.convert("RGB").save(buffer, "JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def transcode_image(raw: bytes, config: TranscodeConfig,
+                    original_media_type: str = "image/png") -> Tuple[bytes, str]:
+    """
+    Re-encode an image, keeping the original when that is smaller or better
+
+    Args:
+        raw: Original file bytes
+        config: Target format and quality bounds
+        original_media_type: Media type of raw
+
+    Returns:
+        (payload bytes, media type)
+    """
+    if config.format == "webp" and not features.check("webp"):
+        return raw, original_media_type
+
+    with Image.open(io.BytesIO(raw)) as opened:
+        image = opened.convert("RGBA" if "A" in opened.getbands() else "RGB")
+
+    if config.format == "webp":
+        candidates = [_encode(image, "webp")]
+    elif config.format == "png8":
+        candidates = [_encode(image, "png8", colors=config.colors)]
+    elif image.mode == "RGBA":
+        return raw, original_media_type  # JPEG has no alpha channel
+    else:
+        # Lowest quality first: the first one meeting min_psnr is the smallest
+        candidates = (_encode(image, "jpeg", quality) for quality in sorted(config.jpeg_qualities))
+
+    for payload in candidates:
+        if len(payload) >= len(raw):
+            continue
+        if config.format != "webp":
+            with Image.open(io.BytesIO(payload)) as decoded:
+                if psnr(image, decoded) < config.min_psnr:
+                    continue
+        return payload, MEDIA_TYPES[config.format]
+    return raw, original_media_type
@@ -0,0 +1,206 @@
+"""
+Shared HTTP transport for model API clients
+Keeps one keep-alive connection pool per base_url, so every client talking
+to the same endpoint reuses warm TCP/TLS connections instead of opening
+its own, and exposes pool statistics for diagnosis
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from .telemetry import note_request_sent, note_response_headers
+
+
+@dataclass(frozen=True)
+class TransportConfig:
+    """Connection pool and timeout settings for one endpoint"""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 60.0
+    connect_timeout: float = 10.0
+    read_timeout: float = 300.0
+    write_timeout: float = 60.0
+    pool_timeout: float = 60.0
+    http2: bool = False
+
+
+def pool_key(base_url: str) -> str:
+    """Normalize a base URL to scheme://host:port, the unit of connection reuse"""
+    parts = urlsplit(base_url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return f"{parts.scheme}://{parts.hostname}:{port}"
+
+
+class _PoolCounters:
+    """Request and connection counters fed by httpx event hooks and traces
+    (the hooks also feed the request telemetry)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.responses = 0
+        self.status_codes: Dict[int, int] = {}
+        self.tcp_connects = 0
+        self.tls_handshakes = 0
+
+    def on_request(self, request: httpx.Request):
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self._trace
+        note_request_sent(int(request.headers.get("content-length", 0)))
+
+    def on_response(self, response: httpx.Response):
+        note_response_headers(response.status_code, response.headers)
+        with self._lock:
+            self.responses += 1
+            self.status_codes[response.status_code] = \
+                self.status_codes.get(response.status_code, 0) + 1
+
+    def _trace(self, event_name: str, info: Dict):
+        # httpcore reports every new connection and TLS handshake here
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.tcp_connects += 1
+        elif event_name == "connection.start_tls.complete":
+            with self._lock:
+                self.tls_handshakes += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "responses": self.responses,
+                "status_codes": dict(self.status_codes),
+                "tcp_connects": self.tcp_connects,
+                "tls_handshakes": self.tls_handshakes,
+            }
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class TransportPool:
+    """
+    Registry of pooled httpx clients, one per endpoint
+
+    Clients are created on first use with the config given then (or the
+    default config) and shared by every model client for that endpoint.
+    """
+
+    def __init__(self, default_config: Optional[TransportConfig] = None):
+        """
+        Initialize pool registry
+
+        Args:
+            default_config: Settings for endpoints without an explicit config
+        """
+        self.default_config = default_config or TransportConfig()
+        self._configs: Dict[str, TransportConfig] = {}
+        self._clients: Dict[str, httpx.Client] = {}
+        self._counters: Dict[str, _PoolCounters] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, base_url: str, config: TransportConfig):
+        """
+        Set the config for an endpoint (applies to clients created afterwards)
+
+        Args:
+            base_url: API base URL
+            config: Pool and timeout settings
+        """
+        with self._lock:
+            self._configs[pool_key(base_url)] = config
+
+    def get_client(self, base_url: str) -> httpx.Client:
+        """
+        Return the shared httpx client for an endpoint, creating it on first use
+
+        Args:
+            base_url: API base URL
+
+        Returns:
+            httpx.Client with a keep-alive connection pool
+        """
+        key = pool_key(base_url)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                return client
+
+            config = self._configs.get(key, self.default_config)
+            http2 = config.http2
+            if http2 and not _http2_available():
+                print("⚠️  HTTP/2 requested but the 'h2' package is not installed "
+                      "(pip install 'httpx[http2]'); using HTTP/1.1")
+                http2 = False
+
+            counters = _PoolCounters()
+            client = httpx.Client(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=config.max_connections,
+                    max_keepalive_connections=config.max_keepalive_connections,
+                    keepalive_expiry=config.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(
+                    connect=config.connect_timeout,
+                    read=config.read_timeout,
+                    write=config.write_timeout,
+                    pool=config.pool_timeout,
+                ),
+                event_hooks={
+                    "request": [counters.on_request],
+                    "response": [counters.on_response],
+                },
+            )
+            self._clients[key] = client
+            self._counters[key] = counters
+            return client
+
+    def stats(self) -> Dict[str, Dict]:
+        """Return per-endpoint request, status and connection counters"""
+        with self._lock:
+            items = list(self._counters.items())
+            configs = {key: self._configs.get(key, self.default_config) for key, _ in items}
+
+        stats = {}
+        for key, counters in items:
+            entry = counters.snapshot()
+            entry["http2"] = configs[key].http2
+            entry["max_connections"] = configs[key].max_connections
+            # Connection reuse: requests served without opening a new connection
+            if entry["requests"]:
+                entry["reuse_rate"] = round(
+                    1 - entry["tcp_connects"] / entry["requests"], 3)
+            stats[key] = entry
+        return stats
+
+    def close(self):
+        """Close every pooled client"""
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+
+# Process-wide pool shared by all model clients
+_default_pool = TransportPool()
+
+
+def get_transport_pool() -> TransportPool:
+    """Return the process-wide transport pool"""
+    return _default_pool
+
+
+def get_http_client(base_url: str) -> httpx.Client:
+    """Return the shared httpx client for base_url from the process-wide pool"""
+    return _default_pool.get_client(base_url)
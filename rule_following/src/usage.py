@@ -0,0 +1,234 @@
+"""
+Token usage and cost accounting
+Normalizes the usage block of chat completion responses, prices it with
+MODEL_PRICES and aggregates it per case, per case type and per run
+"""
+
+import json
+from typing import Dict, List, Optional
+
+# Token counters kept for every response
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "reasoning_tokens", "cached_tokens")
+
+# USD per million tokens, keyed by API model name. Reasoning tokens are part
+# of completion_tokens and cached tokens part of prompt_tokens, as reported
+# by OpenAI-compatible APIs. Check the providers' pricing pages before
+# relying on the totals; override or extend with --prices FILE.json.
+MODEL_PRICES = {
+    # Qwen3-VL (DashScope international, Novita, SiliconFlow)
+    "qwen3-vl-plus": {"input": 0.20, "output": 1.60, "cached_input": 0.04},
+    "qwen3-vl-235b-a22b-instruct": {"input": 0.30, "output": 1.50},
+    "qwen3-vl-235b-a22b-thinking": {"input": 0.30, "output": 3.00},
+    "qwen3-vl-30b-a3b-instruct": {"input": 0.20, "output": 0.70},
+    "qwen3-vl-8b-instruct": {"input": 0.08, "output": 0.50},
+    # Google
+    "gemini-2.5-pro": {"input": 1.25, "output": 10.00, "cached_input": 0.31},
+    "gemini-2.5-flash": {"input": 0.30, "output": 2.50, "cached_input": 0.075},
+    "gemini-2.5-flash-lite": {"input": 0.10, "output": 0.40, "cached_input": 0.025},
+    "gemma-3-27b-it": {"input": 0.0, "output": 0.0},
+    # xAI
+    "grok-4": {"input": 3.00, "output": 15.00, "cached_input": 0.75},
+    "grok-4-fast": {"input": 0.20, "output": 0.50, "cached_input": 0.05},
+}
+
+# Price multiplier for provider batch jobs
+BATCH_PRICE_FACTOR = 0.5
+
+
+def load_prices(path: str):
+    """
+    Merge a JSON price table ({model_name: {"input": .., "output": .., "cached_input": ..}})
+    into MODEL_PRICES
+
+    Args:
+        path: JSON file with USD per million tokens
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        MODEL_PRICES.update(json.load(f))
+
+
+def get_prices(model_name: str) -> Optional[Dict[str, float]]:
+    """Price entry for a model ("qwen/qwen3-vl-plus" also matches "qwen3-vl-plus")"""
+    if not model_name:
+        return None
+    for name in (model_name, model_name.lower(), model_name.rsplit("/", 1)[-1].lower()):
+        if name in MODEL_PRICES:
+            return MODEL_PRICES[name]
+    return None
+
+
+def _get(obj, key: str):
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(key)
+    return getattr(obj, key, None)
+
+
+def extract_usage(usage) -> Optional[Dict[str, int]]:
+    """
+    Normalize a response usage block (SDK object or dict)
+
+    Args:
+        usage: The "usage" of a chat completion, or an already normalized dict
+
+    Returns:
+        Dict with USAGE_FIELDS, or None when the response reported no usage
+    """
+    if usage is None:
+        return None
+    prompt_details = _get(usage, "prompt_tokens_details")
+    completion_details = _get(usage, "completion_tokens_details")
+    counts = {
+        "prompt_tokens": _get(usage, "prompt_tokens"),
+        "completion_tokens": _get(usage, "completion_tokens"),
+        "reasoning_tokens": _get(completion_details, "reasoning_tokens")
+        or _get(usage, "reasoning_tokens"),
+        "cached_tokens": _get(prompt_details, "cached_tokens")
+        or _get(usage, "cached_tokens"),
+    }
+    if counts["prompt_tokens"] is None and counts["completion_tokens"] is None:
+        return None
+    return {key: int(value or 0) for key, value in counts.items()}
+
+
+def estimate_cost(usage: Dict[str, int], model_name: str,
+                  price_factor: float = 1.0) -> Optional[float]:
+    """
+    Price one response's usage
+
+    Args:
+        usage: Normalized usage (see extract_usage)
+        model_name: API model name looked up in MODEL_PRICES
+        price_factor: Multiplier, e.g. BATCH_PRICE_FACTOR
+
+    Returns:
+        Cost in USD, or None when the model has no price entry
+    """
+    prices = get_prices(model_name)
+    if prices is None:
+        return None
+    cached = usage.get("cached_tokens", 0)
+    uncached = max(0, usage.get("prompt_tokens", 0) - cached)
+    cost = (uncached * prices.get("input", 0)
+            + cached * prices.get("cached_input", prices.get("input", 0))
+            + usage.get("completion_tokens", 0) * prices.get("output", 0)) / 1e6
+    return cost * price_factor
+
+
+def add_usage(total: Dict[str, float], usage: Dict[str, float]):
+    """Add token counters, request counts and cost of usage to total (in place)"""
+    for key, value in usage.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            total[key] = total.get(key, 0) + value
+
+
+def _finish(total: Dict[str, float]) -> Dict[str, float]:
+    if "cost_usd" in total:
+        total["cost_usd"] = round(total["cost_usd"], 6)
+    return total
+
+
+def summarize_usage(results: List, test_cases: Optional[List[Dict]] = None) -> Dict:
+    """
+    Aggregate per-case usage (TestResult.request_metrics["usage"])
+
+    Args:
+        results: TestResult objects of one run
+        test_cases: Test case dicts, for the per type/subtype breakdown
+
+    Returns:
+        Dict with "total", "mean_per_case" and "by_type" usage
+    """
+    case_types = {}
+    for case in test_cases or []:
+        subtype = case.get('subtype', '')
+        case_type = case.get('type', 'unknown')
+        case_types[case.get('case_id')] = f"{case_type}_{subtype}" if subtype else case_type
+
+    total = {}
+    by_type = {}
+    cases_with_usage = 0
+    for result in results:
+        usage = (result.request_metrics or {}).get("usage")
+        if not usage:
+            continue
+        cases_with_usage += 1
+        add_usage(total, usage)
+        if test_cases:
+            group = by_type.setdefault(case_types.get(result.case_id, "unknown"), {"cases": 0})
+            group["cases"] += 1
+            add_usage(group, usage)
+
+    summary = {"cases_with_usage": cases_with_usage, "total": _finish(total)}
+    if cases_with_usage:
+        summary["mean_per_case"] = {key: round(value / cases_with_usage, 6 if key == "cost_usd" else 1)
+                                    for key, value in total.items()}
+    if by_type:
+        summary["by_type"] = {key: _finish(group) for key, group in sorted(by_type.items())}
+    prompt_cache = summarize_prompt_cache(results)
+    if prompt_cache:
+        summary["prompt_cache"] = prompt_cache
+    return summary
+
+
+def summarize_prompt_cache(results: List) -> Optional[Dict]:
+    """
+    Provider prompt-cache effect of a run, from per-case request metrics
+
+    Args:
+        results: TestResult objects of one run
+
+    Returns:
+        Share of prompt tokens served from the provider's cache and mean
+        latency of requests with and without cached tokens, or None when
+        no usage was reported
+    """
+    prompt_tokens = cached_tokens = 0
+    latencies = {"hit": [], "miss": []}
+    for result in results:
+        metrics = result.request_metrics or {}
+        usage = metrics.get("usage")
+        if not usage:
+            continue
+        prompt_tokens += usage.get("prompt_tokens", 0)
+        cached_tokens += usage.get("cached_tokens", 0)
+        if metrics.get("latency") is not None:
+            latencies["hit" if usage.get("cached_tokens") else "miss"].append(metrics["latency"])
+    if not prompt_tokens:
+        return None
+
+    summary = {
+        "cached_token_share": round(cached_tokens / prompt_tokens, 3),
+        "requests_with_cached_tokens": len(latencies["hit"]),
+        "requests_without_cached_tokens": len(latencies["miss"]),
+    }
+    for outcome, values in latencies.items():
+        if values:
+            summary[f"mean_latency_{outcome}"] = round(sum(values) / len(values), 3)
+    return summary
+
+
+def format_prompt_cache(summary: Dict) -> str:
+    """Format a prompt-cache summary as '42.0% of prompt tokens cached, latency 0.81s hit / 1.20s miss'"""
+    text = f"{summary['cached_token_share']:.1%} of prompt tokens cached"
+    if "mean_latency_hit" in summary and "mean_latency_miss" in summary:
+        text += f", latency {summary['mean_latency_hit']:.2f}s hit / {summary['mean_latency_miss']:.2f}s miss"
+    return text
+
+
+def format_usage(usage: Dict[str, float]) -> str:
+    """
+    Format usage counters as '12,345 prompt (2,000 cached), 678 completion (0 reasoning), $0.0123'
+
+    Usage made up by an offline simulator is marked '(simulated)'.
+    """
+    text = (f"{int(usage.get('prompt_tokens', 0)):,} prompt "
+            f"({int(usage.get('cached_tokens', 0)):,} cached), "
+            f"{int(usage.get('completion_tokens', 0)):,} completion "
+            f"({int(usage.get('reasoning_tokens', 0)):,} reasoning)")
+    if "cost_usd" in usage:
+        text += f", ${usage['cost_usd']:.4f}"
+    if usage.get("simulated"):
+        text += " (simulated)"
+    return text
@@ -0,0 +1,19 @@
+"""
+Shared fixtures for the offline test suite (no network, no API keys)
+"""
+
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def board_image(tmp_path):
+    """A small PNG standing in for a rendered board"""
+    path = tmp_path / "board.png"
+    Image.new("RGB", (64, 64), "white").save(path)
+    return str(path)
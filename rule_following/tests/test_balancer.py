@@ -0,0 +1,56 @@
+"""
+Tests for load-balanced fan-out across endpoints
+"""
+
+import sqlite3
+
+import pytest
+
+from src.balancer import LoadBalancedModelClient
+from src.model_client import DummyModelClient, RetryPolicy
+from src.rate_limiter import RateLimiter, SharedBucketStore
+
+
+def endpoint(**kwargs):
+    client = DummyModelClient(seed=0, **kwargs)
+    client.retry_policy = RetryPolicy(max_attempts=1)
+    return client
+
+
+def test_queries_are_spread_over_endpoints(board_image):
+    balancer = LoadBalancedModelClient([endpoint(), endpoint()], names=["a", "b"])
+    for _ in range(10):
+        balancer.query("prompt", board_image)
+
+    stats = balancer.get_run_stats()["balancer"]
+    assert stats["a_requests"] + stats["b_requests"] == 10
+    assert stats["a_requests"] >= 3 and stats["b_requests"] >= 3
+
+
+def test_rate_limited_endpoint_is_rerouted_and_cooled_down(board_image):
+    balancer = LoadBalancedModelClient([endpoint(rate_429=1.0), endpoint()],
+                                       names=["limited", "ok"], cooldown=60.0)
+    for _ in range(4):
+        assert balancer.query("prompt", board_image)
+
+    stats = balancer.get_run_stats()["balancer"]
+    assert stats["limited_rate_limited"] == 1
+    assert stats["reroutes"] == 1
+    assert stats["ok_requests"] == 4
+    assert balancer.endpoint_stats()["limited"]["cooling_down"]
+
+
+def test_headroom_reads_the_shared_store_without_writing(tmp_path):
+    path = str(tmp_path / "rate_limits.sqlite")
+    limiter = RateLimiter(requests_per_minute=60, burst=4, shared_key="key-a",
+                          store=SharedBucketStore(path))
+    limiter.try_acquire()
+    limiter.try_acquire()
+
+    def rows():
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT * FROM buckets").fetchall()
+
+    before = rows()
+    assert limiter.headroom() == pytest.approx(0.5, abs=0.05)
+    assert rows() == before
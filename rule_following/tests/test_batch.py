@@ -0,0 +1,93 @@
+"""
+Tests for mapping batch results back to requests, offline
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.batch import BatchModelClient
+from src.model_client import DummyModelClient, ModelQueryError
+
+BATCH = SimpleNamespace(id="batch-1", status="completed",
+                        output_file_id="file-out", error_file_id="file-err")
+
+
+def record(custom_id, body=None, status_code=200, error=None):
+    return json.dumps({"custom_id": custom_id, "error": error,
+                       "response": {"status_code": status_code, "body": body}})
+
+
+def answer(text):
+    return {"choices": [{"message": {"content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5}}
+
+
+class OnlineClient(DummyModelClient):
+    """Stands in for the online client: serves batch files and counts online queries"""
+
+    def __init__(self, files):
+        super().__init__()
+        self.extra_params = {}
+        self.online_prompts = []
+        self.client = SimpleNamespace(files=SimpleNamespace(
+            content=lambda file_id: SimpleNamespace(text=files.get(file_id, ""))))
+
+    def query(self, prompt, image_path, generation=None):
+        self.online_prompts.append(prompt)
+        return "online answer"
+
+
+def batch_client(tmp_path, output_lines, error_lines=()):
+    online = OnlineClient({"file-out": "\n".join(output_lines),
+                           "file-err": "\n".join(error_lines)})
+    return BatchModelClient(online, work_dir=str(tmp_path)), online
+
+
+def test_download_results_maps_answers_and_errors(tmp_path):
+    client, _ = batch_client(tmp_path, [
+        record("ok", answer("Verification: yes")),
+        record("empty", {"choices": []}),
+        record("no-body"),
+        record("no-message", {"choices": [{"finish_reason": "stop"}]}),
+        record("server", {"error": {"message": "overloaded"}}, status_code=500),
+    ], [record("expired", error={"message": "batch expired"})])
+
+    results = client.download_results(BATCH)
+
+    assert results["ok"] == ("Verification: yes", {"prompt_tokens": 10, "completion_tokens": 5})
+    for custom_id in ("empty", "no-body", "no-message"):
+        assert isinstance(results[custom_id], ModelQueryError)
+        assert results[custom_id].retryable
+    for custom_id in ("server", "expired"):
+        assert isinstance(results[custom_id], ModelQueryError)
+        assert not results[custom_id].retryable
+
+
+def test_prefetch_serves_results_by_request_and_falls_back_online(tmp_path, board_image):
+    client, online = batch_client(tmp_path, [
+        record("case-1", answer("first")),
+        record("case-1#1", answer("duplicate")),
+        record("case-2", {"choices": []}),
+        record("case-3", {"error": {"message": "bad request"}}, status_code=400),
+    ])
+    client.write_batch_file = lambda requests, generation=None: str(tmp_path / "in.jsonl")
+    client.submit = lambda path: BATCH
+    client.wait = lambda batch_id: BATCH
+    requests = [{"custom_id": custom_id, "prompt": prompt, "image_paths": [board_image]}
+                for custom_id, prompt in (("case-1", "p1"), ("case-1", "p1b"),
+                                          ("case-2", "p2"), ("case-3", "p3"),
+                                          ("case-4", "p4"))]
+
+    client.prefetch(requests)
+
+    assert client.query("p1", [board_image]) == "first"
+    # A repeated custom_id is renamed in the batch and still mapped back
+    assert client.query("p1b", [board_image]) == "duplicate"
+    # Malformed entries and requests missing from the batch go online
+    assert client.query("p2", [board_image]) == "online answer"
+    assert client.query("p4", [board_image]) == "online answer"
+    assert online.online_prompts == ["p2", "p4"]
+    with pytest.raises(ModelQueryError, match="bad request"):
+        client.query("p3", [board_image])
@@ -0,0 +1,95 @@
+"""
+Tests for single-flight coalescing, on its own and through the mock server
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.coalescing import SingleFlight
+from src.mock_server import MockOpenAIServer
+from src.model_client import OpenAICompatibleModelClient
+from src.simulation import LatencyModel
+
+
+def run_together(n, fn):
+    """Call fn from n threads released at the same moment"""
+    barrier = threading.Barrier(n)
+
+    def call(_):
+        barrier.wait()
+        return fn()
+
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        return list(pool.map(call, range(n)))
+
+
+def test_concurrent_duplicates_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        time.sleep(0.1)
+        return "answer"
+
+    results = run_together(6, lambda: flight.do("key", upstream))
+    assert len(calls) == 1
+    assert [r for r, _ in results] == ["answer"] * 6
+    assert sorted(shared for _, shared in results) == [False] + [True] * 5
+    assert flight.stats() == {"upstream_calls": 1, "coalesced": 5, "coalesced_rate": 0.833}
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+
+    def upstream():
+        time.sleep(0.1)
+        raise RuntimeError("upstream failed")
+
+    def call():
+        try:
+            flight.do("key", upstream)
+        except RuntimeError as e:
+            return str(e)
+
+    assert run_together(4, call) == ["upstream failed"] * 4
+
+
+def test_calls_that_do_not_overlap_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: "a") == ("a", False)
+    assert flight.do("key", lambda: "b") == ("b", False)
+    assert flight.stats()["coalesced"] == 0
+
+
+def test_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+    keys = iter(range(4))
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            key = str(next(keys))
+        return flight.do(key, lambda: time.sleep(0.05) or key)
+
+    results = run_together(4, call)
+    assert all(not shared for _, shared in results)
+    assert flight.stats()["upstream_calls"] == 4
+
+
+@pytest.mark.parametrize("coalesce, upstream_requests", [(True, 1), (False, 8)])
+def test_client_coalesces_only_when_enabled(board_image, coalesce, upstream_requests):
+    with MockOpenAIServer(latency=LatencyModel(mean=0.2)) as server:
+        client = OpenAICompatibleModelClient(
+            api_key="mock", base_url=server.base_url, model_name="mock-model",
+            coalesce=coalesce)
+        responses = run_together(
+            8, lambda: client.query("Verification: ?\nMain answer: ?", board_image))
+        assert server.stats()["requests"] == upstream_requests
+
+    assert len(set(responses)) == 1
+    duplicates = client.get_run_stats().get("coalesce", {}).get("duplicates", 0)
+    assert duplicates == 8 - upstream_requests
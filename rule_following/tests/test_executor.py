@@ -0,0 +1,93 @@
+"""
+Tests for QueryExecutor result ordering
+"""
+
+import random
+import threading
+import time
+
+from src.executor import QueryExecutor, restore_order
+from src.model_client import DummyModelClient
+from src.temporal_levels import TemporalLevel2
+
+
+def slow_echo(case):
+    time.sleep(case["delay"])
+    return case["id"]
+
+
+def make_cases(n, seed=0):
+    rng = random.Random(seed)
+    return [{"id": f"case_{i}", "delay": rng.uniform(0, 0.02)} for i in range(n)]
+
+
+def test_sequential_outcomes_follow_case_order():
+    cases = make_cases(5)
+    outcomes = list(QueryExecutor(max_concurrency=1).map(slow_echo, cases))
+    assert [o.response for o in outcomes] == [c["id"] for c in cases]
+
+
+def test_concurrent_outcomes_follow_case_order():
+    # Random delays make later cases finish first
+    cases = make_cases(40)
+    outcomes = list(QueryExecutor(max_concurrency=8).map(slow_echo, cases))
+    assert [o.response for o in outcomes] == [c["id"] for c in cases]
+
+
+def test_errors_are_captured_per_case():
+    def query(case):
+        if case["id"] == "case_2":
+            raise RuntimeError("boom")
+        return case["id"]
+
+    outcomes = list(QueryExecutor(max_concurrency=4).map(query, make_cases(5)))
+    assert [o.error is not None for o in outcomes] == [False, False, True, False, False]
+    assert str(outcomes[2].error) == "boom"
+
+
+def test_dispatch_order_is_followed_but_outcomes_keep_case_order():
+    cases = make_cases(6)
+    sent = []
+    lock = threading.Lock()
+
+    def query(case):
+        with lock:
+            sent.append(case["id"])
+        return case["id"]
+
+    order = [3, 0, 5, 1, 4, 2]
+    outcomes = list(QueryExecutor(max_concurrency=1).map(query, cases, order=order))
+    assert sent == [cases[i]["id"] for i in order]
+    assert [o.response for o in outcomes] == [c["id"] for c in cases]
+
+
+def test_metrics_are_collected_in_the_worker_thread():
+    local = threading.local()
+
+    def query(case):
+        local.name = case["id"]
+        return case["id"]
+
+    outcomes = list(QueryExecutor(max_concurrency=4).map(
+        query, make_cases(8), metrics_fn=lambda: {"case": local.name}))
+    assert [o.metrics["case"] for o in outcomes] == [o.response for o in outcomes]
+
+
+def test_restore_order():
+    order = [2, 0, 3, 1]
+    outcomes = ["c", "a", "d", "b"]
+    assert list(restore_order(order, outcomes)) == ["a", "b", "c", "d"]
+
+
+def test_run_test_records_results_in_generation_order(tmp_path):
+    test = TemporalLevel2(base_output_dir=str(tmp_path / "level_2"), n_cases=12,
+                          auto_timestamp=False, max_concurrency=4)
+    test.generate_test_cases()
+    test.create_test_images()
+    client = DummyModelClient(seed=1)
+    client.set_test_cases(test.test_cases)
+
+    results, stats = test.run_test(client, save_results_flag=False)
+    assert [r.case_id for r in results] == [c["case_id"] for c in test.test_cases]
+    assert stats["total"] == len(test.test_cases)
+    assert stats["errors"] == 0
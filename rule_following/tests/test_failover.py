@@ -0,0 +1,148 @@
+"""
+Tests for the circuit breaker and provider failover
+"""
+
+import pytest
+
+from src.failover import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, FailoverModelClient
+from src.model_client import DummyModelClient, ModelClient, ModelQueryError, RetryPolicy
+
+
+class Clock:
+    """Stands in for time.monotonic"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("src.failover.time.monotonic", clock)
+    return clock
+
+
+def breaker(**kwargs):
+    options = dict(error_threshold=0.5, window=4, min_requests=4, cooldown=30.0)
+    options.update(kwargs)
+    return CircuitBreaker("provider", **options)
+
+
+def test_breaker_opens_at_the_error_threshold(clock):
+    b = breaker()
+    assert not b.record(False, 0.1)
+    assert not b.record(True, 0.1)
+    assert not b.record(True, 0.1)
+    assert b.state == CLOSED
+    assert b.record(False, 0.1)
+    assert b.state == OPEN
+    assert b.trips == 1
+    assert not b.allow()
+
+
+def test_breaker_waits_for_min_requests(clock):
+    b = breaker()
+    for _ in range(3):
+        b.record(False, 0.1)
+    assert b.state == CLOSED
+
+
+def test_breaker_opens_on_latency(clock):
+    b = breaker(latency_threshold=1.0)
+    for _ in range(4):
+        b.record(True, 2.0)
+    assert b.state == OPEN
+
+
+def test_half_open_lets_one_probe_through(clock):
+    b = breaker(min_requests=1, window=1)
+    b.record(False, 0.1)
+    clock.now += 29.0
+    assert not b.allow()
+    clock.now += 1.0
+    assert b.allow()
+    assert b.state == HALF_OPEN
+    # Only one probe at a time
+    assert not b.allow()
+
+
+def test_successful_probe_closes_the_breaker(clock):
+    b = breaker(min_requests=1, window=1)
+    b.record(False, 0.1)
+    clock.now += 30.0
+    assert b.allow()
+    assert not b.record(True, 0.1)
+    assert b.state == CLOSED
+    assert b.allow()
+
+
+def test_failed_probe_reopens_the_breaker(clock):
+    b = breaker(min_requests=1, window=1)
+    b.record(False, 0.1)
+    clock.now += 30.0
+    assert b.allow()
+    assert b.record(False, 0.1)
+    assert b.state == OPEN
+    assert b.trips == 2
+    assert not b.allow()
+
+
+def failing_client():
+    client = DummyModelClient(rate_500=1.0, seed=0)
+    client.retry_policy = RetryPolicy(max_attempts=1)
+    return client
+
+
+def test_failover_moves_to_the_next_provider(board_image):
+    failover = FailoverModelClient([failing_client(), DummyModelClient(seed=0)],
+                                   names=["primary", "backup"], min_requests=2, window=2)
+    for _ in range(3):
+        assert failover.query("Verification: ?\nMain answer: ?", board_image)
+
+    assert failover.provider_stats()["primary"] == {"state": OPEN, "trips": 1}
+    stats = failover.get_run_stats()["failover"]
+    # Once the primary is open, queries go straight to the backup
+    assert stats["primary_failures"] == 2
+    assert stats["backup_requests"] == 3
+
+
+class ScriptedClient(ModelClient):
+    """Raises the queued exceptions in turn, then answers"""
+
+    def __init__(self, *errors):
+        super().__init__(model_name="scripted")
+        self.errors = list(errors)
+
+    def query(self, prompt, image_path, generation=None):
+        if self.errors:
+            raise self.errors.pop(0)
+        return "Verification: ok\nMain answer: yes"
+
+
+def open_failover(clock, provider):
+    failover = FailoverModelClient([provider], names=["only"], min_requests=1, window=1)
+    failover.breakers[0].record(False, 0.1)
+    clock.now += 30.0
+    return failover
+
+
+@pytest.mark.parametrize("error", [
+    ModelQueryError("too large", error_class="bad_request"),
+    OSError("cannot identify image file"),
+])
+def test_probe_failing_on_the_request_is_released(clock, board_image, error):
+    failover = open_failover(clock, ScriptedClient(error))
+    breaker = failover.breakers[0]
+
+    with pytest.raises(type(error)):
+        failover.query("prompt", board_image)
+    # The probe was not spent: the breaker is still half-open and probes again
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    breaker.release_probe()
+
+    assert failover.query("prompt", board_image)
+    assert breaker.state == CLOSED
@@ -0,0 +1,63 @@
+"""
+Tests for fitting generation budgets to a suite's expected answers
+"""
+
+import pytest
+
+from src.generation import (HEADROOM_FACTOR, HEADROOM_TOKENS, REASONING_MODELS,
+                            THINKING_HEADROOM_TOKENS, GenerationConfig, is_reasoning_model,
+                            register_reasoning_model)
+
+
+def test_fit_answers_sizes_the_budget_to_the_longest_answers():
+    short = GenerationConfig().fit_answers(["yes"], ["no"])
+    long = GenerationConfig().fit_answers(["yes", "e4 e5 Nf3 Nc6 Bb5 a6 Ba4 Nf6 " * 4], ["no"])
+    # "yes" and "no" are one token each, plus ~8 for the line prefixes
+    assert short.max_tokens == int((1 + 1 + 8) * HEADROOM_FACTOR) + HEADROOM_TOKENS
+    assert long.max_tokens > short.max_tokens
+
+
+def test_fit_answers_keeps_an_explicit_budget():
+    config = GenerationConfig(max_tokens=1000, temperature=0.2)
+    assert config.fit_answers(["x" * 4000], ["y"]) is config
+
+
+def test_for_model_adds_thinking_headroom_only_for_reasoning_models():
+    config = GenerationConfig(max_tokens=100)
+    assert config.for_model("qwen3-vl-8b-instruct").max_tokens == 100
+    assert config.for_model("qwen3-vl-8b-thinking").max_tokens == 100 + THINKING_HEADROOM_TOKENS
+    # Without a budget there is nothing to widen
+    assert GenerationConfig().for_model("qwen3-vl-8b-thinking").max_tokens is None
+
+
+@pytest.mark.parametrize("model_name, reasoning", [
+    ("qwen3-vl-235b-a22b-thinking", True),
+    ("Qwen/Qwen3-VL-30B-A3B-Thinking", True),
+    ("qwen3-vl-8b-thinking-2510", True),
+    ("qwen3-vl-8b-instruct", False),
+    ("grok-4-0709", True),
+    ("grok-4-fast-reasoning", True),
+    ("grok-4-fast-non-reasoning", False),
+    ("gemini-2.5-pro-preview-06-05", True),
+    ("gemini-2.5-flash-lite", False),
+    ("z-ai/glm-4.5v", True),
+    ("gpt-4o", False),
+])
+def test_reasoning_models_match_by_family(model_name, reasoning):
+    assert is_reasoning_model(model_name) is reasoning
+
+
+def test_reasoning_models_can_be_added(monkeypatch):
+    monkeypatch.setenv("VLM_REASONING_MODELS", "my-vlm-r1, other-*-think")
+    assert is_reasoning_model("my-vlm-r1")
+    assert is_reasoning_model("vendor/other-7b-think")
+
+    monkeypatch.setattr("src.generation.REASONING_MODELS", set(REASONING_MODELS))
+    register_reasoning_model("Custom-Reasoner*")
+    assert is_reasoning_model("custom-reasoner-large")
+
+
+def test_to_params_sends_only_the_fields_that_are_set():
+    assert GenerationConfig().to_params() == {}
+    assert GenerationConfig(max_tokens=64, stop=["\n\n"], temperature=0.0).to_params() == {
+        "max_tokens": 64, "stop": ["\n\n"], "temperature": 0.0}
@@ -0,0 +1,57 @@
+"""
+Tests for hedged requests
+"""
+
+import time
+
+from src.hedging import RequestHedger
+
+
+def warmed_up(latency=0.01, **kwargs):
+    hedger = RequestHedger(max_hedge_rate=1.0, min_samples=5, **kwargs)
+    for _ in range(5):
+        hedger.latencies.add(latency)
+    return hedger
+
+
+def test_no_hedges_while_warming_up():
+    hedger = RequestHedger(min_samples=5)
+    assert hedger.call(lambda: "ok") == ("ok", False, False)
+    assert hedger.hedge_delay() is None
+
+
+def test_slow_primary_is_hedged_and_the_hedge_wins():
+    hedger = warmed_up()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.3 if len(calls) == 1 else 0.0)
+        return f"call {len(calls)}"
+
+    assert hedger.call(fn) == ("call 2", True, True)
+    assert hedger.stats()["hedge_wins"] == 1
+
+
+def test_hedges_respect_the_rate_cap():
+    hedger = warmed_up()
+    hedger.max_hedge_rate = 0.0
+    assert hedger.call(lambda: time.sleep(0.05) or "ok") == ("ok", False, False)
+    assert hedger.hedges == 0
+
+
+def test_time_queued_for_a_thread_does_not_fire_a_hedge():
+    hedger = warmed_up(max_concurrency=1)
+    # Occupy both pool threads for longer than the hedge delay
+    blockers = [hedger._pool.submit(time.sleep, 0.1) for _ in range(2)]
+    assert hedger.call(lambda: "ok") == ("ok", False, False)
+    assert hedger.hedges == 0
+    for blocker in blockers:
+        blocker.result()
+
+
+def test_admit_check_can_veto_a_hedge():
+    hedger = warmed_up()
+    result = hedger.call(lambda: time.sleep(0.05) or "ok", admit=lambda: False)
+    assert result == ("ok", False, False)
+    assert hedger.hedges == 0
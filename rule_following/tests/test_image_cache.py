@@ -0,0 +1,56 @@
+"""
+Tests for the in-process cache of encoded image payloads
+"""
+
+import base64
+import os
+
+from PIL import Image
+
+from src.image_cache import ImagePayloadCache
+
+
+def board(path, color):
+    Image.new("RGB", (64, 64), color).save(path)
+    return str(path)
+
+
+def test_repeated_images_are_encoded_once(board_image):
+    cache = ImagePayloadCache()
+    first = cache.get(board_image)
+    assert cache.get(board_image) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    with open(board_image, "rb") as f:
+        assert first.data_url == "data:image/png;base64," + base64.b64encode(f.read()).decode()
+
+
+def test_regenerated_image_is_reencoded(tmp_path):
+    cache = ImagePayloadCache()
+    path = board(tmp_path / "board.png", "white")
+    before = cache.get(path)
+    board(path, "black")
+    # A rewrite normally changes the size or mtime; force the mtime to differ
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 1_000_000))
+    after = cache.get(path)
+    assert after.sha256 != before.sha256
+    assert cache.misses == 2
+
+
+def test_least_recently_used_payloads_are_evicted(tmp_path):
+    paths = [board(tmp_path / f"board_{i}.png", color)
+             for i, color in enumerate(("white", "black", "gray"))]
+    entry_size = len(ImagePayloadCache().get(paths[0]).data_url)
+    cache = ImagePayloadCache(max_bytes=2 * entry_size + 10)
+
+    cache.get(paths[0])
+    cache.get(paths[1])
+    cache.get(paths[0])  # paths[1] is now the least recently used
+    cache.get(paths[2])
+
+    assert cache.evictions == 1
+    assert cache.stats()["entries"] == 2
+    cache.get(paths[0])
+    assert cache.hits == 2
+    cache.get(paths[1])
+    assert cache.misses == 4
@@ -0,0 +1,89 @@
+"""
+Tests for packing several cases into one request and splitting the answers
+"""
+
+import pytest
+
+from src.generation import GenerationConfig
+from src.model_client import DummyModelClient
+from src.packing import (HEADER_TOKENS, build_packed_prompt, packed_case_count,
+                         packed_generation, share_metrics, split_packed_response)
+from src.spatial.test_0_pure_ability import SpatialTest0
+
+CASES = [{"verification_question": f"What is on square e{i}?", "question": f"Is e{i} empty?"}
+         for i in range(1, 4)]
+
+
+def answer(i, main="yes"):
+    return f"Verification: a pawn on e{i}\nMain answer: {main}"
+
+
+def test_packed_prompt_numbers_every_case():
+    prompt = build_packed_prompt(CASES)
+    assert packed_case_count(prompt) == 3
+    assert "Case 3 (image 3):" in prompt and "Is e3 empty?" in prompt
+    assert packed_case_count("Verification question: ...") is None
+
+
+@pytest.mark.parametrize("header", ["Case {i}:", "**Case {i}**", "### Image {i} -", "Board {i})"])
+def test_split_accepts_common_header_styles(header):
+    response = "\n\n".join(header.format(i=i) + "\n" + answer(i) for i in range(1, 4))
+    assert split_packed_response(response, 3) == [answer(i) for i in range(1, 4)]
+
+
+def test_split_keeps_an_answer_on_the_header_line():
+    response = "Case 1: Verification: a pawn on e1\nMain answer: yes\nCase 2:\n" + answer(2)
+    assert split_packed_response(response, 2) == [answer(1), answer(2)]
+
+
+@pytest.mark.parametrize("response", [
+    "Case 1:\n" + answer(1) + "\nCase 2:\n" + answer(2),  # case 3 missing
+    "Case 1:\n" + answer(1) + "\nCase 1:\n" + answer(2) + "\nCase 3:\n" + answer(3),
+    "Case 1:\n" + answer(1) + "\nCase 2:\nVerification: x\nCase 3:\n" + answer(3),
+    "Case 1:\n" + answer(1) + "\nCase 2:\n" + answer(2) + "\nCase 4:\n" + answer(3),
+    answer(1) + "\n" + answer(2) + "\n" + answer(3),
+])
+def test_ambiguous_responses_are_rejected(response):
+    assert split_packed_response(response, 3) is None
+
+
+def test_packed_budget_and_shared_metrics():
+    assert packed_generation(GenerationConfig(max_tokens=100), 3).max_tokens == 3 * (100 + HEADER_TOKENS)
+    assert packed_generation(GenerationConfig(), 3).max_tokens is None
+
+    metrics = {"latency": 1.2, "usage": {"prompt_tokens": 300, "cost_usd": 0.03}}
+    shared = share_metrics(metrics, 3, 1)
+    assert shared["latency"] == 1.2
+    assert shared["usage"] == {"prompt_tokens": 100, "cost_usd": pytest.approx(0.01)}
+    assert shared["pack"] == {"size": 3, "index": 1}
+
+
+class GarbledPacks(DummyModelClient):
+    """Answers packed prompts with text that cannot be split"""
+
+    def query(self, prompt, image_path, generation=None):
+        if packed_case_count(prompt):
+            self._start_request_metrics()
+            return "All boards look fine."
+        return super().query(prompt, image_path, generation=generation)
+
+
+@pytest.mark.parametrize("client_class, falls_back", [(DummyModelClient, False), (GarbledPacks, True)])
+def test_packed_runs_answer_every_case(tmp_path, client_class, falls_back):
+    test = SpatialTest0(base_output_dir=str(tmp_path / "spatial_0"), n_cases_per_type=2,
+                        auto_timestamp=False, pack_size=3)
+    test.generate_test_cases()
+    test.create_test_images()
+    client = client_class(seed=1)
+    client.set_test_cases(test.test_cases)
+
+    results, stats = test.run_test(client, save_results_flag=False)
+
+    assert [r.case_id for r in results] == [c["case_id"] for c in test.test_cases]
+    assert stats["errors"] == 0
+    packing = client.get_run_stats()["packing"]
+    assert packing["cases"] == len(test.test_cases)
+    assert packing["packs"] == -(-len(test.test_cases) // 3)
+    # Unsplittable packs are asked again case by case
+    assert packing.get("fallback_packs", 0) == (packing["packs"] if falls_back else 0)
+    assert all(r.request_metrics["pack"].get("fallback", False) == falls_back for r in results)
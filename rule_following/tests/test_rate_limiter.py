@@ -0,0 +1,129 @@
+"""
+Tests for the token buckets, including the SQLite store shared across processes
+"""
+
+import pytest
+
+from src.balancer import LoadBalancedModelClient
+from src.model_client import DummyModelClient
+from src.rate_limiter import (PROCESS_LOCAL, RateLimiter, SharedBucketStore, TokenBucket,
+                              api_key_fingerprint, use_shared_store)
+
+
+def test_token_bucket_spaces_requests_after_the_burst():
+    bucket = TokenBucket(rate_per_second=1.0, capacity=2)
+    assert bucket.reserve(1, now=0.0) == 0.0
+    assert bucket.reserve(1, now=0.0) == 0.0
+    assert bucket.reserve(1, now=0.0) == pytest.approx(1.0)
+    # Later callers queue behind the reservation
+    assert bucket.reserve(1, now=0.0) == pytest.approx(2.0)
+
+
+def test_token_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(rate_per_second=1.0, capacity=2)
+    bucket.reserve(2, now=0.0)
+    assert not bucket.available(1, now=0.5)
+    assert bucket.available(1, now=1.0)
+    assert bucket.fraction(now=100.0) == 1.0
+
+
+def test_oversized_requests_are_clamped_to_capacity():
+    bucket = TokenBucket(rate_per_second=10.0, capacity=5)
+    assert bucket.reserve(50, now=0.0) == 0.0
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / "rate_limits.sqlite")
+
+
+def limiter(store_path, api_key="key-a", rpm=60, burst=2):
+    # Each store opens its own connection, as a separate process would
+    return RateLimiter(requests_per_minute=rpm, burst=burst,
+                       shared_key=api_key_fingerprint(api_key),
+                       store=SharedBucketStore(store_path))
+
+
+def test_shared_store_pools_one_budget_per_key(store_path):
+    first, second = limiter(store_path), limiter(store_path)
+    assert first.try_acquire()
+    assert second.try_acquire()
+    # Burst of 2 is spent by the two "processes" together
+    assert not first.try_acquire()
+    assert not second.try_acquire()
+
+
+def test_shared_store_keeps_keys_apart(store_path):
+    first = limiter(store_path, api_key="key-a")
+    other = limiter(store_path, api_key="key-b")
+    assert first.try_acquire() and first.try_acquire()
+    assert other.try_acquire()
+
+
+def test_shared_reservations_make_later_callers_wait(store_path, monkeypatch):
+    monkeypatch.setattr("src.rate_limiter.time.sleep", lambda seconds: None)
+    first, second = limiter(store_path), limiter(store_path)
+    first.acquire()
+    first.acquire()
+    assert second.acquire() == pytest.approx(1.0, abs=0.1)
+
+
+def test_limiter_without_budget_follows_stored_budget(store_path):
+    owner = limiter(store_path)
+    follower = RateLimiter(shared_key=api_key_fingerprint("key-a"),
+                           store=SharedBucketStore(store_path))
+    # Nothing stored yet: the follower does not limit
+    assert follower.try_acquire()
+    assert follower.requests_per_minute is None
+
+    # Once the owner stored its budget (burst 2), both draw from it
+    assert owner.try_acquire()
+    assert follower.try_acquire()
+    assert not follower.try_acquire()
+    assert follower.requests_per_minute == pytest.approx(60)
+
+
+def test_limiters_without_a_key_or_marked_local_stay_in_process(store_path):
+    use_shared_store(store_path)
+    try:
+        # Different API keys must not meet in a bucket named after the provider
+        unkeyed = RateLimiter(requests_per_minute=60, burst=2, name="openai")
+        local = RateLimiter(requests_per_minute=60, burst=2, name="openai",
+                            shared_key=api_key_fingerprint("key-a"), store=PROCESS_LOCAL)
+        shared = RateLimiter(requests_per_minute=60, burst=2,
+                             shared_key=api_key_fingerprint("key-a"))
+    finally:
+        use_shared_store(None)
+    assert unkeyed.store is None and local.store is None
+    assert shared.store is not None
+    assert not unkeyed.following
+
+
+def test_attached_rate_limiter_is_detached_after_the_block():
+    own = RateLimiter(requests_per_minute=60)
+    first, second = DummyModelClient(), DummyModelClient()
+    second.set_rate_limiter(own)
+    client = LoadBalancedModelClient([first, second], names=["a", "b"])
+    run_limiter = RateLimiter.from_pause_config(10, 60)
+
+    with client.attached_rate_limiter(run_limiter):
+        assert client.rate_limiter is run_limiter
+        assert first.rate_limiter is run_limiter
+        assert second.rate_limiter is own
+    assert client.rate_limiter is None
+    assert first.rate_limiter is None
+    assert second.rate_limiter is own
+
+
+def test_from_pause_config():
+    limiter = RateLimiter.from_pause_config(10, 60)
+    assert limiter.requests_per_minute == pytest.approx(10)
+    assert limiter.burst == 10
+    assert RateLimiter.from_pause_config(0, 60) is None
+
+
+def test_api_key_fingerprint_hides_the_key():
+    fingerprint = api_key_fingerprint("sk-secret")
+    assert "sk-secret" not in fingerprint
+    assert fingerprint == api_key_fingerprint("sk-secret")
+    assert api_key_fingerprint(None) is None
@@ -0,0 +1,85 @@
+"""
+Tests for recording live queries and replaying them offline
+"""
+
+import pytest
+
+from src.generation import GenerationConfig
+from src.model_client import DummyModelClient, ModelClient, ModelQueryError
+from src.replay import RecordReplayModelClient
+
+
+class ScriptedClient(ModelClient):
+    """Answers each query with the next scripted response (or raises it)"""
+
+    def __init__(self, responses):
+        super().__init__(model_name="scripted")
+        self.responses = list(responses)
+
+    def query(self, prompt, image_path, generation=None):
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.mark.parametrize("log_name", ["run.jsonl", "run.jsonl.gz"])
+def test_replay_returns_recorded_responses_in_order(tmp_path, board_image, log_name):
+    log_path = str(tmp_path / log_name)
+    recorder = RecordReplayModelClient(log_path, ScriptedClient(["first", "second"]))
+    assert recorder.query("Is e4 empty?", board_image) == "first"
+    assert recorder.query("Is e4 empty?", board_image) == "second"
+    recorder.close()
+
+    replay = RecordReplayModelClient(log_path, mode="replay")
+    assert replay.model_name == "scripted"
+    assert replay.query("Is e4 empty?", board_image) == "first"
+    assert replay.query("Is e4 empty?", board_image) == "second"
+    # The last recording repeats once the queue is used up
+    assert replay.query("Is e4 empty?", board_image) == "second"
+    assert replay.get_run_stats()["replay"]["hits"] == 3
+
+
+def test_requests_differ_by_prompt_and_budget(tmp_path, board_image):
+    log_path = str(tmp_path / "run.jsonl")
+    recorder = RecordReplayModelClient(log_path, ScriptedClient(["short", "long"]))
+    recorder.query("Is e4 empty?", board_image, generation=GenerationConfig(max_tokens=16))
+    recorder.query("Is e4 empty?", board_image, generation=GenerationConfig(max_tokens=256))
+    recorder.close()
+
+    replay = RecordReplayModelClient(log_path, mode="replay")
+    assert replay.query("Is e4 empty?", board_image,
+                        generation=GenerationConfig(max_tokens=256)) == "long"
+    with pytest.raises(ModelQueryError) as raised:
+        replay.query("Is d4 empty?", board_image)
+    assert raised.value.error_class == "replay_miss"
+
+
+def test_misses_go_to_the_live_client_when_given(tmp_path, board_image):
+    log_path = str(tmp_path / "run.jsonl")
+    RecordReplayModelClient(log_path, ScriptedClient([])).close()
+
+    replay = RecordReplayModelClient(log_path, client=ScriptedClient(["live"]), mode="replay")
+    assert replay.query("Is e4 empty?", board_image) == "live"
+    assert replay.get_run_stats()["replay"]["misses"] == 1
+
+
+def test_recorded_errors_and_usage_are_replayed(tmp_path, board_image):
+    log_path = str(tmp_path / "run.jsonl")
+    failing = ScriptedClient([ModelQueryError("overloaded", error_class="server_error")])
+    recorder = RecordReplayModelClient(log_path, failing)
+    with pytest.raises(ModelQueryError):
+        recorder.query("Is e4 empty?", board_image)
+    recorder.close()
+    recorder = RecordReplayModelClient(log_path, DummyModelClient(seed=0))
+    recorder.query("Is d4 empty?", board_image)
+    recorder.close()
+
+    replay = RecordReplayModelClient(log_path, mode="replay")
+    with pytest.raises(ModelQueryError) as raised:
+        replay.query("Is e4 empty?", board_image)
+    assert raised.value.error_class == "server_error"
+    replay.query("Is d4 empty?", board_image)
+    usage = replay.get_run_stats()["usage"]
+    # The dummy's estimated usage stays labelled simulated after a replay
+    assert usage["prompt_tokens"] > 0 and usage["simulated"] == 1
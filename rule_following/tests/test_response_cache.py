@@ -0,0 +1,71 @@
+"""
+Tests for the content-addressed response cache and its LRU eviction
+"""
+
+import itertools
+
+import pytest
+
+from src.response_cache import ResponseCache
+
+DIGEST_A = "aa" * 32
+DIGEST_B = "bb" * 32
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Distinct access times, so LRU order does not depend on timer resolution
+    ticks = itertools.count(1)
+    monkeypatch.setattr("src.response_cache.time.time", lambda: float(next(ticks)))
+
+
+def key(prompt="Is the king in check?", digests=(DIGEST_A,), params=None,
+        model="qwen3-vl-plus"):
+    return ResponseCache.make_key(model, "https://api.example/v1", prompt, list(digests), params)
+
+
+def test_keys_cover_everything_that_changes_the_answer():
+    base = key()
+    assert key() == base
+    assert key(prompt="Is the queen in check?") != base
+    assert key(digests=(DIGEST_B,)) != base
+    assert key(digests=(DIGEST_A, DIGEST_B)) != key(digests=(DIGEST_B, DIGEST_A))
+    assert key(params={"max_tokens": 64}) != base
+    assert key(model="qwen3-vl-8b-instruct") != base
+
+
+def test_keys_ignore_transport_only_params():
+    assert key(params={"max_tokens": 64, "stream": True}) == key(params={"max_tokens": 64})
+
+
+def test_get_and_put_count_hits_and_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    assert cache.get(key()) is None
+    cache.put(key(), "Verification: yes\nMain answer: no")
+    assert cache.get(key()) == "Verification: yes\nMain answer: no"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["writes"]) == (1, 1, 1)
+
+
+def test_refresh_stores_but_never_serves(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    refreshing = ResponseCache(path, refresh=True)
+    refreshing.put(key(), "fresh")
+    assert refreshing.get(key()) is None
+    assert ResponseCache(path).get(key()) == "fresh"
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=10)
+    first, second, third = key("first"), key("second"), key("third")
+    cache.put(first, "aaaa")
+    cache.put(second, "bbbb")
+    # Reading first makes second the least recently used
+    assert cache.get(first) == "aaaa"
+    cache.put(third, "cccc")
+
+    assert cache.get(second) is None
+    assert cache.get(first) == "aaaa"
+    assert cache.get(third) == "cccc"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size_bytes"] <= 10
@@ -0,0 +1,87 @@
+"""
+Tests for error classification and the retry engine
+"""
+
+from email.utils import formatdate
+
+import pytest
+
+from src.model_client import DummyModelClient, ModelQueryError, RetryPolicy, classify_error
+from src.simulation import SimulatedAPIError
+
+
+class ConnectTimeout(Exception):
+    """Named like httpx's timeout errors"""
+
+
+@pytest.mark.parametrize("status, error_class, retryable", [
+    (429, "rate_limit", True),
+    (408, "timeout", True),
+    (500, "server_error", True),
+    (503, "server_error", True),
+    (400, "bad_request", False),
+    (401, "auth", False),
+    (413, "payload_too_large", False),
+    (418, "http_418", False),
+])
+def test_http_errors_are_classified_by_status(status, error_class, retryable):
+    assert classify_error(SimulatedAPIError("error", status))[:2] == (error_class, retryable)
+
+
+def test_transport_errors_are_retryable():
+    assert classify_error(TimeoutError())[:2] == ("timeout", True)
+    assert classify_error(ConnectTimeout())[:2] == ("timeout", True)
+    assert classify_error(ConnectionResetError())[:2] == ("connection", True)
+    assert classify_error(ValueError("bad"))[:2] == ("unknown", False)
+
+
+def test_retry_after_is_read_from_the_response_headers():
+    assert classify_error(SimulatedAPIError("slow down", 429, retry_after=7))[2] == 7.0
+    error = SimulatedAPIError("slow down", 429)
+    error.response.headers = {"retry-after-ms": "1500"}
+    assert classify_error(error)[2] == 1.5
+    error.response.headers = {"retry-after": formatdate(usegmt=True)}
+    assert classify_error(error)[2] == pytest.approx(0.0, abs=1.0)
+
+
+def test_backoff_grows_exponentially_up_to_the_cap():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0, jitter=0.0)
+    assert [policy.backoff_delay(attempt) for attempt in (1, 2, 3, 4)] == [1.0, 2.0, 4.0, 5.0]
+    # A longer server-requested delay wins
+    assert policy.backoff_delay(1, retry_after=30.0) == 30.0
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    # The dummy's simulated latency sleeps too (0s by default); keep backoffs only
+    monkeypatch.setattr("src.model_client.time.sleep",
+                        lambda seconds: seconds and sleeps.append(seconds))
+    return sleeps
+
+
+def test_retryable_errors_are_retried_until_attempts_run_out(board_image, sleeps):
+    client = DummyModelClient(rate_500=1.0, seed=0)
+    client.retry_policy = RetryPolicy(max_attempts=3, base_delay=1.0, jitter=0.0)
+
+    with pytest.raises(ModelQueryError) as raised:
+        client.query("Is there a piece on e4?", board_image)
+
+    assert raised.value.error_class == "server_error"
+    assert raised.value.attempts == 3
+    assert sleeps == [1.0, 2.0]
+    stats = client.get_run_stats()
+    assert stats["retries"]["server_error"] == 2
+    assert stats["errors"]["server_error"] == 1
+
+
+def test_rate_limits_beyond_the_wait_cap_fail_at_once(board_image, sleeps):
+    client = DummyModelClient(rate_429=1.0, retry_after=120.0, seed=0)
+    client.retry_policy = RetryPolicy(max_attempts=5, max_rate_limit_wait=10.0)
+
+    with pytest.raises(ModelQueryError) as raised:
+        client.query("Is there a piece on e4?", board_image)
+
+    assert raised.value.error_class == "rate_limit"
+    assert raised.value.attempts == 1
+    assert sleeps == []
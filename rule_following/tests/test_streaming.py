@@ -0,0 +1,56 @@
+"""
+Tests for streamed early stop and its agreement with the response parser
+"""
+
+import pytest
+
+from src.mock_server import MockOpenAIServer
+from src.model_client import OpenAICompatibleModelClient
+from src.streaming import CombinedAnswerDetector
+from src.temporal_levels import TemporalLevel2
+
+RESTATED = ("Verification: e4 pawn\nMain answer: yes\n"
+            "Main answer: no\nOn reflection the pawn never moved.\n")
+
+
+def test_detector_waits_for_complete_lines():
+    detector = CombinedAnswerDetector()
+    assert not detector.feed("Verification: e4 pawn\nMain ans")
+    assert not detector.feed("wer: yes")
+    assert detector.feed("\nExplanation")
+    assert detector.main_answer_line == "Main answer: yes"
+
+
+def test_detector_keeps_the_first_answer_lines():
+    detector = CombinedAnswerDetector()
+    detector.feed(RESTATED)
+    assert detector.verification_line == "Verification: e4 pawn"
+    assert detector.main_answer_line == "Main answer: yes"
+
+
+@pytest.fixture
+def level(tmp_path):
+    return TemporalLevel2(base_output_dir=str(tmp_path / "level_2"), auto_timestamp=False)
+
+
+def test_parser_uses_the_same_first_line_rule(level):
+    assert level._parse_combined_response(RESTATED) == ("e4 pawn", "yes")
+
+
+@pytest.mark.parametrize("early_stop", [True, False])
+def test_stopped_and_full_streams_parse_alike(board_image, level, early_stop):
+    with MockOpenAIServer(responder=lambda body: RESTATED, tokens_per_second=200.0) as server:
+        client = OpenAICompatibleModelClient(
+            api_key="mock", base_url=server.base_url, model_name="mock-model",
+            stream=True, early_stop=early_stop)
+        response = client.query("Verification: ?\nMain answer: ?", board_image)
+
+    assert level._parse_combined_response(response) == ("e4 pawn", "yes")
+    assert client.get_run_stats()["streaming"].get("early_stops", 0) == (1 if early_stop else 0)
+    assert (response == RESTATED) != early_stop
+
+
+def test_early_stop_is_opt_in():
+    client = OpenAICompatibleModelClient(api_key="mock", base_url="http://127.0.0.1:9/v1",
+                                         model_name="mock-model")
+    assert client.early_stop is False
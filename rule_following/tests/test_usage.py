@@ -0,0 +1,78 @@
+"""
+Tests for token usage accounting of simulated and priced responses
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.model_client import DummyModelClient
+from src.usage import (BATCH_PRICE_FACTOR, MODEL_PRICES, estimate_cost, extract_usage,
+                       format_usage, summarize_usage)
+
+
+def test_simulated_usage_is_labelled_and_never_priced(board_image):
+    client = DummyModelClient(seed=0)
+    # Even under a priced model name the made-up tokens cost nothing
+    client.model_name = "grok-4"
+    assert "grok-4" in MODEL_PRICES
+
+    client.query("Is there a piece on e4?", board_image)
+
+    usage = client.get_run_stats()["usage"]
+    assert usage["prompt_tokens"] > 0
+    assert usage["simulated"] == 1
+    assert "cost_usd" not in usage
+    assert format_usage(usage).endswith("(simulated)")
+
+
+def test_reported_usage_is_priced():
+    client = DummyModelClient()
+    client.model_name = "grok-4"
+
+    client._record_usage({"prompt_tokens": 1_000_000, "completion_tokens": 0})
+
+    usage = client.get_run_stats()["usage"]
+    assert usage["cost_usd"] == 3.00
+    assert "simulated" not in usage
+    assert "(simulated)" not in format_usage(usage)
+
+
+def test_extract_usage_reads_sdk_details():
+    usage = {"prompt_tokens": 120, "completion_tokens": 30,
+             "prompt_tokens_details": {"cached_tokens": 100},
+             "completion_tokens_details": {"reasoning_tokens": 20}}
+    assert extract_usage(usage) == {"prompt_tokens": 120, "completion_tokens": 30,
+                                    "reasoning_tokens": 20, "cached_tokens": 100}
+    assert extract_usage(None) is None
+    assert extract_usage({}) is None
+
+
+def test_cached_tokens_and_batches_are_priced_lower():
+    usage = {"prompt_tokens": 1_000_000, "cached_tokens": 1_000_000, "completion_tokens": 0}
+    # grok-4: $3.00 per million input tokens, $0.75 cached
+    assert estimate_cost(usage, "grok-4") == pytest.approx(0.75)
+    assert estimate_cost(usage, "x-ai/grok-4", BATCH_PRICE_FACTOR) == pytest.approx(0.375)
+    assert estimate_cost(usage, "unpriced-model") is None
+
+
+def result(case_id, usage):
+    # Stands in for a TestResult
+    return SimpleNamespace(case_id=case_id, request_metrics={"usage": usage} if usage else None)
+
+
+def test_summarize_usage_totals_per_run_and_per_type():
+    results = [result("a", {"prompt_tokens": 100, "completion_tokens": 10, "cost_usd": 0.001}),
+               result("b", {"prompt_tokens": 300, "completion_tokens": 30, "cost_usd": 0.003}),
+               result("c", None)]
+    cases = [{"case_id": "a", "type": "diagonal"},
+             {"case_id": "b", "type": "same_line", "subtype": "same_rank"},
+             {"case_id": "c", "type": "diagonal"}]
+
+    summary = summarize_usage(results, cases)
+
+    assert summary["cases_with_usage"] == 2
+    assert summary["total"] == {"prompt_tokens": 400, "completion_tokens": 40, "cost_usd": 0.004}
+    assert summary["mean_per_case"]["prompt_tokens"] == 200
+    assert summary["by_type"]["diagonal"]["cases"] == 1
+    assert summary["by_type"]["same_line_same_rank"]["prompt_tokens"] == 300